@@ -0,0 +1,290 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+Benchmarks of the hot paths of pyProm on synthetic terrain.
+
+Every case runs in a fresh worker process so peak RSS is per case.
+Results are written as JSON, tagged with the git commit, so runs can be
+compared across commits:
+
+    python benchmarks/run_benchmarks.py --sizes 128 256 -o before.json
+    python benchmarks/run_benchmarks.py --sizes 128 256 -o after.json \
+        --baseline before.json
+"""
+
+from __future__ import print_function, division
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'pyprom'))
+sys.path.insert(0, HERE)
+
+from terrain import TERRAINS  # noqa: E402
+from lib.metrics import peakRSS  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+CASES = ['analyze', 'equalHeightBlob', 'walk', 'to_json', 'from_json',
+         'queries', 'gridpoints']
+# Coordinates queried per run of the queries case.
+QUERY_COUNT = 1000
+
+
+def _datamap(terrain, size):
+    from lib.datamap import DataMap
+    elevations = TERRAINS[terrain](size)
+    return DataMap(elevations, 44, -72, size, size, 1)
+
+
+def _prepare(case, datamap):
+    """
+    Does the untimed setup of a case.
+    :param case: name from :const:`CASES`
+    :param datamap: :class:`DataMap` object.
+    :return: (function to time, number of items it handles, item name)
+    """
+    from logic import AnalyzeData
+    if case == 'analyze':
+        return (lambda: AnalyzeData(datamap).analyze(),
+                datamap.numpy_map.size, 'points')
+
+    if case == 'equalHeightBlob':
+        from lib.equal_height import EqualHeightLabels
+        labels = EqualHeightLabels(datamap.numpy_map)
+        xs, ys = divmod(labels.firstCell[1:], datamap.numpy_map.shape[1])
+        areas = [(int(x), int(y), float(datamap.numpy_map[x, y]))
+                 for x, y in zip(xs, ys)]
+
+        def blobs():
+            analyzer = AnalyzeData(datamap)
+            for x, y, elevation in areas:
+                analyzer.equalHeightBlob(x, y, elevation)
+        return blobs, len(areas), 'areas'
+
+    if case == 'gridpoints':
+        from lib.locations.gridpoint import GridPoint
+        from lib.locations.inverse_edgepoint import InverseEdgePoint
+        import numpy
+        xs, ys = numpy.divmod(numpy.arange(datamap.numpy_map.size),
+                              datamap.numpy_map.shape[1])
+        rows = list(zip(xs.tolist(), ys.tolist(),
+                        datamap.numpy_map.ravel().tolist()))
+
+        def gridPoints():
+            # Every point, and a shore point for one in eight.
+            points = [GridPoint(x, y, elevation)
+                      for x, y, elevation in rows]
+            shores = [InverseEdgePoint(x, y, elevation)
+                      for x, y, elevation in rows[::8]]
+            return points, shores
+        return gridPoints, len(rows), 'points'
+
+    summits, saddles = AnalyzeData(datamap).analyze()
+    if case == 'walk':
+        from walk import Walk
+        # Summits on the map edge are not walked to.
+        summits.points = [summit for summit in summits.points
+                          if not summit.edgeEffect]
+        return (lambda: Walk(summits, saddles.points, datamap).run(),
+                len(saddles), 'saddles')
+
+    from domain import Domain
+    domain = Domain(datamap)
+    domain.summits = summits
+    domain.saddles = saddles
+    features = len(summits) + len(saddles)
+    if case == 'to_json':
+        return lambda: domain.to_json(), features, 'features'
+    if case == 'from_json':
+        text = domain.to_json()
+        return lambda: domain.from_json(text), features, 'features'
+
+    if case == 'queries':
+        import numpy
+        random = numpy.random.RandomState(0)
+        latitudes = random.uniform(datamap.latitude, datamap.latitude_max,
+                                   QUERY_COUNT)
+        longitudes = random.uniform(datamap.longitude,
+                                    datamap.longitude_max, QUERY_COUNT)
+        coordinates = list(zip(latitudes.tolist(), longitudes.tolist()))
+
+        def queries():
+            summits.radiusBatch(coordinates, datamap, 200)
+            summits.nearestBatch(coordinates, datamap, k=3)
+            for lat, long in coordinates[:QUERY_COUNT // 10]:
+                summits.rectangle(lat - .001, long - .001,
+                                  lat + .001, long + .001)
+        return queries, QUERY_COUNT, 'queries'
+    raise ValueError('Unknown benchmark case {}'.format(case))
+
+
+def _tracedBlocks():
+    """
+    :return: number of memory blocks currently traced by
+     :mod:`tracemalloc`, leaving out its own.
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)])
+    return sum(stat.count for stat in snapshot.statistics('filename'))
+
+
+def _traceCase(function):
+    """
+    Runs `function` once more under :mod:`tracemalloc`.
+    :param function: function to trace.
+    :return: (blocks allocated by the run which are still alive when it
+     returns, counted while its result is held, peak traced bytes)
+    """
+    tracemalloc.start()
+    try:
+        before = _tracedBlocks()
+        result = function()
+        blocks = _tracedBlocks() - before
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return blocks, peak
+
+
+def runCase(case, terrain, size, repeat=3, trace=True):
+    """
+    Runs one benchmark case, meant to be called in a fresh process.
+    :param case: name from :const:`CASES`
+    :param terrain: name from :const:`TERRAINS`
+    :param size: points along each side of the map.
+    :param repeat: number of timed runs, the fastest one is reported.
+    :param trace: also run the case once under :mod:`tracemalloc`, to
+     count the blocks it allocates and keeps for its result and record
+     its peak traced memory. Slows the case down, but not its timings.
+    :return: dict of results.
+    """
+    datamap = _datamap(terrain, size)
+    function, items, unit = _prepare(case, datamap)
+    timings = list()
+    for count in range(repeat):
+        start = time.time()
+        function()
+        timings.append(time.time() - start)
+    result = {'case': case,
+              'terrain': terrain,
+              'size': size,
+              'points': datamap.numpy_map.size,
+              'items': items,
+              'unit': unit,
+              'seconds': min(timings),
+              'timings': timings,
+              'pointsPerSecond': datamap.numpy_map.size /
+              max(min(timings), 1e-9),
+              'itemsPerSecond': items / max(min(timings), 1e-9),
+              'peakRSSKiB': peakRSS(),
+              'resultBlocks': None,
+              'tracedPeakBytes': None}
+    if trace and tracemalloc is not None:
+        result['resultBlocks'], result['tracedPeakBytes'] = \
+            _traceCase(function)
+    return result
+
+
+def _runCase(arguments):
+    return runCase(*arguments)
+
+
+def _commit():
+    """
+    :return: git commit hash of the working tree, or None.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=HERE,
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline):
+    """
+    Prints the change in speed of every case against a baseline run.
+    :param results: list of result dicts.
+    :param baseline: result document from an earlier run.
+    """
+    before = dict(((result['case'], result['terrain'], result['size']),
+                   result) for result in baseline['results'])
+    print('\nAgainst {}'.format(baseline.get('commit')))
+    for result in results:
+        old = before.get((result['case'], result['terrain'],
+                          result['size']))
+        if old is None:
+            continue
+        print('{:<16} {:<9} {:>6} {:>8.2f}x'.format(
+            result['case'], result['terrain'], result['size'],
+            old['seconds'] / max(result['seconds'], 1e-9)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--cases', nargs='+', default=CASES, choices=CASES)
+    parser.add_argument('--terrains', nargs='+', default=sorted(TERRAINS),
+                        choices=sorted(TERRAINS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[128, 256])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-trace', dest='trace', action='store_false',
+                        help="don't count blocks or record peak traced"
+                        ' memory, which doubles the run time of a case')
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='earlier results to compare to')
+    args = parser.parse_args(argv)
+
+    results = list()
+    print('{:<16} {:<9} {:>6} {:>10} {:>14} {:>10} {:>10}'.format(
+        'case', 'terrain', 'size', 'seconds', 'points/sec', 'rss KiB',
+        'blocks'))
+    for size in args.sizes:
+        for terrain in args.terrains:
+            for case in args.cases:
+                # A fresh process per case keeps peak RSS separate.
+                pool = multiprocessing.Pool(1)
+                try:
+                    result = pool.apply(_runCase, ((case, terrain, size,
+                                                    args.repeat,
+                                                    args.trace),))
+                finally:
+                    pool.close()
+                    pool.join()
+                results.append(result)
+                # Memory figures are None where they can't be measured.
+                print('{:<16} {:<9} {:>6} {:>10.4f} {:>14.0f} {:>10} {:>10}'
+                      .format(case, terrain, size, result['seconds'],
+                              result['pointsPerSecond'],
+                              str(result['peakRSSKiB']),
+                              str(result['resultBlocks'])))
+
+    document = {'commit': _commit(),
+                'date': time.strftime("%m-%d-%Y %H:%M:%S"),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results}
+    with open(args.output, 'w') as outgoing:
+        json.dump(document, outgoing, sort_keys=True, indent=4,
+                  separators=(',', ': '))
+    if args.baseline:
+        with open(args.baseline) as incoming:
+            _compare(results, json.load(incoming))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This file contains generators of synthetic elevation maps used by the
+benchmarks. All of them are seeded, so a given size always produces the
+same map.
+"""
+
+import numpy
+
+
+def fractal(size, seed=0, step=1):
+    """
+    Diamond-square terrain.
+    :param size: points along each side.
+    :param seed: random seed.
+    :param step: elevations are rounded down to multiples of this, larger
+     values make more equal height areas.
+    :return: 2d int16 numpy array of elevations.
+    """
+    random = numpy.random.RandomState(seed)
+    span = 1
+    while span < size:
+        span *= 2
+    terrain = numpy.zeros((span + 1, span + 1))
+    stride = span
+    scale = 400.0
+    while stride > 1:
+        half = stride // 2
+        centers = terrain[half::stride, half::stride]
+        centers[:] = (terrain[:-1:stride, :-1:stride] +
+                      terrain[stride::stride, :-1:stride] +
+                      terrain[:-1:stride, stride::stride] +
+                      terrain[stride::stride, stride::stride]) / 4
+        centers += random.randn(*centers.shape) * scale
+        columns = terrain[::stride, half::stride]
+        columns[:] = (terrain[::stride, :-1:stride] +
+                      terrain[::stride, stride::stride]) / 2 + \
+            random.randn(*columns.shape) * scale * .7
+        rows = terrain[half::stride, ::stride]
+        rows[:] = (terrain[:-1:stride, ::stride] +
+                   terrain[stride::stride, ::stride]) / 2 + \
+            random.randn(*rows.shape) * scale * .7
+        stride = half
+        scale /= 2
+    terrain = terrain[:size, :size]
+    terrain = terrain - terrain.min() + 100
+    return (numpy.floor(terrain / step) * step).astype(numpy.int16)
+
+
+def plateaus(size, seed=1):
+    """
+    :return: fractal terrain in coarse 40 meter steps, mostly made of
+     equal height areas.
+    """
+    return fractal(size, seed, step=40)
+
+
+def lakes(size, seed=2):
+    """
+    :return: fractal terrain with large flat lakes, one of them at sea
+     level.
+    """
+    terrain = fractal(size, seed, step=5)
+    random = numpy.random.RandomState(seed)
+    for count in range(4):
+        x, y = random.randint(0, size * 3 // 4, 2)
+        span = size // 4
+        terrain[x:x + span, y:y + span] = terrain[x, y]
+    terrain[size // 2:size // 2 + size // 8, :size // 4] = 0
+    return terrain
+
+
+def noise(size, seed=3):
+    """
+    :return: white noise over a handful of elevations, which is close to
+     the worst case for saddle and equal height area counts.
+    """
+    random = numpy.random.RandomState(seed)
+    return random.randint(0, 4, size=(size, size)).astype(numpy.int16)
+
+
+TERRAINS = {'fractal': fractal,
+            'plateaus': plateaus,
+            'lakes': lakes,
+            'noise': noise}
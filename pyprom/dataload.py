@@ -6,11 +6,45 @@ the LICENSE file that accompanies it.
 """
 
 import os
-import gdal
+import glob
 import numpy
 import logging
 
+from numpy.lib.format import open_memmap
+
 from lib.datamap import DataMap
+from lib.mosaic import MosaicArray
+from lib.raster import BandArray
+
+try:
+    import gdal
+except ImportError:  # Only needed by ADFLoader.
+    gdal = None
+
+# Rows copied at a time when writing a native byte order cache.
+CACHE_ROWS = 512
+
+
+def hgtLatLong(filename):
+    """
+    Converts hgt filename string to usable latitude and longitude
+    :param filename: File name, for instance ~/N44W072.hgt
+    :return: (latitude, longitude) of the SW corner. Either is None if
+     the file name doesn't hold it.
+    """
+    filename = filename.split('/')[-1]
+    latitude = filename[:3]
+    longitude = filename[3:7]
+    lat = lon = None
+    if latitude[0] == 'N':
+        lat = int(latitude[1:])
+    if latitude[0] == 'S':
+        lat = -int(latitude[1:])
+    if longitude[0] == 'E':
+        lon = int(longitude[1:])
+    if longitude[0] == 'W':
+        lon = -int(longitude[1:])
+    return lat, lon
 
 
 class Loader(object):
@@ -26,12 +60,19 @@ class SRTMLoader(Loader):
     def __init__(self, filename,
                  arcsec_resolution=1,
                  span_latitude=3601,
-                 span_longitude=3601):
+                 span_longitude=3601,
+                 memmap=False,
+                 cache=None):
         """
         :param filename: File name, for instance ~/N44W072.hgt
         :param arcsec_resolution: how many arcseconds per measurement unit.
         :param span_latitude: source datamap point span along latitude
         :param span_longitude: source datamap point span along longitude
+        :param memmap: memory map the file instead of reading it in.
+         Elevations are then read from disk as they are accessed.
+        :param cache: optional file name of a native byte order copy of
+         the tile (.npy). Written on first use (or when older than the
+         tile) and memory mapped from then on. Implies `memmap`.
         """
         super(SRTMLoader, self).__init__(filename)
         self.logger.info("Loading: {} Latitude span: {}, Longitude span: {}"
@@ -44,12 +85,21 @@ class SRTMLoader(Loader):
         self.arcsec_resolution = arcsec_resolution
         self.latitude = self.longitude = None
         self.latlong()
-        with open(self.filename) as hgt_data:
-            self.elevations = numpy.fromfile(hgt_data, numpy.dtype('>i2'),
-                                             self.span_longitude *
-                                             self.span_latitude).reshape((
-                                              self.span_longitude,
-                                              self.span_latitude))
+        shape = (self.span_longitude, self.span_latitude)
+        if cache:
+            self.elevations = self._nativeCache(os.path.expanduser(cache),
+                                                shape)
+        elif memmap:
+            self.elevations = numpy.memmap(self.filename,
+                                           dtype=numpy.dtype('>i2'),
+                                           mode='r', shape=shape)
+        else:
+            with open(self.filename) as hgt_data:
+                self.elevations = numpy.fromfile(hgt_data,
+                                                 numpy.dtype('>i2'),
+                                                 self.span_longitude *
+                                                 self.span_latitude).reshape(
+                                                  shape).astype(numpy.int16)
 
         self.datamap = DataMap(self.elevations,
                                self.latitude,
@@ -58,21 +108,117 @@ class SRTMLoader(Loader):
                                self.span_longitude,
                                self.arcsec_resolution)
 
+    def _nativeCache(self, cache, shape):
+        """
+        Memory maps a native byte order copy of the tile, writing it
+        first if needed.
+        :param cache: file name of the .npy cache.
+        :param shape: shape of the tile.
+        :return: read only :class:`numpy.memmap` of elevations.
+        """
+        if not os.path.exists(cache) or \
+                os.path.getmtime(cache) < os.path.getmtime(self.filename):
+            self.logger.info("Writing native byte order cache:"
+                             " {}".format(cache))
+            source = numpy.memmap(self.filename, dtype=numpy.dtype('>i2'),
+                                  mode='r', shape=shape)
+            native = open_memmap(cache, mode='w+', dtype=numpy.int16,
+                                 shape=shape)
+            for x in range(0, shape[0], CACHE_ROWS):
+                native[x:x + CACHE_ROWS] = source[x:x + CACHE_ROWS]
+            native.flush()
+            del native, source
+        elevations = numpy.load(cache, mmap_mode='r')
+        if elevations.shape != shape:
+            raise ValueError('Cache {} has shape {}, expected'
+                             ' {}'.format(cache, elevations.shape, shape))
+        return elevations
+
     def latlong(self):
         """
         Converts hgt filename string to usable latitude and longitude
         """
-        filename = self.filename.split('/')[-1]
-        latitude = filename[:3]
-        longitude = filename[3:7]
-        if latitude[0] == 'N':
-            self.latitude = int(latitude[1:])
-        if latitude[0] == 'S':
-            self.latitude = -int(latitude[1:])
-        if longitude[0] == 'E':
-            self.longitude = int(longitude[1:])
-        if longitude[0] == 'W':
-            self.longitude = -int(longitude[1:])
+        self.latitude, self.longitude = hgtLatLong(self.filename)
+
+
+class MosaicLoader(Loader):
+    def __init__(self, filenames,
+                 arcsec_resolution=1,
+                 span=3601,
+                 cacheDir=None):
+        """
+        Presents a set of adjacent SRTM tiles as one :class:`DataMap`.
+        The shared border rows/columns of neighboring tiles are only kept
+        once, and tiles are memory mapped when first touched. Tiles
+        missing from the rectangle covering `filenames` read as 0.
+        :meth:`Domain.run` analyzes the mosaic in tiles, so it only reads
+        a tile at a time. :class:`Walk`, and :class:`AnalyzeData` used
+        directly, read all of it, see :meth:`DataMap.padded`.
+        :param filenames: directory holding .hgt files, or a list of .hgt
+         file names.
+        :param arcsec_resolution: how many arcseconds per measurement unit.
+        :param span: point span of each tile along latitude and longitude
+        :param cacheDir: optional directory for native byte order copies
+         of the tiles, see :class:`SRTMLoader`.
+        """
+        if not isinstance(filenames, (list, tuple)):
+            directory = os.path.expanduser(filenames)
+            filenames = sorted(glob.glob(os.path.join(directory, '*.hgt')))
+        if not filenames:
+            raise ValueError('No .hgt files to load')
+        super(MosaicLoader, self).__init__(filenames[0])
+        self.filenames = [os.path.expanduser(f) for f in filenames]
+        self.arcsec_resolution = arcsec_resolution
+        self.span = span
+        self.cacheDir = cacheDir
+
+        corners = dict()
+        for filename in self.filenames:
+            corner = hgtLatLong(filename)
+            if None in corner:
+                raise ValueError('Cannot find latitude/longitude in'
+                                 ' {}'.format(filename))
+            corners[corner] = filename
+        latitudes = [corner[0] for corner in corners]
+        longitudes = [corner[1] for corner in corners]
+        self.latitude = min(latitudes)
+        self.longitude = min(longitudes)
+        tiles = [[corners.get((latitude, longitude))
+                  for longitude in range(self.longitude,
+                                         max(longitudes) + 1)]
+                 for latitude in range(max(latitudes), self.latitude - 1,
+                                       -1)]
+        self.elevations = MosaicArray(tiles, span, self._openTile)
+        self.span_latitude, self.span_longitude = self.elevations.shape
+        self.logger.info("Loading Mosaic: {} Tiles, Latitude span: {},"
+                         " Longitude span: {}, Resolution: {}"
+                         " ArcSec/point.".format(len(corners),
+                                                 self.span_latitude,
+                                                 self.span_longitude,
+                                                 arcsec_resolution))
+
+        self.datamap = DataMap(self.elevations,
+                               self.latitude,
+                               self.longitude,
+                               self.span_latitude,
+                               self.span_longitude,
+                               self.arcsec_resolution)
+
+    def _openTile(self, filename):
+        """
+        :param filename: .hgt file name.
+        :return: memory mapped elevations of the tile.
+        """
+        cache = None
+        if self.cacheDir:
+            cache = os.path.join(os.path.expanduser(self.cacheDir),
+                                 os.path.basename(filename) + '.npy')
+        return SRTMLoader(filename,
+                          arcsec_resolution=self.arcsec_resolution,
+                          span_latitude=self.span,
+                          span_longitude=self.span,
+                          memmap=True,
+                          cache=cache).elevations
 
 
 class ADFLoader(Loader):
@@ -80,18 +226,57 @@ class ADFLoader(Loader):
     Arc/Info Binary Grid (.adf)
     latitude/longitude should be from the Lower Left corner of the map. see
     USGS_NED_13_XXXXX_ArcGrid_meta.txt for these values.
+
+    The band is read in strips of its native blocks straight into the
+    elevation array, so peak memory is the size of the grid. Nodata
+    points read as `fill`.
     """
     def __init__(self, filename,
                  latitude, longitude,
-                 arcsec_resolution=1):
+                 arcsec_resolution=1,
+                 band=1,
+                 nodata=None,
+                 fill=0,
+                 lazy=False,
+                 cache=None):
+        """
+        :param filename: File name of the grid, or any other raster
+         GDAL can open.
+        :param latitude: latitude of the Lower Left corner.
+        :param longitude: longitude of the Lower Left corner.
+        :param arcsec_resolution: how many arcseconds per measurement unit.
+        :param band: number of the raster band to load, from 1.
+        :param nodata: elevation marking missing points. Defaults to the
+         band's own nodata value.
+        :param fill: elevation to use for nodata points.
+        :param lazy: don't read the grid in, read windows of it as they
+         are accessed instead. Meant for grids too large to fit in
+         memory, analyzed with ``Domain.run(tileSize=...)``.
+        :param cache: optional file name of a .npy copy of the band.
+         Written on first use (or when older than the grid) and memory
+         mapped from then on.
+        """
         super(ADFLoader, self).__init__(filename)
         self.latitude = latitude
         self.longitude = longitude
         self.arcsec_resolution = arcsec_resolution
 
-        gdal_raster = gdal.Open(self.filename)
-        self.elevations = numpy.array(gdal_raster.GetRasterBand(1).
-                                      ReadAsArray())
+        if gdal is None:
+            raise ImportError('ADFLoader needs GDAL, which is not'
+                              ' installed')
+        # The band is only valid while its dataset is open.
+        self.gdal_raster = gdal.Open(self.filename)
+        if self.gdal_raster is None:
+            raise IOError('GDAL cannot open {}'.format(self.filename))
+        self.band = BandArray(self.gdal_raster.GetRasterBand(band),
+                              nodata=nodata, fill=fill)
+        if lazy:
+            self.elevations = self.band
+        elif cache:
+            self.elevations = self._cache(os.path.expanduser(cache))
+        else:
+            self.elevations = self.band.copyTo(
+                numpy.empty(self.band.shape, dtype=self.band.dtype))
         self.span_latitude = int(self.elevations.shape[0])
         self.span_longitude = int(self.elevations.shape[1])
         self.logger.info("Loading: {} Latitude span: {}, Longitude span: {}"
@@ -107,3 +292,24 @@ class ADFLoader(Loader):
                                self.span_latitude,
                                self.span_longitude,
                                self.arcsec_resolution)
+
+    def _cache(self, cache):
+        """
+        Memory maps a .npy copy of the band, writing it first if needed.
+        :param cache: file name of the .npy cache.
+        :return: read only :class:`numpy.memmap` of elevations.
+        """
+        if not os.path.exists(cache) or \
+                os.path.getmtime(cache) < os.path.getmtime(self.filename):
+            self.logger.info("Writing cache: {}".format(cache))
+            copy = open_memmap(cache, mode='w+', dtype=self.band.dtype,
+                               shape=self.band.shape)
+            self.band.copyTo(copy)
+            copy.flush()
+            del copy
+        elevations = numpy.load(cache, mmap_mode='r')
+        if elevations.shape != self.band.shape:
+            raise ValueError('Cache {} has shape {}, expected'
+                             ' {}'.format(cache, elevations.shape,
+                                          self.band.shape))
+        return elevations
@@ -11,19 +11,27 @@ This library contains a class for creating a pyProm Domain.
 import os
 import time
 import json
+import numpy
 import logging
 
 from logic import AnalyzeData
+from tiling import TiledAnalyzeData
 from lib.datamap import DataMap
 from dataload import Loader
 from lib.containers.spot_elevation import SpotElevationContainer
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+from lib.metrics import Metrics
+from lib.jsonstream import JSONStreamReader, JSONStreamWriter
 from lib.locations.summit import Summit
 from lib.locations.saddle import Saddle
-from lib.locations.base_gridpoint import BaseGridPoint
 from lib.containers.multipoint import MultiPoint
 from lib.containers.gridpoint import GridPointContainer
 from lib.locations.gridpoint import GridPoint
 
+# Version of the :meth:`Domain.writeBinary` layout.
+BINARY_FORMAT_VERSION = 1
+
 
 class Domain(object):
     def __init__(self, data):
@@ -42,6 +50,7 @@ class Domain(object):
         self.saddles = None
         self.summits = None
         self.linkers = None
+        self.metrics = None
         self.extent = '{}, {} - {}, {}'.format(
             self.datamap.latitude,
             self.datamap.longitude,
@@ -50,81 +59,316 @@ class Domain(object):
         self.logger = logging.getLogger('pyProm.{}'.format(__name__))
         self.logger.info("Domain Object Created {}.".format(self.extent))
 
-    def run(self):
+    def run(self, workers=1, tileSize=None, compact=False, metrics=None):
         """
         Performs discovery of :class:`Saddle`, :class:`Summits`
         and :class:`Linkers`.
+        :param workers: number of processes to analyze with. None uses one
+         per cpu. Anything other than 1 analyzes the map in tiles.
+        :param tileSize: size (in points) of tiles for tiled analysis.
+         Passing this analyzes in tiles even with a single worker. Maps
+         which aren't numpy arrays (such as :class:`MosaicLoader` and
+         lazy :class:`ADFLoader` maps) are always analyzed in tiles, so
+         only a tile of them is read at a time.
+        :param compact: store results in
+         :class:`CompactSpotElevationContainer`s, which use far less
+         memory.
+        :param metrics: optional :class:`Metrics` to record into, a new
+         one is used otherwise. Kept as :attr:`metrics`.
+        :return: dict of counters, timers, histograms and memory use,
+         see :meth:`Metrics.report`
         """
+        self.metrics = metrics or Metrics()
         # Expunge any existing saddles, summits, and linkers
         self.saddles = SpotElevationContainer([])
         self.summits = SpotElevationContainer([])
         self.linkers = list()
-        self.summits, self.saddles = AnalyzeData(self.datamap).analyze()
+        with self.metrics.timer('run'):
+            if workers == 1 and tileSize is None and \
+                    isinstance(self.datamap.numpy_map, numpy.ndarray):
+                self.summits, self.saddles = AnalyzeData(
+                    self.datamap, self.metrics).analyze(compact=compact)
+            else:
+                self.summits, self.saddles = TiledAnalyzeData(
+                    self.datamap, workers=workers,
+                    tileSize=tileSize or 1024,
+                    metrics=self.metrics).analyze(compact=compact)
+        self.metrics.snapshot('run')
+        return self.metrics.report()
 
-    def read(self, filename):
+    def update(self, x, y, elevations):
         """
-        :param filename: name of file (including path) to write json data to
+        Writes `elevations` into the map and re-analyzes only the area
+        around them. Summits and saddles found from points within one
+        point of the change, or on equal height areas touching it, are
+        replaced. Linkers to replaced features, and linkers whose path
+        runs through the change, are dropped. New features are appended
+        to :attr:`summits` and :attr:`saddles`.
+
+        The map is edited in place, so it must be a writable numpy
+        array. Read only maps (memory mapped or cached
+        :class:`SRTMLoader` and :class:`ADFLoader` maps, lazy
+        :class:`ADFLoader` maps and :class:`MosaicLoader` maps) raise
+        a ValueError, load them into memory first.
+        :param x: x coordinate of the changed window.
+        :param y: y coordinate of the changed window.
+        :param elevations: 2d numpy array of the new elevations.
+        """
+        numpy_map = self.datamap.numpy_map
+        if not isinstance(numpy_map, numpy.ndarray) or \
+                not numpy_map.flags.writeable:
+            raise ValueError('The map is read only ({}), load it into a'
+                             ' writable numpy array to update it'.format(
+                                 type(numpy_map).__name__))
+        elevations = numpy.asarray(elevations)
+        xSpan, ySpan = numpy_map.shape
+        x1 = x + elevations.shape[0]
+        y1 = y + elevations.shape[1]
+        if x < 0 or y < 0 or x1 > xSpan or y1 > ySpan:
+            raise ValueError('Update window {}, {} - {}, {} is not inside'
+                             ' the map'.format(x, y, x1, y1))
+        # Points within one point of the change see new neighbors.
+        region = (max(x - 1, 0), max(y - 1, 0),
+                  min(x1 + 1, xSpan), min(y1 + 1, ySpan))
+        # Trace lazy paths while the map still holds the old elevations.
+        self._dropCrossingLinkers(region)
+        if self.summits is None:
+            numpy_map[x:x1, y:y1] = elevations
+            self.datamap.invalidateNeighbors()
+            return
+        self.logger.info("Updating {} x {} Points at {}, {}".format(
+            elevations.shape[0], elevations.shape[1], x, y))
+        tiler = TiledAnalyzeData(
+            self.datamap, workers=1,
+            tileSize=max(2 * max(x1 - x, y1 - y), 64))
+
+        # Features from before the change, anchored like the new ones.
+        before = tiler.regionRecords(*region)
+        latitudes = self.datamap.x_to_latitude_array(
+            [record.x for record in before]).tolist()
+        longitudes = self.datamap.y_to_longitude_array(
+            [record.y for record in before]).tolist()
+        for container in (self.summits, self.saddles):
+            stale = container.indicesAt(latitudes, longitudes).tolist()
+            if not stale:
+                continue
+            if not isinstance(container, CompactSpotElevationContainer):
+                self._dropLinkers([container.points[index]
+                                   for index in stale])
+            container.remove(stale)
+
+        numpy_map[x:x1, y:y1] = elevations
+        self.datamap.invalidateNeighbors()
+        after = tiler.regionRecords(*region)
+        builder = AnalyzeData(self.datamap)
+        latitudes = self.datamap.x_to_latitude_array(
+            [record.x for record in after]).tolist()
+        longitudes = self.datamap.y_to_longitude_array(
+            [record.y for record in after]).tolist()
+        for record, latitude, longitude in zip(after, latitudes,
+                                               longitudes):
+            feature = builder.buildFeature(record, latitude, longitude)
+            if isinstance(feature, Saddle):
+                self.saddles.append(feature)
+            else:
+                self.summits.append(feature)
+        self.logger.info("Replaced {} Features with {}".format(
+            len(before), len(after)))
+
+    def _dropLinkers(self, features):
+        """
+        Unhooks every :class:`Linker` of `features` from the features on
+        its other end, and from :attr:`linkers`.
+        :param features: list of :class:`Summit` and :class:`Saddle`
+        """
+        linkers = list()
+        for feature in features:
+            if isinstance(feature, Summit):
+                linkers.extend(feature.saddles)
+            elif isinstance(feature, Saddle):
+                linkers.extend(feature.summits)
+        self._unhookLinkers(linkers)
+
+    def _dropCrossingLinkers(self, region):
+        """
+        Drops every :class:`Linker` in :attr:`linkers` whose path runs
+        through `region`. Lazy paths are traced to check them.
+        :param region: (x0, y0, x1, y1) half open window of the map.
+        """
+        if not self.linkers:
+            return
+        x0, y0, x1, y1 = region
+        self._unhookLinkers(
+            [linker for linker in self.linkers
+             if any(x0 <= point.x < x1 and y0 <= point.y < y1
+                    for point in linker.path or [])])
+
+    def _unhookLinkers(self, linkers):
+        """
+        Unhooks `linkers` from the features on both of their ends, and
+        from :attr:`linkers`.
+        :param linkers: list of :class:`Linker`
+        """
+        dropped = set()
+        for linker in linkers:
+            dropped.add(id(linker))
+            if linker in linker.saddle.summits:
+                linker.saddle.summits.remove(linker)
+            if linker in linker.summit.saddles:
+                linker.summit.saddles.remove(linker)
+        if dropped and self.linkers:
+            self.linkers = [linker for linker in self.linkers
+                            if id(linker) not in dropped]
+
+    def read(self, filename, compact=False):
+        """
+        Reads a :class:`Domain` json file. Summits and saddles are
+        read one at a time, so the whole file is never held in memory.
+        :param filename: name of file (including path) to read json data from
+        :param compact: store the results in
+         :class:`CompactSpotElevationContainer`s
         """
         # Expunge any existing saddles, summits, and linkers
         filename = os.path.expanduser(filename)
-        incoming = open(filename, "r")
         self.logger.info("Loading {} into Domain Dataset.".format(filename))
-        self.saddles = SpotElevationContainer([])
-        self.summits = SpotElevationContainer([])
+        if compact:
+            self.saddles = CompactSpotElevationContainer(datamap=self.datamap)
+            self.summits = CompactSpotElevationContainer(datamap=self.datamap)
+        else:
+            self.saddles = SpotElevationContainer([])
+            self.summits = SpotElevationContainer([])
         self.linkers = list()
-        self.from_json(incoming.read())
-        incoming.close()
+        containers = {'summits': (self.summits, 'Summit'),
+                      'saddles': (self.saddles, 'Saddle')}
+        with open(filename, "r") as incoming:
+            for key, value in JSONStreamReader(incoming, containers):
+                if key in containers:
+                    container, otype = containers[key]
+                    container.append(self._featureFromDict(value, otype))
 
-    def write(self, filename):
+    def write(self, filename, prettyprint=True):
         """
-        :param filename: name of file (including path) to read json data from
+        Writes this :class:`Domain` as json. Summits and saddles are
+        written one at a time, so the whole document is never held
+        in memory.
+        :param filename: name of file (including path) to write json data to
+        :param prettyprint: human readable,
+         but takes more space when written to a file.
         """
         filename = os.path.expanduser(filename)
         self.logger.info("Writing Domain Dataset to {}.".format(filename))
-        outgoing = open(filename, "w")
-        outgoing.write(self.to_json())
-        outgoing.close()
+        with open(filename, "w") as outgoing:
+            writer = JSONStreamWriter(outgoing, prettyprint)
+            writer.member('date', time.strftime("%m-%d-%Y %H:%M:%S"))
+            writer.member('domain', self.extent)
+            writer.array('saddles', (x.to_dict(recurse=True)
+                                     for x in self.saddles))
+            writer.array('summits', (x.to_dict(recurse=True)
+                                     for x in self.summits))
+            writer.close()
 
-    def from_json(self, jsonString):
+    def writeBinary(self, filename):
         """
-        :param jsonString: json string of :class:`Domain` data
+        Writes summits and saddles as typed numpy arrays (.npz), see
+        :class:`CompactSpotElevationContainer` for the columns. Reload
+        with :meth:`readBinary`.
+        :param filename: name of file (including path) to write data to
         """
-        hash = json.loads(jsonString)
+        filename = os.path.expanduser(filename)
+        self.logger.info("Writing Binary Domain Dataset to"
+                         " {}.".format(filename))
+        arrays = {'format': numpy.array([BINARY_FORMAT_VERSION]),
+                  'domain': numpy.array(self.extent),
+                  'date': numpy.array(time.strftime("%m-%d-%Y %H:%M:%S"))}
+        for prefix, container in (('summits.', self.summits),
+                                  ('saddles.', self.saddles)):
+            if not isinstance(container, CompactSpotElevationContainer):
+                container = CompactSpotElevationContainer(
+                    container, datamap=self.datamap)
+            arrays.update(container.toArrays(prefix))
+        with open(filename, "wb") as outgoing:
+            numpy.savez(outgoing, **arrays)
 
-        def _loader(point, otype):
+    def readBinary(self, filename, compact=True, summits=True, saddles=True,
+                   multipoints=True, highShores=True):
+        """
+        Reads a file written by :meth:`writeBinary`. Only the arrays
+        asked for are read from the file.
+        :param filename: name of file (including path) to read data from
+        :param compact: keep the results in
+         :class:`CompactSpotElevationContainer`s. Otherwise every feature
+         is built as an object.
+        :param summits: load summits.
+        :param saddles: load saddles.
+        :param multipoints: load :class:`MultiPoint` points.
+        :param highShores: load high shores.
+        """
+        filename = os.path.expanduser(filename)
+        self.logger.info("Loading Binary {} into Domain"
+                         " Dataset.".format(filename))
+        self.linkers = list()
+        with numpy.load(filename) as arrays:
+            version = int(arrays['format'][0])
+            if version != BINARY_FORMAT_VERSION:
+                raise ValueError('Cannot read binary Domain format'
+                                 ' {}'.format(version))
+            for prefix, wanted in (('summits', summits),
+                                   ('saddles', saddles)):
+                if wanted:
+                    container = CompactSpotElevationContainer.fromArrays(
+                        arrays, prefix + '.', self.datamap,
+                        multipoints=multipoints, highShores=highShores)
+                    if not compact:
+                        container = SpotElevationContainer(list(container))
+                elif compact:
+                    container = CompactSpotElevationContainer(
+                        datamap=self.datamap)
+                else:
+                    container = SpotElevationContainer([])
+                setattr(self, prefix, container)
 
-            if otype == 'Summit':
-                feature = Summit(point['latitude'],
-                                 point['longitude'],
-                                 point['elevation'])
-            elif otype == 'Saddle':
-                feature = Saddle(point['latitude'],
-                                 point['longitude'],
-                                 point['elevation'])
-            else:
-                raise Exception('Cannot import unknown type:'.format(otype))
-            mpPoints = list()
-            if point.get('multipoint', None):
-                for mp in point['multipoint']:
-                    mpPoints.append(BaseGridPoint(mp['gridpoint']['x'],
-                                                  mp['gridpoint']['y']))
-                feature.multiPoint = MultiPoint(mpPoints,
-                                                point['elevation'],
-                                                self.datamap)
-            if point.get('highShores', None):
-                feature.highShores = list()
-                for hs in point['highShores']:
-                    feature.highShores.append(
-                        GridPointContainer(
-                            [GridPoint(x['x'], x['y'], x['elevation'])
-                             for x in hs]))
-            feature.edgeEffect = point['edge']
-            return feature
+    def _featureFromDict(self, point, otype):
+        """
+        :param point: dict of a :class:`Summit` or :class:`Saddle`
+        :param otype: Object type (as String). ex: Saddle, Summit
+        :return: :class:`Summit` or :class:`Saddle`
+        """
+        if otype == 'Summit':
+            feature = Summit(point['latitude'],
+                             point['longitude'],
+                             point['elevation'])
+        elif otype == 'Saddle':
+            feature = Saddle(point['latitude'],
+                             point['longitude'],
+                             point['elevation'])
+        else:
+            raise Exception('Cannot import unknown type:'.format(otype))
+        if point.get('multipoint', None):
+            mpX = [mp['gridpoint']['x'] for mp in point['multipoint']]
+            mpY = [mp['gridpoint']['y'] for mp in point['multipoint']]
+            feature.multiPoint = MultiPoint(None,
+                                            point['elevation'],
+                                            self.datamap,
+                                            cells=(mpX, mpY))
+        if point.get('highShores', None):
+            feature.highShores = list()
+            for hs in point['highShores']:
+                feature.highShores.append(
+                    GridPointContainer(
+                        [GridPoint(x['x'], x['y'], x['elevation'])
+                         for x in hs]))
+        feature.edgeEffect = point['edge']
+        return feature
 
+    def from_json(self, jsonString):
+        """
+        :param jsonString: json string of :class:`Domain` data
+        """
+        hash = json.loads(jsonString)
         self.summits = SpotElevationContainer(
-            [_loader(x, 'Summit') for x in hash['summits']])
+            [self._featureFromDict(x, 'Summit') for x in hash['summits']])
         self.saddles = SpotElevationContainer(
-            [_loader(x, 'Saddle') for x in hash['saddles']])
+            [self._featureFromDict(x, 'Saddle') for x in hash['saddles']])
         # self.linkers = ????
 
     def to_json(self, prettyprint=True):
@@ -158,8 +402,8 @@ class Domain(object):
         return "<Domain> Lat/Long Extent {} Saddles " \
                "{} Summits {} Linkers {}".format(
                     self.extent,
-                    len(self.saddles.points),
-                    len(self.summits.points),
+                    len(self.saddles),
+                    len(self.summits),
                     len(self.linkers))
 
     __unicode__ = __str__ = __repr__
@@ -0,0 +1,68 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a set of raster points, used to mark points which
+are exempt from analysis.
+"""
+
+import numpy
+
+
+class CellSet(object):
+    """
+    Set of raster points with O(1) add and membership tests. Points one
+    step off the raster (x or y of -1 or max + 1, like off map shore
+    points) are allowed.
+
+    Points are kept in a bitmap of the whole raster, one bit per point,
+    allocated on the first add.
+    :param shape: (xSpan, ySpan) of the raster.
+    """
+    def __init__(self, shape):
+        super(CellSet, self).__init__()
+        self.shape = tuple(shape)
+        self.ySpan = self.shape[1] + 2
+        self.bits = None
+
+    def _index(self, x, y):
+        """
+        :return: packed index of x, y
+        """
+        return (x + 1) * self.ySpan + y + 1
+
+    def addMany(self, xs, ys):
+        """
+        :param xs: numpy array of x coordinates
+        :param ys: numpy array of y coordinates
+        """
+        if self.bits is None:
+            self.bits = numpy.zeros(
+                ((self.shape[0] + 2) * self.ySpan + 7) // 8,
+                dtype=numpy.uint8)
+        indices = self._index(numpy.asarray(xs, dtype=numpy.int64),
+                              numpy.asarray(ys, dtype=numpy.int64))
+        numpy.bitwise_or.at(self.bits, indices >> 3,
+                            numpy.left_shift(1, indices & 7)
+                            .astype(numpy.uint8))
+
+    def __contains__(self, point):
+        """
+        :param point: (x, y) tuple
+        """
+        if self.bits is None:
+            return False
+        index = self._index(point[0], point[1])
+        return bool((self.bits[index >> 3] >> (index & 7)) & 1)
+
+    def __len__(self):
+        if self.bits is None:
+            return 0
+        return int(numpy.count_nonzero(numpy.unpackbits(self.bits)))
+
+    def __repr__(self):
+        return "<CellSet> {} Points".format(len(self))
+
+    __unicode__ = __str__ = __repr__
@@ -12,6 +12,10 @@ type location objects.
 class BaseGridPointContainer(object):
     """
     Base Grid Point Container.
+
+    Containers compare by the x values of their points, in any order.
+    :attr:`fingerprint` summarizes them so unequal containers are told
+    apart without sorting.
     """
     def __init__(self, gridPointList):
         """
@@ -20,16 +24,60 @@ class BaseGridPointContainer(object):
         super(BaseGridPointContainer, self).__init__()
         self.points = gridPointList
 
+    @property
+    def points(self):
+        """
+        :return: list of :class:`GridPoint`s
+        """
+        return self._points
+
+    @points.setter
+    def points(self, gridPointList):
+        self._points = gridPointList
+        self._fingerprint = None
+
+    def append(self, point):
+        """
+        :param point: :class:`GridPoint` to add to this container.
+        """
+        count, total, squares = self.fingerprint
+        self._points.append(point)
+        self._fingerprint = (count + 1, total + point.x,
+                             squares + point.x * point.x)
+
+    @property
+    def fingerprint(self):
+        """
+        Order independent summary of the x values of the points: (count,
+        sum, sum of squares). Kept up to date by :meth:`append`, and
+        rebuilt when the number of points changes behind its back. Only
+        moving points in place goes unnoticed, assign :attr:`points`
+        after doing that.
+        :return: tuple
+        """
+        if self._fingerprint is None or \
+                self._fingerprint[0] != len(self._points):
+            xs = [point.x for point in self._points]
+            self._fingerprint = (len(xs), sum(xs),
+                                 sum(x * x for x in xs))
+        return self._fingerprint
+
     def __hash__(self):
-        return hash(tuple(sorted([x.x for x in self.points])))
+        return hash(self.fingerprint)
 
     def __eq__(self, other):
+        if not isinstance(other, BaseGridPointContainer):
+            return NotImplemented
+        if self.fingerprint != other.fingerprint:
+            return False
         return sorted([x.x for x in self.points]) == \
-               sorted([x.x for x in other.points])
+            sorted([x.x for x in other.points])
 
     def __ne__(self, other):
-        return sorted([x.x for x in self.points]) == \
-               sorted([x.x for x in other.points])
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
 
     def __repr__(self):
         return "<BaseGridPointContainer> {} Objects".format(len(self.points))
@@ -0,0 +1,428 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a container class which stores SpotElevation
+type location objects as columns of numpy arrays.
+"""
+import numpy
+from array import array
+
+from ..spatial_index import GridIndex
+from ..locations.saddle import Saddle
+from ..locations.summit import Summit
+from ..locations.spot_elevation import SpotElevation
+from ..locations.gridpoint import GridPoint
+from .multipoint import MultiPoint
+from .gridpoint import GridPointContainer
+from .spot_elevation import SpotElevationContainer
+
+# Stored type codes, index into KINDS.
+KINDS = (SpotElevation, Summit, Saddle)
+
+# Stored edge flag for an unknown edge effect.
+EDGE_NONE = -1
+
+# Features are packed into columns this many at a time.
+PACK_CHUNK = 4096
+
+# Optional column groups, see :meth:`CompactSpotElevationContainer.fromArrays`
+MULTIPOINT_COLUMNS = ('cellOffsets', 'cellX', 'cellY')
+HIGHSHORE_COLUMNS = ('shoreOffsets', 'pointOffsets', 'shoreX', 'shoreY',
+                     'shoreElevation')
+
+# (name, dtype) of every column. Offset columns hold one more entry than
+# the rows they index. Keep this order, binary saves are laid out by it.
+COLUMNS = (('latitude', numpy.float64),
+           ('longitude', numpy.float64),
+           ('elevation', numpy.float64),
+           ('kind', numpy.int8),
+           ('edge', numpy.int8),
+           ('cellOffsets', numpy.int64),
+           ('cellX', numpy.int32),
+           ('cellY', numpy.int32),
+           ('shoreOffsets', numpy.int64),
+           ('pointOffsets', numpy.int64),
+           ('shoreX', numpy.int32),
+           ('shoreY', numpy.int32),
+           ('shoreElevation', numpy.float64))
+
+
+def _gather(offsets, indices):
+    """
+    Picks ragged rows out of an offset indexed column.
+    :param offsets: numpy array, row i is values[offsets[i]:offsets[i+1]]
+    :param indices: numpy array of rows to pick.
+    :return: (newOffsets, positions) the offsets of the picked rows and
+     the positions of their values in the old column.
+    """
+    lengths = offsets[indices + 1] - offsets[indices]
+    newOffsets = numpy.zeros(len(indices) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=newOffsets[1:])
+    positions = numpy.repeat(offsets[indices] - newOffsets[:-1], lengths) + \
+        numpy.arange(newOffsets[-1], dtype=numpy.int64)
+    return newOffsets, positions
+
+
+class CompactSpotElevationContainer(SpotElevationContainer):
+    """
+    Container for Spot Elevation type lists, stored as parallel numpy
+    arrays rather than a list of objects.
+    :class:`Summit`, :class:`Saddle` and :class:`SpotElevation` objects
+    are materialized on demand from :attr:`points`, iteration or indexing.
+    Those are fresh objects on every access, so changes made to them are
+    not stored, and :attr:`points` is a read only tuple. Assign to
+    :attr:`points` to replace the contents, or use :meth:`append` and
+    :meth:`remove`.
+
+    Stored per feature: latitude, longitude, elevation, type, edge effect,
+    :class:`MultiPoint` x/y points and high shore x/y/elevation points.
+    Linking data (`Summit.saddles`, `Saddle.summits`, ...) and
+    :class:`InverseEdgePoint` shores are not kept.
+    :param spotElevationList: iterable of :class:`SpotElevation`s. This
+     is consumed one feature at a time, so can be a generator.
+    :param datamap: :class:`Datamap` object used to rebuild
+     :class:`MultiPoint`s. Taken from the first :class:`MultiPoint` if
+     not given.
+    """
+    def __init__(self, spotElevationList=(), datamap=None):
+        self.datamap = datamap
+        super(CompactSpotElevationContainer, self).__init__(
+            spotElevationList)
+
+    @property
+    def points(self):
+        """
+        :return: tuple of materialized :class:`SpotElevation`s
+        """
+        return tuple(self[index] for index in range(len(self)))
+
+    @points.setter
+    def points(self, spotElevationList):
+        for name, dtype in COLUMNS:
+            setattr(self, name, numpy.zeros(int(name.endswith('Offsets')),
+                                            dtype=dtype))
+        self._pending = list()
+        self._chunks = list()
+        self._fingerprint = None
+        self.invalidateIndex()
+        for point in spotElevationList:
+            self.append(point)
+        self._flush()
+
+    def append(self, point):
+        """
+        Adds one feature. Features are packed in chunks, so they are
+        only held as objects briefly.
+        :param point: :class:`SpotElevation`
+        """
+        self._updateFingerprint([point])
+        self._pending.append(point)
+        if len(self._pending) >= PACK_CHUNK:
+            self._chunks.append(self._pack(self._pending))
+            self._pending = list()
+
+    def remove(self, indices):
+        """
+        :param indices: iterable of indices of features to remove from
+         this container.
+        """
+        self._flush()
+        indices = numpy.unique(numpy.asarray(list(indices),
+                                             dtype=numpy.int64))
+        self._updateFingerprint([self[index] for index in indices], -1)
+        keep = numpy.ones(len(self), dtype=bool)
+        keep[indices] = False
+        subset = self._subset(keep)
+        for name, _ in COLUMNS:
+            setattr(self, name, getattr(subset, name))
+        self.invalidateIndex()
+
+    def _flush(self):
+        """
+        Packs any features added with :meth:`append` into the columns.
+        """
+        if self._pending:
+            self._chunks.append(self._pack(self._pending))
+            self._pending = list()
+        if not self._chunks:
+            return
+        chunks = [dict((name, getattr(self, name)) for name, _ in COLUMNS)]
+        # Offsets of the new rows continue from the previous ones.
+        cells = len(self.cellX)
+        shores = len(self.pointOffsets) - 1
+        points = len(self.shoreX)
+        for chunk in self._chunks:
+            chunk['cellOffsets'] = chunk['cellOffsets'][1:] + cells
+            chunk['shoreOffsets'] = chunk['shoreOffsets'][1:] + shores
+            chunk['pointOffsets'] = chunk['pointOffsets'][1:] + points
+            cells += len(chunk['cellX'])
+            shores += len(chunk['pointOffsets'])
+            points += len(chunk['shoreX'])
+            chunks.append(chunk)
+        self._chunks = list()
+        for name, _ in COLUMNS:
+            setattr(self, name, numpy.concatenate([chunk[name]
+                                                   for chunk in chunks]))
+
+    def _pack(self, spotElevationList):
+        """
+        Packs features into columns.
+        :param spotElevationList: list of :class:`SpotElevation`s
+        :return: dict of numpy arrays, see :const:`COLUMNS`
+        """
+        latitude = array('d')
+        longitude = array('d')
+        elevation = array('d')
+        kind = array('b')
+        edge = array('b')
+        cellOffsets = [0]
+        cellX = array('l')
+        cellY = array('l')
+        shoreOffsets = [0]
+        pointOffsets = [0]
+        shoreX = array('l')
+        shoreY = array('l')
+        shoreElevation = array('d')
+        for feature in spotElevationList:
+            latitude.append(feature.latitude)
+            longitude.append(feature.longitude)
+            elevation.append(feature.elevation)
+            kind.append(KINDS.index(type(feature)))
+            if feature.edgeEffect is None:
+                edge.append(EDGE_NONE)
+            else:
+                edge.append(bool(feature.edgeEffect))
+            multiPoint = getattr(feature, 'multiPoint', None)
+            if multiPoint:
+                if self.datamap is None:
+                    self.datamap = multiPoint.datamap
+                xs, ys = multiPoint.cells()
+                cellX.extend(xs.tolist())
+                cellY.extend(ys.tolist())
+            cellOffsets.append(len(cellX))
+            for highShore in getattr(feature, 'highShores', None) or []:
+                for point in highShore.points:
+                    shoreX.append(point.x)
+                    shoreY.append(point.y)
+                    shoreElevation.append(point.elevation)
+                pointOffsets.append(len(shoreX))
+            shoreOffsets.append(len(pointOffsets) - 1)
+        columns = {'latitude': latitude,
+                   'longitude': longitude,
+                   'elevation': elevation,
+                   'kind': kind,
+                   'edge': edge,
+                   'cellOffsets': cellOffsets,
+                   'cellX': cellX,
+                   'cellY': cellY,
+                   'shoreOffsets': shoreOffsets,
+                   'pointOffsets': pointOffsets,
+                   'shoreX': shoreX,
+                   'shoreY': shoreY,
+                   'shoreElevation': shoreElevation}
+        return dict((name, numpy.array(columns[name], dtype=dtype))
+                    for name, dtype in COLUMNS)
+
+    def toArrays(self, prefix=''):
+        """
+        :param prefix: prefix for the array names.
+        :return: dict of all columns by (prefixed) name, suitable for
+         :func:`numpy.savez`
+        """
+        self._flush()
+        return dict((prefix + name, getattr(self, name))
+                    for name, _ in COLUMNS)
+
+    @classmethod
+    def fromArrays(cls, arrays, prefix='', datamap=None, multipoints=True,
+                   highShores=True):
+        """
+        :param arrays: mapping of columns by (prefixed) name, for instance
+         a :class:`numpy.lib.npyio.NpzFile`. Only the columns needed are
+         read from it.
+        :param prefix: prefix for the array names.
+        :param datamap: :class:`Datamap` object used to rebuild
+         :class:`MultiPoint`s.
+        :param multipoints: load :class:`MultiPoint` points.
+        :param highShores: load high shores.
+        :return: :class:`CompactSpotElevationContainer`
+        """
+        container = cls(datamap=datamap)
+        skipped = set()
+        if not multipoints:
+            skipped.update(MULTIPOINT_COLUMNS)
+        if not highShores:
+            skipped.update(HIGHSHORE_COLUMNS)
+        count = None
+        for name, dtype in COLUMNS:
+            if name in skipped:
+                continue
+            column = numpy.asarray(arrays[prefix + name], dtype=dtype)
+            setattr(container, name, column)
+            if count is None:
+                count = len(column)
+        # Skipped columns read as features without multipoints/shores.
+        for name in skipped:
+            if name.endswith('Offsets'):
+                size = count + 1 if name in ('cellOffsets',
+                                             'shoreOffsets') else 1
+                column = numpy.zeros(size, dtype=numpy.int64)
+            else:
+                column = numpy.zeros(0, dtype=dict(COLUMNS)[name])
+            setattr(container, name, column)
+        return container
+
+    def spatialIndex(self):
+        """
+        :return: :class:`GridIndex` of all points, built on first use
+         and cached.
+        """
+        self._flush()
+        if self._spatialIndex is None or \
+                self._spatialIndex.size != len(self):
+            self._spatialIndex = GridIndex(self.latitude, self.longitude)
+        return self._spatialIndex
+
+    def _fingerprintPoints(self):
+        """
+        :return: generator of plain :class:`SpotElevation`s, which hash
+         like the features without building their multipoints and
+         shores.
+        """
+        self._flush()
+        for latitude, longitude, elevation in zip(
+                self.latitude.tolist(), self.longitude.tolist(),
+                self.elevation.tolist()):
+            yield SpotElevation(latitude, longitude, elevation)
+
+    def _select(self, indices):
+        """
+        :param indices: numpy array of point indices.
+        :return: CompactSpotElevationContainer of those points.
+        """
+        return self._subset(numpy.asarray(indices, dtype=numpy.int64))
+
+    def _subset(self, indices):
+        """
+        :param indices: numpy array of feature indices, or a boolean mask.
+        :return: :class:`CompactSpotElevationContainer` of those features.
+        """
+        self._flush()
+        indices = numpy.arange(len(self))[indices]
+        subset = CompactSpotElevationContainer(datamap=self.datamap)
+        subset.latitude = self.latitude[indices]
+        subset.longitude = self.longitude[indices]
+        subset.elevation = self.elevation[indices]
+        subset.kind = self.kind[indices]
+        subset.edge = self.edge[indices]
+        subset.cellOffsets, cells = _gather(self.cellOffsets, indices)
+        subset.cellX = self.cellX[cells]
+        subset.cellY = self.cellY[cells]
+        subset.shoreOffsets, shores = _gather(self.shoreOffsets, indices)
+        subset.pointOffsets, points = _gather(self.pointOffsets, shores)
+        subset.shoreX = self.shoreX[points]
+        subset.shoreY = self.shoreY[points]
+        subset.shoreElevation = self.shoreElevation[points]
+        return subset
+
+    def byType(self, string):
+        """
+        :param string: Object type (as String). ex: Saddle, Summit
+        :return: CompactSpotElevationContainer of objects by type.
+        """
+        name = string.upper()
+        codes = [code for code, kind in enumerate(KINDS)
+                 if kind.__name__.upper() == name]
+        self._flush()
+        return self._subset(numpy.isin(self.kind, codes))
+
+    def elevationRange(self, lower=-100000, upper=100000):
+        """
+        :param lower: lower limit in feet
+        :param upper: upper limit in feet
+        :return: CompactSpotElevationContainer of all points in range
+         between lower and upper
+        """
+        self._flush()
+        feet = self.elevation * 3.2808
+        return self._subset((feet > lower) & (feet < upper))
+
+    def elevationRangeMetric(self, lower=-100000, upper=100000):
+        """
+        :param lower: lower limit in Meters
+        :param upper: upper limit in Meters
+        :return: CompactSpotElevationContainer of all points in range
+         between lower and upper
+        """
+        self._flush()
+        return self._subset((self.elevation > lower) &
+                            (self.elevation < upper))
+
+    def from_json(self, jsonData, datamap):
+        """
+        :param jsonData: json string of data to be loaded in this container
+        :param datamap:
+        :return:
+        """
+        container = SpotElevationContainer([])
+        container.from_json(jsonData, datamap)
+        self.datamap = datamap
+        self.points = container.points
+
+    def __getitem__(self, index):
+        """
+        :param index: feature index.
+        :return: materialized :class:`SpotElevation`
+        """
+        self._flush()
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('index {} out of range'.format(index))
+        elevation = float(self.elevation[index])
+        feature = KINDS[self.kind[index]](float(self.latitude[index]),
+                                          float(self.longitude[index]),
+                                          elevation)
+        edge = self.edge[index]
+        feature.edgeEffect = None if edge == EDGE_NONE else bool(edge)
+        start, end = self.cellOffsets[index:index + 2]
+        if end > start:
+            feature.multiPoint = MultiPoint(
+                None, elevation, self.datamap,
+                cells=(self.cellX[start:end], self.cellY[start:end]))
+        start, end = self.shoreOffsets[index:index + 2]
+        if end > start:
+            feature.highShores = list()
+            for shore in range(start, end):
+                first, last = self.pointOffsets[shore:shore + 2]
+                feature.highShores.append(GridPointContainer(
+                    [GridPoint(int(x), int(y), float(shoreElevation))
+                     for x, y, shoreElevation in
+                     zip(self.shoreX[first:last],
+                         self.shoreY[first:last],
+                         self.shoreElevation[first:last])]))
+        return feature
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.latitude) + len(self._pending) + \
+            sum(len(chunk['latitude']) for chunk in self._chunks)
+
+    @property
+    def nbytes(self):
+        """
+        :return: bytes used by the columns.
+        """
+        self._flush()
+        return sum(getattr(self, name).nbytes for name, _ in COLUMNS)
+
+    def __repr__(self):
+        return "<CompactSpotElevationContainer> {} Objects".format(len(self))
+
+    __unicode__ = __str__ = __repr__
@@ -7,8 +7,13 @@ the LICENSE file that accompanies it.
 This library contains a base container class for storing GridPoint
 type location objects.
 """
+import numpy
 from collections import defaultdict
+
 from .gridpoint import GridPointContainer
+from ..shore import highGroups
+from ..neighbor_profile import OFF_MAP
+from ..locations.inverse_edgepoint import InverseEdgePoint
 
 
 class InverseEdgePointContainer(object):
@@ -71,36 +76,16 @@ class InverseEdgePointContainer(object):
 
     def findHighEdges(self, elevation):
         """
-        Hopefully a way more efficient way of finding high edges.
-        :return:
+        Groups the high points of the shore into connected high edges.
+        :param elevation: elevation of the equal height area.
+        :return: list of :class:`GridPointContainer`, one per high edge.
         """
-        purgedIndex = defaultdict(list)
-        highLists = list()
-        for point in self.points:
-            if point.y in purgedIndex[point.x]:
-                continue
-            if point.elevation > elevation:
-                toBeAnalyzed = [point]
-                highList = list()
-                while True:
-                    if not toBeAnalyzed:
-                        highLists.append(highList)
-                        break
-                    try:
-                        gridPoint = toBeAnalyzed.pop()
-                    except:
-                        highLists.append(highList)
-                        break
-                    purgedIndex[gridPoint.x].append(gridPoint.y)
-                    highList.append(gridPoint)
-                    neighbors = [x for x in
-                                 self.iterNeighborDiagonal(gridPoint)
-                                 if x.elevation > elevation and
-                                 x.y not in purgedIndex[x.x]]
-                    toBeAnalyzed += neighbors
-            else:
-                purgedIndex[point.x].append(point.y)
-        return [GridPointContainer(x) for x in highLists]
+        xs = numpy.array([point.x for point in self.points], dtype=int)
+        ys = numpy.array([point.y for point in self.points], dtype=int)
+        elevations = numpy.array([point.elevation for point in self.points],
+                                 dtype=float)
+        return [GridPointContainer([self.points[index] for index in group])
+                for group in highGroups(xs, ys, elevations, elevation)]
 
     def __repr__(self):
         return "<InverseEdgePointContainer>" \
@@ -111,3 +96,27 @@ class InverseEdgePointContainer(object):
             yield inverseEdgePoint
 
     __unicode__ = __str__ = __repr__
+
+
+def shoreToInverseEdgePoints(xs, ys, elevations, datamap, mapEdge=False):
+    """
+    :param xs: numpy array of shore x coordinates.
+    :param ys: numpy array of shore y coordinates.
+    :param elevations: numpy array of shore elevations.
+    :param datamap: :class:`DataMap` object.
+    :param mapEdge: (bool) does the shore touch the edge of the map?
+    :return: :class:`InverseEdgePointContainer`
+    """
+    def nesteddict():
+        return defaultdict(nesteddict)
+    inverseEdgeHash = nesteddict()
+    for x, y, elevation in zip(xs, ys, elevations):
+        x = int(x)
+        y = int(y)
+        if 0 <= x <= datamap.max_x and 0 <= y <= datamap.max_y:
+            elevation = float(elevation)
+        else:
+            elevation = OFF_MAP
+        inverseEdgeHash[x][y] = InverseEdgePoint(x, y, elevation)
+    return InverseEdgePointContainer(inverseEdgePointIndex=inverseEdgeHash,
+                                     datamap=datamap, mapEdge=mapEdge)
@@ -15,7 +15,9 @@ class Linker(object):
     Allows for various list transformations.
     :param summit:
     :param saddle:
-    :param path
+    :param path: list of points from the saddle to the summit, or a
+     function returning that list, which is only called when the path
+     is first used.
     """
     def __init__(self, summit, saddle, path):
         self.summit = summit
@@ -23,6 +25,16 @@ class Linker(object):
         self.path = path
         self.disqualified = False
 
+    @property
+    def path(self):
+        if callable(self._path):
+            self._path = self._path()
+        return self._path
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
     @property
     def prom(self):
         return self.summit.elevation - self.saddle.elevation
@@ -8,7 +8,76 @@ This library contains a container class for storing Multipoint
 type location objects as well as a number of functions.
 """
 import json
+import numpy
+
 from ..locations.base_coordinate import BaseCoordinate
+from ..locations.base_gridpoint import BaseGridPoint
+from .inverse_edgepoint import shoreToInverseEdgePoints
+
+
+class PackedCells(object):
+    """
+    Compact store of a set of raster points, in row major order. Points
+    are kept relative to their bounding box, either as an array of
+    packed indices or, when it is smaller, as runs of consecutive
+    indices (a run length encoded mask of the bounding box). Both use
+    the smallest unsigned integer type the bounding box allows.
+    :param xs: numpy array of x coordinates.
+    :param ys: numpy array of y coordinates.
+    """
+    def __init__(self, xs, ys):
+        super(PackedCells, self).__init__()
+        xs = numpy.asarray(xs, dtype=numpy.int64)
+        ys = numpy.asarray(ys, dtype=numpy.int64)
+        self.count = len(xs)
+        self.x = int(xs.min()) if self.count else 0
+        self.y = int(ys.min()) if self.count else 0
+        self.width = int(ys.max()) - self.y + 1 if self.count else 1
+        indices = numpy.sort((xs - self.x) * self.width + ys - self.y)
+        dtype = numpy.min_scalar_type(int(indices[-1]) + 1 if self.count
+                                      else 0)
+        starts = numpy.ones(self.count, dtype=bool)
+        starts[1:] = numpy.diff(indices) != 1
+        starts = numpy.flatnonzero(starts)
+        if 2 * len(starts) < self.count:
+            self.indices = indices[starts].astype(dtype)
+            self.lengths = numpy.diff(numpy.append(starts, self.count)) \
+                .astype(dtype)
+        else:
+            self.indices = indices.astype(dtype)
+            self.lengths = None
+
+    def xy(self):
+        """
+        :return: (x, y) numpy arrays of all points, row major order.
+        """
+        indices = self.indices.astype(numpy.int64)
+        if self.lengths is not None:
+            lengths = self.lengths.astype(numpy.int64)
+            # Offset of every point from the start of its run.
+            offsets = numpy.arange(self.count) - numpy.repeat(
+                numpy.cumsum(lengths) - lengths, lengths)
+            indices = numpy.repeat(indices, lengths) + offsets
+        xs, ys = numpy.divmod(indices, self.width)
+        return xs + self.x, ys + self.y
+
+    @property
+    def nbytes(self):
+        """
+        :return: bytes used by the encoded points.
+        """
+        if self.lengths is None:
+            return self.indices.nbytes
+        return self.indices.nbytes + self.lengths.nbytes
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "<PackedCells> {} Points, {}".format(
+            self.count, 'Runs' if self.lengths is not None else 'Indices')
+
+    __unicode__ = __str__ = __repr__
 
 
 class MultiPoint(object):
@@ -17,22 +86,105 @@ class MultiPoint(object):
     provides a number of functions for analysis of these blob like
     locations. An Example of this would be a pond. This object in
     contains a list of all the points of this pond.
-    :param points: list of BaseGridPoint objects
+
+    Points can be stored as :class:`PackedCells` instead of a list, in
+    which case :attr:`points` builds a tuple of :class:`BaseGridPoint`
+    objects each time it is read, so packed points can only be changed
+    by assigning to :attr:`points` or with :meth:`append`. The shore can
+    be kept as arrays which are only turned into
+    :attr:`inverseEdgePoints` when first read.
+    :param points: list of BaseGridPoint objects, or None if `cells` is
+     passed.
     :param elevation: elevation in meters
     :param datamap: :class:`Datamap` object.
     :param edgePoints: :class:`EdgePointContainer` object
     :param inverseEdgePoints: :class:`InverseEdgePointContainer` object
+    :param cells: (x, y) numpy arrays of all points, stored packed.
+    :param shore: (x, y, elevation) numpy arrays of the shore, used to
+     build :attr:`inverseEdgePoints` on demand.
+    :param mapEdge: (bool) does the shore touch the edge of the map?
     """
     def __init__(self, points, elevation, datamap,
-                 edgePoints=None, inverseEdgePoints=None):
+                 edgePoints=None, inverseEdgePoints=None,
+                 cells=None, shore=None, mapEdge=False):
         super(MultiPoint, self).__init__()
-        self.points = points  # BaseGridPoint Object.
+        self._points = points  # BaseGridPoint Object.
+        self._cells = None
+        if points is None and cells is not None:
+            self._cells = PackedCells(*cells)
         self.elevation = elevation
         self.datamap = datamap  # data analysis object.
         self.edgePoints = edgePoints
-        self.inverseEdgePoints = inverseEdgePoints
+        self._inverseEdgePoints = inverseEdgePoints
+        self._shore = None
+        if inverseEdgePoints is None and shore is not None:
+            xs, ys, elevations = shore
+            self._shore = (numpy.asarray(xs, dtype=numpy.int32),
+                           numpy.asarray(ys, dtype=numpy.int32),
+                           numpy.asarray(elevations), mapEdge)
         self.mapEdge = []
 
+    @property
+    def points(self):
+        """
+        :return: list of :class:`BaseGridPoint`. When the points are
+         stored packed this is a read only tuple, built on every read.
+        """
+        if self._points is not None:
+            return self._points
+        if self._cells is None:
+            return tuple()
+        xs, ys = self._cells.xy()
+        return tuple(BaseGridPoint(x, y) for x, y in zip(xs.tolist(),
+                                                         ys.tolist()))
+
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self._cells = None
+
+    def append(self, point):
+        """
+        Adds a point, keeping packed points packed.
+        :param point: :class:`BaseGridPoint`
+        """
+        if self._points is not None:
+            self._points.append(point)
+            return
+        xs, ys = self.cells()
+        self._cells = PackedCells(numpy.append(xs, point.x),
+                                  numpy.append(ys, point.y))
+
+    def cells(self):
+        """
+        :return: (x, y) numpy arrays of all points, without building
+         :class:`BaseGridPoint` objects for packed points.
+        """
+        if self._points is None and self._cells is not None:
+            return self._cells.xy()
+        return (numpy.array([point.x for point in self.points],
+                            dtype=numpy.int64),
+                numpy.array([point.y for point in self.points],
+                            dtype=numpy.int64))
+
+    @property
+    def inverseEdgePoints(self):
+        """
+        :return: :class:`InverseEdgePointContainer`, built from the shore
+         on first read.
+        """
+        if self._inverseEdgePoints is None and self._shore is not None:
+            xs, ys, elevations, mapEdge = self._shore
+            self._inverseEdgePoints = shoreToInverseEdgePoints(
+                xs, ys, elevations, self.datamap, mapEdge)
+            self._shore = None
+        return self._inverseEdgePoints
+
+    @inverseEdgePoints.setter
+    def inverseEdgePoints(self, inverseEdgePoints):
+        self._inverseEdgePoints = inverseEdgePoints
+        self._shore = None
+
     def to_dict(self, verbose=True):
         """
         :param verbose: returns extra data like `InverseEdgePoint`
@@ -40,16 +192,31 @@ class MultiPoint(object):
         :return: list of dicts.
         """
         plist = list()
-        for point in self.points:
+        xs, ys = self.cells()
+        for x, y, latitude, longitude in zip(xs.tolist(), ys.tolist(),
+                                             *self._latLongLists(xs, ys)):
             pdict = dict()
-            pdict['gridpoint'] = point.to_dict()
-            pdict['coordinate'] = \
-                BaseCoordinate(self.datamap.x_to_latitude(point.x),
-                               self.datamap.y_to_longitude(point.y)
-                               ).to_dict()
+            # Plain dicts, same as BaseGridPoint.to_dict() and
+            # BaseCoordinate.to_dict()
+            pdict['gridpoint'] = {'x': x, 'y': y}
+            pdict['coordinate'] = {'latitude': latitude,
+                                   'longitude': longitude}
             plist.append(pdict)
         return plist
 
+    def _latLongLists(self, xs=None, ys=None):
+        """
+        Converts all points in one go.
+        :param xs: numpy array of x coordinates, from :meth:`cells` if
+         not passed.
+        :param ys: numpy array of y coordinates.
+        :return: (latitudes, longitudes) lists in :attr:`points` order.
+        """
+        if xs is None:
+            xs, ys = self.cells()
+        return (self.datamap.x_to_latitude_array(xs).tolist(),
+                self.datamap.y_to_longitude_array(ys).tolist())
+
     def to_json(self, verbose=False, prettyprint=True):
         """
         :param prettyprint: human readable,
@@ -69,14 +236,17 @@ class MultiPoint(object):
         """
         :return: List of All blob points with lat/long instead of x/y
         """
-        return [BaseCoordinate(
-                self.datamap.x_to_latitude(coord.x),
-                self.datamap.y_to_longitude(coord.y))
-                for coord in self.points]
+        return [BaseCoordinate(latitude, longitude)
+                for latitude, longitude in zip(*self._latLongLists())]
 
     def __repr__(self):
         return "<Multipoint> elevation(m): {}, points {}". \
             format(self.elevation,
-                   len(self.points))
+                   len(self))
+
+    def __len__(self):
+        if self._points is None and self._cells is not None:
+            return len(self._cells)
+        return len(self.points)
 
     __unicode__ = __str__ = __repr__
@@ -8,17 +8,41 @@ This library contains a container class for storing SpotElevation
 type location objects.
 """
 import json
+import numpy
 
 from ..location_util import longitudeArcSec
+from ..spatial_index import GridIndex
 from ..locations.saddle import Saddle
 from ..locations.summit import Summit
 from ..locations.spot_elevation import SpotElevation
-from ..locations.base_gridpoint import BaseGridPoint
 from ..locations.gridpoint import GridPoint
 from .multipoint import MultiPoint
 from .gridpoint import GridPointContainer
 from .base import _Base
-from math import sqrt
+
+# Meters per arcsecond of latitude.
+LATERAL_METERS_PER_ARCSEC = 30.8666
+# Fingerprint hash sums wrap at 64 bits.
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def _distanceMeters(value, unit):
+    """
+    :param value: number of units of distance
+    :param unit: type of unit (m, km, mi, ft)
+    :return: distance in meters.
+    """
+    unit = unit.lower()
+    if unit in ['meters', 'meter', 'm']:
+        return value
+    elif unit in ['kilometers', 'kilometer', 'km']:
+        return value * 1000
+    elif unit in ['feet', 'foot', 'ft']:
+        return 0.3048 * value
+    elif unit in ['miles', 'mile', 'mi']:
+        return 0.3048 * value * 5280
+    else:
+        raise ValueError('No unit value specified')
 
 
 class SpotElevationContainer(_Base):
@@ -33,6 +57,135 @@ class SpotElevationContainer(_Base):
         super(SpotElevationContainer, self).__init__()
         self.points = spotElevationList
 
+    @property
+    def points(self):
+        """
+        :return: list of :class:`SpotElevation`s
+        """
+        return self._points
+
+    @points.setter
+    def points(self, spotElevationList):
+        self._points = spotElevationList
+        self._fingerprint = None
+        self.invalidateIndex()
+
+    def append(self, point):
+        """
+        :param point: :class:`SpotElevation` to add to this container.
+        """
+        self.points.append(point)
+        self._updateFingerprint([point])
+        self.invalidateIndex()
+
+    def remove(self, indices):
+        """
+        :param indices: iterable of indices of points to remove from this
+         container.
+        """
+        indices = sorted(set(indices), reverse=True)
+        self._updateFingerprint([self.points[index] for index in indices],
+                                -1)
+        for index in indices:
+            del self.points[index]
+        self.invalidateIndex()
+
+    @property
+    def fingerprint(self):
+        """
+        Order independent summary of the points: (count, sum of their
+        hashes wrapped at 64 bits). Containers holding equal points in
+        any order have equal fingerprints. Kept up to date by
+        :meth:`append` and :meth:`remove`, and rebuilt when the number of
+        points changes behind their back. Assign :attr:`points` after
+        swapping points in place.
+        :return: tuple
+        """
+        if self._fingerprint is None or \
+                self._fingerprint[0] != len(self):
+            total = 0
+            for point in self._fingerprintPoints():
+                total += hash(point)
+            self._fingerprint = (len(self), total & FINGERPRINT_MASK)
+        return self._fingerprint
+
+    def _fingerprintPoints(self):
+        """
+        :return: iterable of objects which hash like the points.
+        """
+        return self.points
+
+    def _updateFingerprint(self, points, sign=1):
+        """
+        Adds points to (or with `sign` -1 takes them out of) the
+        fingerprint, if it has been computed.
+        :param points: list of :class:`SpotElevation`
+        :param sign: 1 or -1
+        """
+        if self._fingerprint is None:
+            return
+        count, total = self._fingerprint
+        for point in points:
+            total += sign * hash(point)
+        self._fingerprint = (count + sign * len(points),
+                             total & FINGERPRINT_MASK)
+
+    def indicesAt(self, latitudes, longitudes):
+        """
+        :param latitudes: latitudes in dotted decimal.
+        :param longitudes: longitudes in dotted decimal.
+        :return: sorted numpy array of indices of all points at any of
+         these exact coordinates.
+        """
+        index = self.spatialIndex()
+        found = list()
+        for lat, long in zip(latitudes, longitudes):
+            candidates = index.window(lat, long, lat, long)
+            found.append(candidates[
+                (index.latitudes[candidates] == lat) &
+                (index.longitudes[candidates] == long)])
+        if not found:
+            return numpy.zeros(0, dtype=numpy.int64)
+        return numpy.unique(numpy.concatenate(found))
+
+    def invalidateIndex(self):
+        """
+        Drops the cached spatial index. Assigning :attr:`points` or using
+        :meth:`append` does this automatically, and so does a change in
+        the number of points. Call it after moving or swapping points in
+        place.
+        """
+        self._spatialIndex = None
+
+    def spatialIndex(self):
+        """
+        :return: :class:`GridIndex` of all points, built on first use
+         and cached.
+        """
+        if self._spatialIndex is None or \
+                self._spatialIndex.size != len(self.points):
+            self._spatialIndex = GridIndex(
+                [point.latitude for point in self.points],
+                [point.longitude for point in self.points])
+        return self._spatialIndex
+
+    def _select(self, indices):
+        """
+        :param indices: iterable of point indices.
+        :return: SpotElevationContainer of those points.
+        """
+        return SpotElevationContainer([self.points[index]
+                                       for index in indices])
+
+    @staticmethod
+    def _scales(lat, datamap):
+        """
+        :return: (latScale, longScale) meters per arcsecond used for
+         distances around `lat`.
+        """
+        return (LATERAL_METERS_PER_ARCSEC,
+                longitudeArcSec(lat) * datamap.arcsec_resolution)
+
     def radius(self, lat, long, datamap, value, unit='m'):
         """
         :param lat: latitude of center in dotted decimal
@@ -42,31 +195,59 @@ class SpotElevationContainer(_Base):
         :param unit: type of unit (m, km, mi, ft)
         :return: SpotElevationContainer loaded with results.
         """
-        unit = unit.lower()
-        if unit in ['meters', 'meter', 'm']:
-            convertedDist = value
-        elif unit in ['kilometers', 'kilometer', 'km']:
-            convertedDist = value * 1000
-        elif unit in ['feet', 'foot', 'ft']:
-            convertedDist = 0.3048 * value
-        elif unit in ['miles', 'mile', 'mi']:
-            convertedDist = 0.3048 * value * 5280
-        else:
-            raise ValueError('No unit value specified')
-
-        positive = list()
-        longitudalMetersPerArcSec = longitudeArcSec(lat) *\
-            datamap.arcsec_resolution
-        lateralMetersPerArcSec = 30.8666
-        for point in self.points:
-            latDist = (abs(lat - point.latitude) * 3600) *\
-                lateralMetersPerArcSec
-            longDist = (abs(long - point.longitude) * 3600) *\
-                longitudalMetersPerArcSec
-            distance = sqrt(longDist**2 + latDist**2)
-            if distance <= convertedDist:
-                positive.append(point)
-        return SpotElevationContainer(positive)
+        convertedDist = _distanceMeters(value, unit)
+        latScale, longScale = self._scales(lat, datamap)
+        return self._select(self.spatialIndex().radius(
+            lat, long, convertedDist, latScale, longScale))
+
+    def radiusBatch(self, coordinates, datamap, value, unit='m'):
+        """
+        :param coordinates: iterable of (lat, long) centers in dotted
+         decimal
+        :param datamap: datamap object
+        :param value: number of units of distance
+        :param unit: type of unit (m, km, mi, ft)
+        :return: list of SpotElevationContainers, one per center.
+        """
+        convertedDist = _distanceMeters(value, unit)
+        index = self.spatialIndex()
+        results = list()
+        for lat, long in coordinates:
+            latScale, longScale = self._scales(lat, datamap)
+            results.append(self._select(index.radius(
+                lat, long, convertedDist, latScale, longScale)))
+        return results
+
+    def nearest(self, lat, long, datamap, k=1):
+        """
+        :param lat: latitude of center in dotted decimal
+        :param long: longitude of center in dotted decimal
+        :param datamap: datamap object
+        :param k: number of points to find.
+        :return: SpotElevationContainer of the `k` points closest to
+         (lat, long), closest first. Distances are measured like
+         :meth:`radius`.
+        """
+        latScale, longScale = self._scales(lat, datamap)
+        indices, _ = self.spatialIndex().nearest(lat, long, k,
+                                                 latScale, longScale)
+        return self._select(indices)
+
+    def nearestBatch(self, coordinates, datamap, k=1):
+        """
+        :param coordinates: iterable of (lat, long) centers in dotted
+         decimal
+        :param datamap: datamap object
+        :param k: number of points to find per center.
+        :return: list of SpotElevationContainers, one per center.
+        """
+        index = self.spatialIndex()
+        results = list()
+        for lat, long in coordinates:
+            latScale, longScale = self._scales(lat, datamap)
+            indices, _ = index.nearest(lat, long, k, latScale, longScale)
+            results.append(self._select(indices))
+        return results
 
     def rectangle(self, lat1, long1, lat2, long2):
         """
@@ -83,9 +264,8 @@ class SpotElevationContainer(_Base):
         upperlong = max(long1, long2)
         lowerlat = min(lat1, lat2)
         lowerlong = min(long1, long2)
-        return SpotElevationContainer(
-            [x for x in self.points if lowerlat < x.latitude < upperlat and
-                lowerlong < x.longitude < upperlong])
+        return self._select(self.spatialIndex().rectangle(
+            lowerlat, lowerlong, upperlat, upperlong))
 
     def byType(self, string):
         """
@@ -151,14 +331,13 @@ class SpotElevationContainer(_Base):
                                         point['elevation'])
             else:
                 raise Exception('Cannot import unknown type:'.format(objType))
-            mpPoints = list()
             if point.get('multipoint', None):
-                for mp in point['multipoint']:
-                    mpPoints.append(BaseGridPoint(mp['gridpoint']['x'],
-                                                  mp['gridpoint']['y']))
-                feature.multiPoint = MultiPoint(mpPoints,
+                mpX = [mp['gridpoint']['x'] for mp in point['multipoint']]
+                mpY = [mp['gridpoint']['y'] for mp in point['multipoint']]
+                feature.multiPoint = MultiPoint(None,
                                                 point['elevation'],
-                                                datamap)
+                                                datamap,
+                                                cells=(mpX, mpY))
             if point.get('highShores', None):
                 feature.highShores = list()
                 for hs in point['highShores']:
@@ -169,6 +348,12 @@ class SpotElevationContainer(_Base):
             feature.edgeEffect = point['edge']
             self.points.append(feature)
 
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
     def __repr__(self):
         return "<SpotElevationContainer> {} Objects".format(len(self.points))
 
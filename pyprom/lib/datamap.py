@@ -10,12 +10,34 @@ used to analyze the map.
 
 from __future__ import division
 
+import sys
+import numpy
 import logging
 
 from .util import dottedDecimaltoDegrees, degreesToDottedDecimal
+from .neighbor_profile import (DIAGONAL_SHIFTS, ORTHOGONAL_SHIFTS, OFF_MAP,
+                               neighborElevations, padMap)
 
 ARCSEC_DEG = 3600
 ARCMIN_DEG = 60
+# Points per side of the blocks read at a time when sampling an array like
+# map which isn't a numpy array (such as a MosaicArray).
+SAMPLE_BLOCK = 1024
+
+
+def _roundArray(values):
+    """
+    Rounds to whole numbers exactly like the builtin round(value) of
+    the running Python, half to even on 3, half away from zero on 2.
+    :param values: numpy array of floats.
+    :return: numpy array of rounded floats.
+    """
+    if sys.version_info[0] >= 3:
+        return numpy.rint(values)
+    rounded = numpy.floor(numpy.abs(values) + .5)
+    # floor(x + .5) overshoots for the float just under .5
+    rounded[rounded - numpy.abs(values) > .5] -= 1
+    return numpy.copysign(rounded, values)
 
 
 class DataMap(object):
@@ -40,6 +62,8 @@ class DataMap(object):
                                         self.span_longitude-1) *
                                         self.arcsec_resolution)) /
                                         ARCSEC_DEG) + self.longitude))
+        # Built on first use by padded()
+        self._padded = None
 
     def elevation(self, latitude, longitude):
         """
@@ -54,6 +78,94 @@ class DataMap(object):
         return self.numpy_map[hms_relative_position_lat,
                               hms_relative_position_long]
 
+    def elevations(self, latitudes, longitudes, mode='nearest'):
+        """
+        Array version of :meth:`elevation`. Points outside of the map
+        don't raise, they are flagged in the returned mask instead.
+        :param latitudes: numpy array of latitudes in dotted decimal.
+        :param longitudes: numpy array of longitudes in dotted decimal.
+        :param mode: 'nearest' gives the same elevations as
+         :meth:`elevation`, 'bilinear' interpolates between the four
+         surrounding points.
+        :return: (elevations, outOfRange) numpy arrays. elevations are
+         floats, NaN where outOfRange is True.
+        """
+        if mode not in ('nearest', 'bilinear'):
+            raise ValueError('Unknown sampling mode {}'.format(mode))
+        latitudes = numpy.asarray(latitudes, dtype=numpy.float64)
+        longitudes = numpy.asarray(longitudes, dtype=numpy.float64)
+        latitudes, longitudes = numpy.broadcast_arrays(latitudes,
+                                                       longitudes)
+        shape = latitudes.shape
+        latitudes = latitudes.ravel()
+        longitudes = longitudes.ravel()
+        # NaN coordinates fail both comparisons, so count as out of range.
+        inRange = (self.latitude <= latitudes) & \
+            (latitudes <= self.latitude_max) & \
+            (self.longitude <= longitudes) & \
+            (longitudes <= self.longitude_max)
+        elevations = numpy.full(len(latitudes), numpy.nan)
+        latitudes = latitudes[inRange]
+        longitudes = longitudes[inRange]
+        if mode == 'nearest':
+            elevations[inRange] = self._sample(
+                self.latitude_to_x_array(latitudes),
+                self.longitude_to_y_array(longitudes))
+        else:
+            elevations[inRange] = self._bilinear(
+                (self.latitude_max - latitudes) * ARCSEC_DEG /
+                self.arcsec_resolution,
+                (longitudes - self.longitude) * ARCSEC_DEG /
+                self.arcsec_resolution)
+        return elevations.reshape(shape), ~inRange.reshape(shape)
+
+    def _bilinear(self, xs, ys):
+        """
+        :param xs: numpy array of fractional x positions in the map.
+        :param ys: numpy array of fractional y positions in the map.
+        :return: numpy array of elevations interpolated between the four
+         points around each position.
+        """
+        xs = numpy.clip(xs, 0, self.max_x)
+        ys = numpy.clip(ys, 0, self.max_y)
+        x0 = numpy.floor(xs).astype(numpy.int64)
+        y0 = numpy.floor(ys).astype(numpy.int64)
+        x1 = numpy.minimum(x0 + 1, self.max_x)
+        y1 = numpy.minimum(y0 + 1, self.max_y)
+        dx = xs - x0
+        dy = ys - y0
+        top = self._sample(x0, y0) * (1 - dy) + self._sample(x0, y1) * dy
+        bottom = self._sample(x1, y0) * (1 - dy) + \
+            self._sample(x1, y1) * dy
+        return top * (1 - dx) + bottom * dx
+
+    def _sample(self, xs, ys):
+        """
+        :param xs: numpy array of x positions in the map.
+        :param ys: numpy array of y positions in the map.
+        :return: numpy array of the elevations at those points, as
+         floats. Maps which aren't numpy arrays are read one block of
+         points at a time.
+        """
+        if isinstance(self.numpy_map, numpy.ndarray):
+            return self.numpy_map[xs, ys].astype(numpy.float64)
+        elevations = numpy.empty(len(xs), dtype=numpy.float64)
+        blockColumns = self.span_longitude // SAMPLE_BLOCK + 1
+        blocks = (xs // SAMPLE_BLOCK) * blockColumns + ys // SAMPLE_BLOCK
+        order = numpy.argsort(blocks, kind='mergesort')
+        splits = numpy.flatnonzero(numpy.diff(blocks[order])) + 1
+        for group in numpy.split(order, splits):
+            if not len(group):
+                continue
+            groupX = xs[group]
+            groupY = ys[group]
+            x0 = int(groupX.min())
+            y0 = int(groupY.min())
+            window = self.numpy_map[x0:int(groupX.max()) + 1,
+                                    y0:int(groupY.max()) + 1]
+            elevations[group] = window[groupX - x0, groupY - y0]
+        return elevations
+
     def longitude_to_y(self, longitude):
         """
         :param longitude: longitude in dotted decimal notation.
@@ -86,6 +198,95 @@ class DataMap(object):
                        (self.latitude_max) * ARCSEC_DEG)) /
                    self.arcsec_resolution)
 
+    def _checkRange(self, values, lower, upper):
+        """
+        Raises the same ValueError as the scalar conversions if any of
+        `values` is outside of lower - upper.
+        """
+        if not numpy.all((lower <= values) & (values <= upper)):
+            raise ValueError('Invalid Value! must be in the range of'
+                             ' {} to {}'.format(lower, upper))
+
+    def longitude_to_y_array(self, longitudes):
+        """
+        Array version of :meth:`longitude_to_y`, with identical results.
+        :param longitudes: numpy array of longitudes in dotted decimal
+         notation.
+        :return: numpy array of relative Y positions in numpy map
+        """
+        longitudes = numpy.asarray(longitudes, dtype=numpy.float64)
+        self._checkRange(longitudes, self.longitude, self.longitude_max)
+        hms_longitude = dottedDecimaltoDegrees(longitudes)
+        return (numpy.abs(_roundArray(hms_longitude[2] +
+                                      (hms_longitude[1] * ARCMIN_DEG) +
+                                      (hms_longitude[0] * ARCSEC_DEG) -
+                                      (self.longitude) * ARCSEC_DEG)) /
+                self.arcsec_resolution).astype(numpy.int64)
+
+    def latitude_to_x_array(self, latitudes):
+        """
+        Array version of :meth:`latitude_to_x`, with identical results.
+        :param latitudes: numpy array of latitudes in dotted decimal
+         notation.
+        :return: numpy array of relative X positions in numpy map
+        """
+        latitudes = numpy.asarray(latitudes, dtype=numpy.float64)
+        self._checkRange(latitudes, self.latitude, self.latitude_max)
+        hms_latitude = dottedDecimaltoDegrees(latitudes)
+        return (numpy.abs(_roundArray(hms_latitude[2] +
+                                      (hms_latitude[1] * ARCMIN_DEG) +
+                                      (hms_latitude[0] * ARCSEC_DEG)) -
+                          (self.latitude_max) * ARCSEC_DEG) /
+                self.arcsec_resolution).astype(numpy.int64)
+
+    def _positionTable(self, name, span, convert):
+        """
+        :return: cached numpy array of `convert` applied to every
+         position from 0 to span - 1.
+        """
+        table = getattr(self, name, None)
+        if table is None or len(table) != span:
+            table = numpy.array([convert(position)
+                                 for position in range(span)],
+                                dtype=numpy.float64)
+            setattr(self, name, table)
+        return table
+
+    def _positionsTo(self, positions, span, name, convert):
+        """
+        Looks whole positions inside the map up in a table built with the
+        scalar conversion, anything else goes through `convert` itself.
+        """
+        positions = numpy.asarray(positions)
+        table = self._positionTable(name, span, convert)
+        result = numpy.empty(positions.shape, dtype=numpy.float64)
+        whole = (positions == numpy.floor(positions)) & \
+            (positions >= 0) & (positions < span)
+        result[whole] = table[positions[whole].astype(numpy.int64)]
+        others = ~whole
+        if others.any():
+            result[others] = [convert(position)
+                              for position in positions[others].tolist()]
+        return result
+
+    def x_to_latitude_array(self, xs):
+        """
+        Array version of :meth:`x_to_latitude`, with identical results.
+        :param xs: numpy array of x locations in `numpy_map`
+        :return: numpy array of positions in dotted decimal latitude
+        """
+        return self._positionsTo(xs, self.span_latitude, '_latitudeTable',
+                                 self.x_to_latitude)
+
+    def y_to_longitude_array(self, ys):
+        """
+        Array version of :meth:`y_to_longitude`, with identical results.
+        :param ys: numpy array of y locations in `numpy_map`
+        :return: numpy array of positions in dotted decimal longitude
+        """
+        return self._positionsTo(ys, self.span_longitude,
+                                 '_longitudeTable', self.y_to_longitude)
+
     def _position_formula(self, x):
         """
         Produces a relative coordinate based on x value and arcsec_resolution
@@ -115,40 +316,84 @@ class DataMap(object):
         hms = self._position_formula(y)
         return self.longitude + degreesToDottedDecimal(*hms)
 
-    def iterateDiagonal(self, x, y):
+    def padded(self):
         """
-        Generator returns 8 closest neighbors to a raster grid location,
-        that is, all points touching including the diagonals.
+        :return: :attr:`numpy_map` with a one point border of
+         :const:`OFF_MAP`, see :func:`padMap`. Built on first use and
+         cached, so every consumer shares one copy. Call
+         :meth:`invalidateNeighbors` after changing :attr:`numpy_map`.
+
+        This is a dense copy of the whole map. Maps which aren't numpy
+        arrays (such as a :class:`MosaicArray`) are read in full to build
+        it, which serial :class:`AnalyzeData`, :class:`EqualHeightLabels`
+        and :class:`Walk` all do. Use tiled analysis for those maps.
         """
-        shiftList = [[-1, 0], [-1, 1], [0, 1], [1, 1], [1, 0], [1, -1],
-                     [0, -1], [-1, -1]]
-        # 0, 45, 90, 135, 180, 225, 270, 315
+        if self._padded is None:
+            if not isinstance(self.numpy_map, numpy.ndarray):
+                self.logger.warning(
+                    "Reading all of {!r} into memory, analyze it in tiles"
+                    " to avoid this.".format(self.numpy_map))
+            self.cachePadded(padMap(self.numpy_map))
+        return self._padded
+
+    def cachePadded(self, padded):
+        """
+        Uses an already padded copy of :attr:`numpy_map` as the
+        :meth:`padded` map.
+        :param padded: see :func:`padMap`
+        """
+        self._padded = padded
+
+    def invalidateNeighbors(self):
+        """
+        Drops the cached :meth:`padded` map.
+        """
+        self._padded = None
+
+    def neighbors(self, x, y, orthogonal=False):
+        """
+        Neighbor elevations of one or many points, read from the
+        :meth:`padded` map, see :func:`neighborElevations`.
+        :param x: x coordinate, or numpy array of them.
+        :param y: y coordinate, or numpy array of them.
+        :param orthogonal: only the 4 orthogonal neighbors.
+        :return: numpy array of shape (8,), or (len(x), 8), of neighbor
+         elevations in :meth:`iterateDiagonal` (or
+         :meth:`iterateOrthogonal`) order. Off map neighbors are
+         :const:`OFF_MAP`.
+        """
+        return neighborElevations(
+            self.padded(), x, y,
+            ORTHOGONAL_SHIFTS if orthogonal else DIAGONAL_SHIFTS)
 
-        for shift in shiftList:
+    def _iterate(self, x, y, shifts):
+        """
+        Generator of (x, y, elevation) of the neighbors at `shifts`.
+        """
+        for shift in shifts:
             _x = x + shift[0]
             _y = y + shift[1]
             if 0 <= _x <= self.max_x and \
                0 <= _y <= self.max_y:
                 yield _x, _y, float(self.numpy_map[_x, _y])
             else:
-                yield _x, _y, -10000
+                yield _x, _y, OFF_MAP
+
+    def iterateDiagonal(self, x, y):
+        """
+        Generator returns 8 closest neighbors to a raster grid location,
+        that is, all points touching including the diagonals.
+        """
+        # 0, 45, 90, 135, 180, 225, 270, 315
+        return self._iterate(x, y, DIAGONAL_SHIFTS)
 
     def iterateOrthogonal(self, x, y):
         """
         generator returns 4 closest neighbors to a raster grid location,
         that is, all points touching excluding the diagonals.
         """
-        shiftList = [[-1, 0], [0, 1], [1, 0], [0, -1]]
         # 0, 90, 180, 270
-
-        for shift in shiftList:
-            _x = x + shift[0]
-            _y = y + shift[1]
-            if 0 <= _x <= self.max_x and \
-               0 <= _y <= self.max_y:
-                yield _x, _y, float(self.numpy_map[_x, _y])
-            else:
-                yield _x, _y, -10000
+        return self._iterate(x, y, ORTHOGONAL_SHIFTS)
 
     def subset(self, x, y, xSpan, ySpan):
         """
@@ -0,0 +1,262 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a connected component labeling engine for equal
+height areas (the source of :class:`MultiPoint` objects).
+"""
+
+import numpy
+
+from .neighbor_profile import DIAGONAL_SHIFTS, padMap
+from .containers.multipoint import MultiPoint
+from .containers.inverse_edgepoint import shoreToInverseEdgePoints
+from .shore import FORWARD_SHIFTS, connectedComponents, neighborComponents
+
+
+def cellsToMultiPoint(cells, elevation, datamap, inverseEdgePoints=None,
+                      shore=None, mapEdge=False):
+    """
+    :param cells: (x, y) numpy arrays of all points of an equal height area.
+    :param elevation: elevation of the area.
+    :param datamap: :class:`DataMap` object.
+    :param inverseEdgePoints: :class:`InverseEdgePointContainer`
+    :param shore: (x, y, elevation) numpy arrays of the shore, turned
+     into :class:`InverseEdgePoint`s only when they are asked for.
+    :param mapEdge: (bool) does the shore touch the edge of the map?
+    :return: :class:`MultiPoint` with packed points.
+    """
+    return MultiPoint(None, elevation, datamap,
+                      inverseEdgePoints=inverseEdgePoints, cells=cells,
+                      shore=shore, mapEdge=mapEdge)
+
+
+class EqualHeightLabels(object):
+    """
+    Labels every 8-connected area of equal elevation in a raster
+    in a single pass.
+    Labels start at 1 and are numbered in the order of the first
+    (row major) point of each area. 0 means the point has no equal
+    height neighbor.
+    :param numpy_map: 2d numpy array of elevations.
+    :param padded: optional pre padded version of `numpy_map`
+    """
+    def __init__(self, numpy_map, padded=None):
+        super(EqualHeightLabels, self).__init__()
+        if padded is None:
+            padded = padMap(numpy_map)
+        self.shape = numpy_map.shape
+        self.max_x = self.shape[0] - 1
+        self.max_y = self.shape[1] - 1
+        self.padded = padded
+        self._label()
+        self._shoreRing()
+        self._highShoreCounts = None
+
+    def _label(self):
+        """
+        Connected component labeling.
+        """
+        xSpan, ySpan = self.shape
+        numpy_map = self.padded[1:xSpan + 1, 1:ySpan + 1]
+        starts = list()
+        ends = list()
+        for shift in FORWARD_SHIFTS:
+            # Only compare points which both lie on the map.
+            yStart = max(0, -shift[1])
+            yEnd = ySpan - max(0, shift[1])
+            equal = numpy_map[:xSpan - shift[0], yStart:yEnd] == \
+                numpy_map[shift[0]:, yStart + shift[1]:yEnd + shift[1]]
+            xs, ys = numpy.nonzero(equal)
+            cells = xs * ySpan + ys + yStart
+            starts.append(cells)
+            ends.append(cells + shift[0] * ySpan + shift[1])
+        starts = numpy.concatenate(starts)
+        ends = numpy.concatenate(ends)
+
+        # Compress to nodes which actually have an equal neighbor.
+        linked = numpy.zeros(xSpan * ySpan, dtype=bool)
+        linked[starts] = True
+        linked[ends] = True
+        nodes = numpy.flatnonzero(linked)
+        nodeIndex = numpy.cumsum(linked, dtype=numpy.int64) - 1
+        del linked
+        roots = connectedComponents(len(nodes), nodeIndex[starts],
+                                    nodeIndex[ends])
+        del nodeIndex
+        # Nodes are sorted, so the root is the row major first point.
+        isRoot = roots == numpy.arange(len(nodes))
+        firstNodes = numpy.flatnonzero(isRoot)
+        nodeLabels = numpy.cumsum(isRoot)[roots]
+
+        self.count = len(firstNodes)
+        self.labels = numpy.zeros(self.shape, dtype=numpy.int32)
+        self.labels.flat[nodes] = nodeLabels
+
+        # Cells grouped by label, row major within each label.
+        order = numpy.argsort(nodeLabels, kind='mergesort')
+        self._cells = nodes[order]
+        self._cellOffsets = numpy.zeros(self.count + 2, dtype=numpy.int64)
+        self._cellOffsets[2:] = numpy.cumsum(
+            numpy.bincount(nodeLabels, minlength=self.count + 1)[1:])
+        self.firstCell = numpy.concatenate([[-1], nodes[firstNodes]])
+
+        # Bounding boxes and map edge flags. label 0 is a placeholder.
+        xs, ys = numpy.divmod(self._cells, ySpan)
+        self.bounds = numpy.zeros((self.count + 1, 4), dtype=numpy.int64)
+        if self.count:
+            starts = self._cellOffsets[1:-1]
+            self.bounds[1:, 0] = xs[starts]
+            self.bounds[1:, 1] = numpy.minimum.reduceat(ys, starts)
+            self.bounds[1:, 2] = xs[self._cellOffsets[2:] - 1]
+            self.bounds[1:, 3] = numpy.maximum.reduceat(ys, starts)
+        self._cellLabels = numpy.repeat(numpy.arange(1, self.count + 1),
+                                        numpy.diff(self._cellOffsets[1:]))
+        onEdge = (xs == 0) | (xs == self.max_x) | \
+                 (ys == 0) | (ys == self.max_y)
+        self.mapEdge = numpy.bincount(self._cellLabels[onEdge],
+                                      minlength=self.count + 1).astype(bool)
+
+    def _shoreRing(self):
+        """
+        Finds the shore (non equal neighbors) of every label.
+        Shore points are stored as flat indices into the padded map, so
+        off map shore points are kept like :meth:`DataMap.iterateDiagonal`
+        returns them.
+        """
+        paddedY = self.shape[1] + 2
+        cellLabels = self._cellLabels
+        del self._cellLabels
+        xs, ys = numpy.divmod(self._cells, self.shape[1])
+        paddedCells = (xs + 1) * paddedY + ys + 1
+        paddedLabels = numpy.pad(self.labels, 1, mode='constant')
+        keys = list()
+        for shift in DIAGONAL_SHIFTS:
+            neighbors = paddedCells + shift[0] * paddedY + shift[1]
+            shore = paddedLabels.flat[neighbors] != cellLabels
+            keys.append(cellLabels[shore].astype(numpy.int64) *
+                        self.padded.size + neighbors[shore])
+        keys = numpy.sort(numpy.concatenate(keys))
+        unique = numpy.ones(len(keys), dtype=bool)
+        unique[1:] = keys[1:] != keys[:-1]
+        keys = keys[unique]
+        shoreLabels, self._shore = numpy.divmod(keys, self.padded.size)
+        self._shoreOffsets = numpy.searchsorted(
+            shoreLabels, numpy.arange(self.count + 2))
+
+    def _highShoreRing(self):
+        """
+        Groups the high shore points (higher than the area, and on the
+        map) of every label into 8 connected high shores, all in one pass.
+        Points are keyed by label and padded index, so high shores of
+        different labels never join.
+        """
+        paddedY = self.shape[1] + 2
+        shoreLabels = numpy.repeat(numpy.arange(self.count + 1),
+                                   numpy.diff(self._shoreOffsets))
+        firstX, firstY = numpy.divmod(self.firstCell, self.shape[1])
+        blobElevations = self.padded.flat[(firstX + 1) * paddedY +
+                                          firstY + 1]
+        x, y = numpy.divmod(self._shore, paddedY)
+        high = self.padded.flat[self._shore] > \
+            blobElevations[shoreLabels]
+        # Windows of a larger map are padded with real elevations.
+        high &= (x >= 1) & (x <= self.shape[0]) & \
+            (y >= 1) & (y <= self.shape[1])
+        points = numpy.flatnonzero(high)
+        del high, x, y
+        roots = neighborComponents(
+            shoreLabels[points] * self.padded.size + self._shore[points],
+            paddedY)
+        # Roots are the first point of each high shore, so sorting by
+        # root orders high shores by label, then by their first point.
+        order = numpy.argsort(roots, kind='mergesort')
+        roots = roots[order]
+        self._highShore = points[order]
+        first = numpy.ones(len(roots), dtype=bool)
+        first[1:] = roots[1:] != roots[:-1]
+        starts = numpy.flatnonzero(first)
+        self._highShoreOffsets = numpy.append(starts, len(roots))
+        self._highShoreCounts = numpy.bincount(
+            shoreLabels[self._highShore[starts]], minlength=self.count + 1)
+        self._highShoreLabelOffsets = numpy.zeros(self.count + 2,
+                                                  dtype=numpy.int64)
+        self._highShoreLabelOffsets[1:] = numpy.cumsum(
+            self._highShoreCounts)
+
+    def highShoreCounts(self):
+        """
+        :return: numpy array of the number of high shores of every label.
+        """
+        if self._highShoreCounts is None:
+            self._highShoreRing()
+        return self._highShoreCounts
+
+    def highShores(self, label):
+        """
+        :param label: label number
+        :return: list of (x, y, elevation) numpy arrays, one per 8
+         connected group of shore points higher than this label. High
+         shores are ordered by their first point, and points within them
+         in row major order.
+        """
+        if self._highShoreCounts is None:
+            self._highShoreRing()
+        offsets = self._highShoreOffsets[
+            self._highShoreLabelOffsets[label]:
+            self._highShoreLabelOffsets[label + 1] + 1]
+        highShores = list()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            shore = self._shore[self._highShore[start:end]]
+            x, y = numpy.divmod(shore, self.shape[1] + 2)
+            highShores.append((x - 1, y - 1, self.padded.flat[shore]))
+        return highShores
+
+    def cells(self, label):
+        """
+        :param label: label number
+        :return: (x, y) numpy arrays of all points of this label
+        """
+        cells = self._cells[self._cellOffsets[label]:
+                            self._cellOffsets[label + 1]]
+        return numpy.divmod(cells, self.shape[1])
+
+    def shore(self, label):
+        """
+        :param label: label number
+        :return: (x, y, elevation) numpy arrays of all non equal neighbors
+         of this label. Off map neighbors have x/y of -1 or max + 1.
+        """
+        shore = self._shore[self._shoreOffsets[label]:
+                            self._shoreOffsets[label + 1]]
+        x, y = numpy.divmod(shore, self.shape[1] + 2)
+        return x - 1, y - 1, self.padded.flat[shore]
+
+    def inverseEdgePoints(self, label, datamap):
+        """
+        :param label: label number
+        :param datamap: :class:`DataMap` object.
+        :return: :class:`InverseEdgePointContainer` of this label's shore.
+        """
+        xs, ys, elevations = self.shore(label)
+        return shoreToInverseEdgePoints(xs, ys, elevations, datamap,
+                                        bool(self.mapEdge[label]))
+
+    def multiPoint(self, label, elevation, datamap):
+        """
+        :param label: label number
+        :param elevation: elevation of the label.
+        :param datamap: :class:`DataMap` object.
+        :return: :class:`MultiPoint` with all points and
+         :class:`InverseEdgePoint`s of this label.
+        """
+        return cellsToMultiPoint(self.cells(label), elevation, datamap,
+                                 shore=self.shore(label),
+                                 mapEdge=bool(self.mapEdge[label]))
+
+    def __repr__(self):
+        return "<EqualHeightLabels> {} Labels".format(self.count)
+
+    __unicode__ = __str__ = __repr__
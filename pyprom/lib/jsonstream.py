@@ -0,0 +1,208 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains helpers for writing and reading large JSON
+documents one array element at a time.
+"""
+
+import json
+
+# Characters read from a file at a time.
+READ_CHUNK = 1 << 16
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+_numberCharacters = '0123456789+-.eE'
+
+
+def dumpItem(item, prettyprint=True, depth=1):
+    """
+    :param item: json serializable object.
+    :param prettyprint: human readable,
+     but takes more space when written to a file.
+    :param depth: nesting depth of `item` in the document, used to indent
+     it in line with :func:`json.dumps` when `prettyprint` is set.
+    :return: json string of `item`
+    """
+    if not prettyprint:
+        return json.dumps(item)
+    text = json.dumps(item, sort_keys=True, indent=4, separators=(',', ': '))
+    return text.replace('\n', '\n' + ' ' * 4 * depth)
+
+
+class JSONStreamWriter(object):
+    """
+    Writes a JSON object to a file member by member, where array members
+    are written one element at a time.
+    :param outgoing: writable file object.
+    :param prettyprint: human readable,
+     but takes more space when written to a file.
+    """
+    def __init__(self, outgoing, prettyprint=True):
+        super(JSONStreamWriter, self).__init__()
+        self.outgoing = outgoing
+        self.prettyprint = prettyprint
+        self.members = 0
+        self.outgoing.write('{')
+
+    def _key(self, key):
+        if self.members:
+            self.outgoing.write(',')
+        if self.prettyprint:
+            self.outgoing.write('\n    ')
+        elif self.members:
+            self.outgoing.write(' ')
+        self.outgoing.write(json.dumps(key) + ': ')
+        self.members += 1
+
+    def member(self, key, value):
+        """
+        Writes one member of the object.
+        :param key: member name.
+        :param value: json serializable value.
+        """
+        self._key(key)
+        self.outgoing.write(dumpItem(value, self.prettyprint))
+
+    def array(self, key, items):
+        """
+        Writes an array member, one element at a time.
+        :param key: member name.
+        :param items: iterable of json serializable elements.
+        """
+        self._key(key)
+        self.outgoing.write('[')
+        count = 0
+        for item in items:
+            if count:
+                self.outgoing.write(',')
+            if self.prettyprint:
+                self.outgoing.write('\n        ')
+            elif count:
+                self.outgoing.write(' ')
+            self.outgoing.write(dumpItem(item, self.prettyprint, depth=2))
+            count += 1
+        if count and self.prettyprint:
+            self.outgoing.write('\n    ')
+        self.outgoing.write(']')
+
+    def close(self):
+        """
+        Closes the JSON object. The file is left open.
+        """
+        if self.members and self.prettyprint:
+            self.outgoing.write('\n')
+        self.outgoing.write('}')
+
+
+class JSONStreamReader(object):
+    """
+    Reads a JSON object from a file member by member. Members named in
+    `streamed` must be arrays, and are read one element at a time.
+    :param incoming: readable file object.
+    :param streamed: member names of arrays to stream.
+    """
+    def __init__(self, incoming, streamed=()):
+        super(JSONStreamReader, self).__init__()
+        self.incoming = incoming
+        self.streamed = set(streamed)
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _more(self):
+        """
+        Reads more of the file into the buffer, dropping the part which
+        has already been consumed.
+        :return: False at the end of the file.
+        """
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        chunk = self.incoming.read(max(READ_CHUNK, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _next(self):
+        """
+        :return: next non whitespace character, without consuming it.
+        """
+        while True:
+            while self.position < len(self.buffer) and \
+                    self.buffer[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._more():
+                raise ValueError('Unexpected end of JSON data')
+
+    def _expect(self, characters):
+        """
+        Consumes the next non whitespace character.
+        :param characters: characters which are allowed.
+        :return: the character consumed.
+        """
+        character = self._next()
+        if character not in characters:
+            raise ValueError('Expected {} at character {} of JSON'
+                             ' data'.format(' or '.join(characters),
+                                            self.position))
+        self.position += 1
+        return character
+
+    def _value(self):
+        """
+        Decodes the next value, reading more of the file until it is
+        complete.
+        """
+        self._next()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if self._more():
+                    continue
+                raise
+            # A number cut off by the end of the buffer may go on, even
+            # if what was read so far already decodes ("1e-" as 1).
+            rest = end
+            while rest < len(self.buffer) and \
+                    self.buffer[rest] in _numberCharacters:
+                rest += 1
+            if rest == len(self.buffer) and self._more():
+                continue
+            self.position = end
+            return value
+
+    def __iter__(self):
+        """
+        :return: generator of (key, value) pairs. Streamed arrays yield
+         one pair per element instead.
+        """
+        self._expect('{')
+        if self._next() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key in self.streamed:
+                self._expect('[')
+                if self._next() == ']':
+                    self.position += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                yield key, self._value()
+            if self._expect(',}') == '}':
+                return
@@ -11,20 +11,71 @@ import json
 import utm
 
 
+def _roundKey(value):
+    """
+    :param value: latitude or longitude in dotted decimal.
+    :return: `value` rounded to 6 places, None for 0 or None.
+    """
+    if not value:
+        return None
+    return round(value, 6)
+
+
 class BaseCoordinate(object):
     """
     Base Coordinate, intended to be inherited from. This contains
-    basic lat/long
+    basic lat/long. Children which don't declare __slots__ (like
+    :class:`SpotElevation`) still get a __dict__.
+
+    Hashing and equality use a key of the coordinates rounded to 6
+    places, which is computed once and again only after a coordinate
+    is assigned.
     """
+    __slots__ = ('_latitude', '_longitude', '_key')
+
     def __init__(self, latitude, longitude, *args, **kwargs):
         """
         :param latitude: latitude in dotted decimal
         :param longitude: longitude in dotted decimal
         """
         super(BaseCoordinate, self).__init__()
+        self._key = None
         self.latitude = latitude
         self.longitude = longitude
 
+    @property
+    def latitude(self):
+        return self._latitude
+
+    @latitude.setter
+    def latitude(self, latitude):
+        self._latitude = latitude
+        self._key = None
+
+    @property
+    def longitude(self):
+        return self._longitude
+
+    @longitude.setter
+    def longitude(self, longitude):
+        self._longitude = longitude
+        self._key = None
+
+    def _makeKey(self):
+        """
+        :return: tuple which equal objects share, see :meth:`key`.
+        """
+        return (_roundKey(self._latitude), _roundKey(self._longitude))
+
+    def key(self):
+        """
+        :return: hashable key used for hashing and equality, cached until
+         a coordinate changes.
+        """
+        if self._key is None:
+            self._key = self._makeKey()
+        return self._key
+
     def to_dict(self):
         """
         :return: dict of :class:`BaseCoordinate`
@@ -52,24 +103,18 @@ class BaseCoordinate(object):
         return utm.from_latlon(self.latitude, self.longitude)
 
     def __eq__(self, other):
-        latitude = longitude = olatitude = olongitude = None
-        if self.latitude:
-            latitude = round(self.latitude, 6)
-        if self.longitude:
-            longitude = round(self.longitude, 6)
-        if other.latitude:
-            olatitude = round(other.latitude, 6)
-        if other.longitude:
-            olongitude = round(other.longitude, 6)
-        return [latitude, longitude] ==\
-               [olatitude, olongitude]
+        if not isinstance(other, BaseCoordinate):
+            return NotImplemented
+        return self.key() == other.key()
 
     def __ne__(self, other):
-        return [round(self.latitude, 6), round(self.longitude, 6)] != \
-               [round(other.latitude, 6), round(other.longitude, 6)]
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
 
     def __hash__(self):
-        return hash((round(self.latitude, 6), round(self.longitude, 6)))
+        return hash(self.key())
 
     def __repr__(self):
         return "<BaseCoordinate> lat {} long {}".format(self.latitude,
@@ -11,6 +11,10 @@ import json
 
 
 class BaseGridPoint(object):
+    # Grid points are created by the million, so none of them carry a
+    # per instance __dict__.
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         """
         Basic Gridpoint.
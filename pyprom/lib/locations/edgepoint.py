@@ -23,6 +23,8 @@ class EdgePoint(GridPoint):
     :param equalNeighbors: list of :class:`GridPoint`s that are equal in
            height in comparison to the EdgePoint.
     """
+    __slots__ = ('nonEqualNeighbors', 'equalNeighbors')
+
     def __init__(self, x, y, elevation, nonEqualNeighbors, equalNeighbors):
         super(EdgePoint, self).__init__(x, y, elevation)
         self.nonEqualNeighbors = nonEqualNeighbors
@@ -12,6 +12,8 @@ from .base_gridpoint import BaseGridPoint
 
 
 class GridPoint(BaseGridPoint):
+    __slots__ = ('elevation',)
+
     def __init__(self, x, y, elevation):
         """
         A basic grid point. This maps an elevation to an X,Y coordinate.
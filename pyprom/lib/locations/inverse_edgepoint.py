@@ -18,13 +18,19 @@ class InverseEdgePoint(GridPoint):
     :param x: x coordinate
     :param y: y coordinate
     :param elevation: elevation in meters
-    :param edgePoints: list of EdgePoints.
+    :param edgePoints: list of EdgePoints, a new empty list by default.
     :param inverseEdgePointNeighbors: list of neighboring
-     :class:`InverseEdgePoint`
+     :class:`InverseEdgePoint`, a new empty list by default.
     """
-    def __init__(self, x, y, elevation, edgePoints=[],
-                 inverseEdgePointNeighbors=[]):
+    __slots__ = ('edgePoints', 'inverseEdgePointNeighbors')
+
+    def __init__(self, x, y, elevation, edgePoints=None,
+                 inverseEdgePointNeighbors=None):
         super(InverseEdgePoint, self).__init__(x, y, elevation)
+        if edgePoints is None:
+            edgePoints = list()
+        if inverseEdgePointNeighbors is None:
+            inverseEdgePointNeighbors = list()
         self.edgePoints = edgePoints
         self.inverseEdgePointNeighbors = inverseEdgePointNeighbors
 
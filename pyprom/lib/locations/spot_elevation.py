@@ -27,6 +27,21 @@ class SpotElevation(BaseCoordinate):
         self.elevation = elevation
         self.edgeEffect = kwargs.get('edge', None)
 
+    @property
+    def elevation(self):
+        return self._elevation
+
+    @elevation.setter
+    def elevation(self, elevation):
+        self._elevation = elevation
+        self._key = None
+
+    def _makeKey(self):
+        """
+        :return: rounded coordinates and elevation.
+        """
+        return super(SpotElevation, self)._makeKey() + (self._elevation,)
+
     def to_dict(self):
         """
         :return: dict of :class:`SpotElevation`
@@ -70,29 +85,6 @@ class SpotElevation(BaseCoordinate):
         except:
             return None
 
-    def __eq__(self, other):
-        latitude = longitude = olatitude = olongitude = None
-        if self.latitude:
-            latitude = round(self.latitude, 6)
-        if self.longitude:
-            longitude = round(self.longitude, 6)
-        if other.latitude:
-            olatitude = round(other.latitude, 6)
-        if other.longitude:
-            olongitude = round(other.longitude, 6)
-        return [latitude, longitude, self.elevation] ==\
-               [olatitude, olongitude, other.elevation]
-
-    def __ne__(self, other):
-        return [round(self.latitude, 6), round(self.longitude, 6),
-                self.elevation] != \
-               [round(other.latitude, 6), round(other.longitude, 6),
-                other.elevation]
-
-    def __hash__(self):
-        return hash((round(self.latitude, 6), round(self.longitude, 6),
-                     self.elevation))
-
     def __repr__(self):
         return "<SpotElevation> lat {} long" \
                " {} {}ft, {}m".format(self.latitude,
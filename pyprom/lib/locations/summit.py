@@ -26,6 +26,10 @@ class Summit(SpotElevation):
                                      elevation, *args, **kwargs)
         self.multiPoint = kwargs.get('multiPoint', None)
         self.saddles = list()
+        # Filled in by Prominence.
+        self.keySaddle = None
+        self.prominence = None
+        self.lineParent = None
 
     def to_dict(self, recurse=False):
         """
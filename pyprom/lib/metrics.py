@@ -0,0 +1,160 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a class for collecting counters, timers, histograms
+and memory snapshots while a :class:`Domain` is analyzed.
+"""
+
+import sys
+import numpy
+
+from collections import defaultdict
+from contextlib import contextmanager
+from timeit import default_timer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peakRSS():
+    """
+    :return: peak resident set size of this process in KiB, or None where
+     it can't be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Reported in bytes rather than KiB.
+        peak //= 1024
+    return peak
+
+
+def _bucket(value):
+    """
+    :return: smallest power of two which is at least `value`, so
+     histograms have a fixed set of buckets. Values below 1 go to 1.
+    """
+    if value <= 1:
+        return 1
+    return 1 << int(numpy.ceil(numpy.log2(value)))
+
+
+class Metrics(object):
+    """
+    Collects counters, power of two histograms, per phase timers and peak
+    memory snapshots. Pass one to :meth:`Domain.run`,
+    :class:`AnalyzeData` or :class:`Walk`, and read the results with
+    :meth:`to_dict` or :meth:`report`.
+    :param callback: optional function called with an event dict as
+     things happen: {'name': phase, 'seconds': s} whenever a timer stops,
+     {'name': 'tile', 'seconds': s, 'x': x, 'y': y} for every tile of a
+     tiled analysis, and {'name': 'report', 'metrics': dict} from
+     :meth:`report`.
+    """
+    def __init__(self, callback=None):
+        super(Metrics, self).__init__()
+        self.callback = callback
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.histograms = defaultdict(lambda: defaultdict(int))
+        self.memory = dict()
+
+    def count(self, name, value=1):
+        """
+        :param name: counter name.
+        :param value: amount to add.
+        """
+        self.counters[name] += int(value)
+
+    def observe(self, name, value):
+        """
+        Adds one value to a histogram.
+        :param name: histogram name.
+        :param value: value to add.
+        """
+        self.histograms[name][_bucket(value)] += 1
+
+    def observeMany(self, name, values):
+        """
+        Adds a numpy array of values to a histogram in one go.
+        :param name: histogram name.
+        :param values: numpy array of values.
+        """
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if not len(values):
+            return
+        exponents = numpy.ceil(numpy.log2(numpy.maximum(values, 1)))
+        exponents = exponents.astype(numpy.int64)
+        histogram = self.histograms[name]
+        for exponent, count in enumerate(numpy.bincount(exponents)):
+            if count:
+                histogram[1 << exponent] += int(count)
+
+    def _emit(self, event):
+        if self.callback is not None:
+            self.callback(event)
+
+    def addTime(self, name, seconds, **info):
+        """
+        Records time measured elsewhere, such as in a worker process.
+        :param name: timer name.
+        :param seconds: elapsed seconds.
+        :param info: extra items for the callback event.
+        """
+        self.timers[name] += seconds
+        event = dict(info)
+        event['name'] = name
+        event['seconds'] = seconds
+        self._emit(event)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager which times its block, adding to the timer
+        `name`.
+        :param name: timer name.
+        """
+        start = default_timer()
+        try:
+            yield
+        finally:
+            self.addTime(name, default_timer() - start)
+
+    def snapshot(self, label):
+        """
+        Records the peak memory use of this process so far.
+        :param label: name of the snapshot.
+        """
+        self.memory[label] = peakRSS()
+
+    def to_dict(self):
+        """
+        :return: dict of counters, timers (seconds), histograms (bucket
+         upper bound: count) and memory (peak RSS KiB).
+        """
+        return {'counters': dict(self.counters),
+                'timers': dict(self.timers),
+                'histograms': dict((name, dict(histogram)) for
+                                   name, histogram in
+                                   self.histograms.items()),
+                'memory': dict(self.memory)}
+
+    def report(self):
+        """
+        :return: :meth:`to_dict`, which is also handed to the callback.
+        """
+        metrics = self.to_dict()
+        self._emit({'name': 'report', 'metrics': metrics})
+        return metrics
+
+    def __repr__(self):
+        return "<Metrics> {} Counters, {} Timers".format(
+            len(self.counters), len(self.timers))
+
+    __unicode__ = __str__ = __repr__
@@ -0,0 +1,113 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a lazily loaded virtual raster made of a grid of
+equally sized tiles which share their border rows and columns.
+"""
+
+import numpy
+
+from .raster import WindowedArray
+
+
+class MosaicArray(WindowedArray):
+    """
+    Presents a grid of tiles as one read only 2d array, see
+    :class:`WindowedArray`. Neighboring tiles share one row/column of
+    points, which is only kept once (taken from the tile below/right of
+    the seam). Tiles are only opened when a read touches them, missing
+    tiles read as 0.
+    :param tiles: list of rows (north to south) of tile keys
+     (west to east) passed to `opener`. None marks a missing tile.
+    :param tileSpan: points along each side of a tile, for instance 3601.
+    :param opener: function which takes a tile key and returns a 2d
+     array like (numpy array or :class:`numpy.memmap`) of elevations.
+    :param dtype: dtype of the elevations.
+    """
+    def __init__(self, tiles, tileSpan, opener, dtype=numpy.int16):
+        self.tiles = tiles
+        self.tileSpan = tileSpan
+        self.step = tileSpan - 1
+        self.opener = opener
+        self.tileRows = len(tiles)
+        self.tileColumns = len(tiles[0])
+        super(MosaicArray, self).__init__(
+            (self.tileRows * self.step + 1,
+             self.tileColumns * self.step + 1), dtype)
+        self._open = dict()
+
+    def tile(self, row, column):
+        """
+        :param row: tile row.
+        :param column: tile column.
+        :return: elevations of that tile, or None if it is missing.
+        """
+        key = self.tiles[row][column]
+        if key is None:
+            return None
+        if key not in self._open:
+            self._open[key] = self.opener(key)
+        return self._open[key]
+
+    def _owners(self, start, stop, count):
+        """
+        Splits [start, stop) along one axis into the tiles which own it.
+        :return: list of (tile index, tile start, tile stop, out start)
+        """
+        owners = list()
+        first = min(start // self.step, count - 1)
+        last = min((stop - 1) // self.step, count - 1)
+        for index in range(first, last + 1):
+            lower = max(start, index * self.step)
+            if index == count - 1:
+                upper = stop
+            else:
+                upper = min(stop, (index + 1) * self.step)
+            owners.append((index, lower - index * self.step,
+                           upper - index * self.step, lower - start))
+        return owners
+
+    def point(self, x, y):
+        """
+        :param x: x coordinate.
+        :param y: y coordinate.
+        :return: elevation at x, y
+        """
+        row = min(x // self.step, self.tileRows - 1)
+        column = min(y // self.step, self.tileColumns - 1)
+        tile = self.tile(row, column)
+        if tile is None:
+            return self.dtype.type(0)
+        return tile[x - row * self.step, y - column * self.step]
+
+    def window(self, x0, y0, x1, y1):
+        """
+        Reads a window of the mosaic.
+        :param x0: first x coordinate.
+        :param y0: first y coordinate.
+        :param x1: x coordinate after the end of the window.
+        :param y1: y coordinate after the end of the window.
+        :return: numpy array of shape (x1 - x0, y1 - y0)
+        """
+        out = numpy.zeros((max(x1 - x0, 0), max(y1 - y0, 0)),
+                          dtype=self.dtype)
+        if not out.size:
+            return out
+        for row, rx0, rx1, ox in self._owners(x0, x1, self.tileRows):
+            for column, cy0, cy1, oy in self._owners(y0, y1,
+                                                     self.tileColumns):
+                tile = self.tile(row, column)
+                if tile is None:
+                    continue
+                out[ox:ox + rx1 - rx0, oy:oy + cy1 - cy0] = \
+                    tile[rx0:rx1, cy0:cy1]
+        return out
+
+    def __repr__(self):
+        return "<MosaicArray> {} x {} Tiles, Shape {}".format(
+            self.tileRows, self.tileColumns, self.shape)
+
+    __unicode__ = __str__ = __repr__
@@ -0,0 +1,164 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a vectorized neighbor profile classifier used to
+pick out :class:`Summit` and :class:`Saddle` candidates from a raster
+without visiting every point in Python.
+"""
+
+import itertools
+import numpy
+
+from .util import compressRepetetiveChars
+
+# Same order as :meth:`DataMap.iterateDiagonal`
+# 0, 45, 90, 135, 180, 225, 270, 315
+DIAGONAL_SHIFTS = [[-1, 0], [-1, 1], [0, 1], [1, 1], [1, 0], [1, -1],
+                   [0, -1], [-1, -1]]
+# Same order as :meth:`DataMap.iterateOrthogonal`
+# 0, 90, 180, 270
+ORTHOGONAL_SHIFTS = [[-1, 0], [0, 1], [1, 0], [0, -1]]
+
+# Value used for neighbors which fall off the map.
+OFF_MAP = -10000
+
+# Profile classes.
+SLOPE = 0
+SUMMIT = 1
+SADDLE = 2
+FLAT = 3
+
+
+def _buildProfileTable():
+    """
+    Builds the lookup table which maps a 16 bit neighbor code to a
+    profile class. The low byte holds one bit per higher neighbor, the
+    high byte one bit per lower neighbor, in :const:`DIAGONAL_SHIFTS` order.
+    Neighbors with neither bit set are ignored, exactly like zero
+    elevation neighbors are in :meth:`AnalyzeData.summit_and_saddle`
+    :return: numpy array of profile classes indexed by code.
+    """
+    saddleProfile = ["HLHL", "LHLH"]
+    summitProfile = "L"
+    table = numpy.zeros(1 << 16, dtype=numpy.uint8)
+    for states in itertools.product('HL-', repeat=8):
+        code = 0
+        for bit, state in enumerate(states):
+            if state == 'H':
+                code |= 1 << bit
+            elif state == 'L':
+                code |= 1 << (bit + 8)
+        profile = compressRepetetiveChars(''.join(states).replace('-', ''))
+        if profile == summitProfile:
+            table[code] = SUMMIT
+        elif any(x in profile for x in saddleProfile):
+            table[code] = SADDLE
+    return table
+
+
+PROFILE_TABLE = _buildProfileTable()
+
+
+def padMap(numpy_map):
+    """
+    :param numpy_map: 2d numpy array of elevations.
+    :return: copy of `numpy_map` with a one point border of
+     :const:`OFF_MAP` all the way around.
+    """
+    dtype = numpy.promote_types(numpy_map.dtype, numpy.int16)
+    return numpy.pad(numpy.asarray(numpy_map, dtype=dtype), 1,
+                     mode='constant', constant_values=OFF_MAP)
+
+
+def paddedWindow(numpy_map, x0, y0, x1, y1):
+    """
+    Cuts a window out of `numpy_map`, along with a one point border.
+    The border holds the neighboring elevations, or :const:`OFF_MAP`
+    where the window touches the edge of the map.
+    :param numpy_map: 2d numpy array of elevations.
+    :param x0: first x coordinate of the window.
+    :param y0: first y coordinate of the window.
+    :param x1: x coordinate after the end of the window.
+    :param y1: y coordinate after the end of the window.
+    :return: numpy array of shape (x1 - x0 + 2, y1 - y0 + 2)
+    """
+    xSpan, ySpan = numpy_map.shape
+    readX0 = max(x0 - 1, 0)
+    readY0 = max(y0 - 1, 0)
+    readX1 = min(x1 + 1, xSpan)
+    readY1 = min(y1 + 1, ySpan)
+    data = numpy.asarray(numpy_map[readX0:readX1, readY0:readY1])
+    dtype = numpy.promote_types(data.dtype, numpy.int16)
+    window = numpy.empty((x1 - x0 + 2, y1 - y0 + 2), dtype=dtype)
+    window.fill(OFF_MAP)
+    window[readX0 - x0 + 1:readX1 - x0 + 1,
+           readY0 - y0 + 1:readY1 - y0 + 1] = data
+    return window
+
+
+def neighborElevations(padded, xs, ys, shifts=DIAGONAL_SHIFTS):
+    """
+    Reads the neighbor elevations of many points at once. Neighbors
+    off the interior of `padded` read as :const:`OFF_MAP`, even where
+    its border holds real elevations (see :func:`paddedWindow`), just
+    like :meth:`DataMap.iterateDiagonal` returns them.
+    :param padded: elevations with a one point border (see :func:`padMap`)
+    :param xs: x coordinate, or numpy array of them, in the interior.
+    :param ys: y coordinate, or numpy array of them, in the interior.
+    :param shifts: :const:`DIAGONAL_SHIFTS` or :const:`ORTHOGONAL_SHIFTS`
+    :return: numpy array of shape (len(shifts),), or (len(xs),
+     len(shifts)), of neighbor elevations in `shifts` order.
+    """
+    shifts = numpy.asarray(shifts)
+    xs = numpy.asarray(xs)[..., numpy.newaxis] + shifts[:, 0]
+    ys = numpy.asarray(ys)[..., numpy.newaxis] + shifts[:, 1]
+    elevations = padded[xs + 1, ys + 1]
+    offMap = (xs < 0) | (xs > padded.shape[0] - 3) | \
+        (ys < 0) | (ys > padded.shape[1] - 3)
+    elevations[offMap] = OFF_MAP
+    return elevations
+
+
+def neighborCodes(padded):
+    """
+    Encodes the neighbor profile of every interior point of a padded
+    raster.
+    :param padded: elevations with a one point border (see :func:`padMap`)
+    :return: (codes, flat) numpy arrays the size of the interior. `codes`
+     are the 16 bit neighbor codes, `flat` marks points with an equal
+     height, non zero neighbor (MultiPoint candidates).
+    """
+    xSpan = padded.shape[0] - 2
+    ySpan = padded.shape[1] - 2
+    center = padded[1:xSpan + 1, 1:ySpan + 1]
+    codes = numpy.zeros((xSpan, ySpan), dtype=numpy.uint16)
+    flat = numpy.zeros((xSpan, ySpan), dtype=bool)
+    for bit, shift in enumerate(DIAGONAL_SHIFTS):
+        neighbor = padded[1 + shift[0]:xSpan + 1 + shift[0],
+                          1 + shift[1]:ySpan + 1 + shift[1]]
+        # Zero elevation neighbors are skipped entirely.
+        counted = neighbor != 0
+        codes |= ((neighbor > center) & counted).astype(numpy.uint16) << bit
+        codes |= ((neighbor < center) & counted).astype(numpy.uint16) \
+            << (bit + 8)
+        flat |= (neighbor == center) & counted
+    return codes, flat
+
+
+def classifyNeighborProfiles(numpy_map, padded=None):
+    """
+    Classify every point in `numpy_map` as :const:`SLOPE`,
+    :const:`SUMMIT`, :const:`SADDLE` or :const:`FLAT`.
+    :param numpy_map: 2d numpy array of elevations.
+    :param padded: optional pre padded version of `numpy_map`
+    :return: numpy array of profile classes.
+    """
+    if padded is None:
+        padded = padMap(numpy_map)
+    codes, flat = neighborCodes(padded)
+    classes = PROFILE_TABLE[codes]
+    classes[flat] = FLAT
+    return classes
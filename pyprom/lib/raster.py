@@ -0,0 +1,179 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains read only 2d array like objects which read their
+elevations on demand, one window at a time.
+"""
+
+import numpy
+
+from abc import ABCMeta, abstractmethod
+
+# Rows read at a time when copying a whole raster band.
+STRIP_ROWS = 512
+
+
+class WindowedArray(ABCMeta('_WindowedArrayBase', (object,), {})):
+    """
+    Abstract base class for read only 2d array like objects. Children
+    pass :attr:`shape` and :attr:`dtype` up and implement
+    :meth:`window`, which everything else is built on. Point and
+    rectangular slice reads only read what they touch, so tiled analysis
+    of a :class:`DataMap` backed by one never holds more than a tile in
+    memory.
+    :param shape: (x span, y span)
+    :param dtype: dtype of the elevations.
+    """
+    def __init__(self, shape, dtype):
+        super(WindowedArray, self).__init__()
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.ndim = 2
+        self.size = self.shape[0] * self.shape[1]
+
+    @abstractmethod
+    def window(self, x0, y0, x1, y1):
+        """
+        Reads a window of the array.
+        :param x0: first x coordinate.
+        :param y0: first y coordinate.
+        :param x1: x coordinate after the end of the window.
+        :param y1: y coordinate after the end of the window.
+        :return: numpy array of shape (x1 - x0, y1 - y0)
+        """
+
+    def point(self, x, y):
+        """
+        :param x: x coordinate.
+        :param y: y coordinate.
+        :return: elevation at x, y
+        """
+        return self.window(x, y, x + 1, y + 1)[0, 0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        indices = (slice, int, numpy.integer)
+        if len(key) != 2 or not all(isinstance(k, indices) for k in key):
+            return numpy.asarray(self)[key]
+        ranges = list()
+        for k, span in zip(key, self.shape):
+            if isinstance(k, slice):
+                ranges.append(k.indices(span))
+                continue
+            k = int(k)
+            if k < 0:
+                k += span
+            if not 0 <= k < span:
+                raise IndexError('index {} is out of bounds for axis with'
+                                 ' size {}'.format(k, span))
+            ranges.append((k, k + 1, 1))
+        (x0, x1, xStep), (y0, y1, yStep) = ranges
+        if not isinstance(key[0], slice) and not isinstance(key[1], slice):
+            return self.point(x0, y0)
+        if xStep != 1 or yStep != 1:
+            return numpy.asarray(self)[key]
+        out = self.window(x0, y0, x1, y1)
+        if not isinstance(key[0], slice):
+            return out[0]
+        if not isinstance(key[1], slice):
+            return out[:, 0]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.window(0, 0, self.shape[0], self.shape[1])
+        if dtype is not None:
+            out = out.astype(dtype)
+        return out
+
+    def __len__(self):
+        return self.shape[0]
+
+
+class BandArray(WindowedArray):
+    """
+    Presents one band of a GDAL raster as a read only 2d array. Windows
+    are read from the band as they are accessed, and nodata points read
+    as `fill`.
+    :param band: GDAL raster band, such as
+     ``gdal.Open(filename).GetRasterBand(1)``. The dataset it came from
+     must be kept open while this is in use.
+    :param nodata: elevation marking missing points. Defaults to the
+     band's own nodata value, if it has one.
+    :param fill: elevation to read in place of nodata points.
+    """
+    def __init__(self, band, nodata=None, fill=0):
+        if nodata is None:
+            nodata = band.GetNoDataValue()
+        self.band = band
+        self.nodata = nodata
+        self.fill = fill
+        # rows are y in GDAL and x here.
+        dtype = band.ReadAsArray(0, 0, 1, 1).dtype
+        super(BandArray, self).__init__((band.YSize, band.XSize), dtype)
+
+    def _fillNodata(self, elevations):
+        """
+        Replaces nodata points of `elevations` in place.
+        :param elevations: numpy array read from the band.
+        """
+        if self.nodata is None:
+            return
+        if self.nodata != self.nodata:
+            # NaN
+            mask = numpy.isnan(elevations)
+        else:
+            mask = elevations == self.nodata
+        elevations[mask] = self.fill
+
+    def window(self, x0, y0, x1, y1):
+        """
+        :param x0: first x coordinate.
+        :param y0: first y coordinate.
+        :param x1: x coordinate after the end of the window.
+        :param y1: y coordinate after the end of the window.
+        :return: numpy array of shape (x1 - x0, y1 - y0)
+        """
+        if x1 <= x0 or y1 <= y0:
+            return numpy.zeros((max(x1 - x0, 0), max(y1 - y0, 0)),
+                               dtype=self.dtype)
+        elevations = self.band.ReadAsArray(y0, x0, y1 - y0, x1 - x0)
+        self._fillNodata(elevations)
+        return elevations
+
+    def stripRows(self):
+        """
+        :return: rows per strip read by :meth:`copyTo`, a multiple of the
+         band's native block height so every block is decoded once.
+        """
+        blockRows = max(self.band.GetBlockSize()[1], 1)
+        return blockRows * max(STRIP_ROWS // blockRows, 1)
+
+    def copyTo(self, out):
+        """
+        Streams the whole band into `out` one full width strip of native
+        blocks at a time. GDAL writes straight into `out`, so only `out`
+        is ever held in memory.
+        :param out: C ordered numpy array or :class:`numpy.memmap` of
+         :attr:`shape`.
+        :return: out
+        """
+        if tuple(out.shape) != self.shape:
+            raise ValueError('Cannot copy band of shape {} into shape'
+                             ' {}'.format(self.shape, out.shape))
+        step = self.stripRows()
+        for x in range(0, self.shape[0], step):
+            strip = out[x:x + step]
+            self.band.ReadAsArray(0, x, self.shape[1], strip.shape[0],
+                                  buf_obj=strip)
+            self._fillNodata(strip)
+        return out
+
+    def __repr__(self):
+        return "<BandArray> Shape {}, {}, Nodata {}".format(
+            self.shape, self.dtype, self.nodata)
+
+    __unicode__ = __str__ = __repr__
@@ -0,0 +1,139 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains array based analysis of shores (the non equal
+neighbors of a point or equal height area): splitting a ring of shore
+points into high runs, and grouping the high points of an area's shore
+into connected high shores.
+"""
+
+import numpy
+
+# Half of the diagonal neighborhood, each pair of neighbors
+# only needs to be compared once.
+FORWARD_SHIFTS = [[0, 1], [1, -1], [1, 0], [1, 1]]
+
+
+def connectedComponents(nodeCount, a, b):
+    """
+    Resolves connected components with vectorized hooking and
+    pointer jumping.
+    :param nodeCount: number of nodes.
+    :param a: numpy array of edge start nodes.
+    :param b: numpy array of edge end nodes.
+    :return: numpy array which maps each node to the lowest node
+     in its component.
+    """
+    parent = numpy.arange(nodeCount)
+    while True:
+        rootA = parent[a]
+        rootB = parent[b]
+        unresolved = rootA != rootB
+        if not unresolved.any():
+            return parent
+        rootA = rootA[unresolved]
+        rootB = rootB[unresolved]
+        lowest = numpy.minimum(rootA, rootB)
+        numpy.minimum.at(parent, rootA, lowest)
+        numpy.minimum.at(parent, rootB, lowest)
+        while True:
+            jumped = parent[parent]
+            if numpy.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+def highRuns(elevations, blobElevation):
+    """
+    Splits a ring of shore points (the neighbors of a point, in order
+    around it) into runs of high points. Low points end a run, equal
+    points neither end nor join one, and points at elevation 0 (sea
+    level) join a run which is already going. A run still going at the
+    end of the ring is joined onto the first run if the ring starts high.
+    :param elevations: numpy array of shore elevations in ring order.
+    :param blobElevation: elevation of the point or area.
+    :return: list of numpy arrays of indices into `elevations`, one per
+     run.
+    """
+    elevations = numpy.asarray(elevations)
+    high = elevations > blobElevation
+    low = elevations < blobElevation
+    if not high.any():
+        return list()
+    # Runs are numbered by the count of low points before them.
+    run = numpy.cumsum(low)
+    highSeen = numpy.cumsum(high)
+    lastLow = numpy.maximum.accumulate(
+        numpy.where(low, numpy.arange(len(low)), -1))
+    highBefore = numpy.where(lastLow >= 0, highSeen[lastLow], 0)
+    member = high | ((elevations == 0) & ~low & (highSeen > highBefore))
+    indices = numpy.flatnonzero(member)
+    runs = run[indices]
+    splits = numpy.flatnonzero(runs[1:] != runs[:-1]) + 1
+    groups = numpy.split(indices, splits)
+    if len(groups) > 1 and high[0] and runs[-1] == run[-1] and run[-1]:
+        groups[0] = numpy.concatenate([groups.pop(), groups[0]])
+    return groups
+
+
+def highGroups(xs, ys, elevations, blobElevation, shape=None):
+    """
+    Groups the high points of an equal height area's shore into 8
+    connected high shores.
+    :param xs: numpy array of shore x coordinates.
+    :param ys: numpy array of shore y coordinates.
+    :param elevations: numpy array of shore elevations.
+    :param blobElevation: elevation of the area.
+    :param shape: optional shape of the map, shore points off the map
+     are then never high.
+    :return: list of numpy arrays of indices into `xs`, one per high
+     shore. High shores are ordered by their first point, and points
+     within them in row major order.
+    """
+    high = numpy.asarray(elevations) > blobElevation
+    if shape is not None:
+        high &= (xs >= 0) & (xs < shape[0]) & (ys >= 0) & (ys < shape[1])
+    indices = numpy.flatnonzero(high)
+    if not len(indices):
+        return list()
+    xs = numpy.asarray(xs, dtype=numpy.int64)[indices]
+    ys = numpy.asarray(ys, dtype=numpy.int64)[indices]
+    # Pack into row major keys with room for a neighbor on every side.
+    ys = ys - ys.min() + 1
+    width = int(ys.max()) + 2
+    keys = (xs - xs.min() + 1) * width + ys
+    order = numpy.argsort(keys, kind='mergesort')
+    indices = indices[order]
+    roots = neighborComponents(keys[order], width)
+    # Roots are the first point of each group, so sorting by root keeps
+    # groups in order of their first point.
+    order = numpy.argsort(roots, kind='mergesort')
+    roots = roots[order]
+    splits = numpy.flatnonzero(roots[1:] != roots[:-1]) + 1
+    return numpy.split(indices[order], splits)
+
+
+def neighborComponents(keys, width):
+    """
+    Groups points into 8 connected components.
+    :param keys: sorted numpy array of row major point keys. Every point
+     needs room for a neighbor on every side, so no point may lie on
+     the first or last column of a row `width` wide.
+    :param width: row length the keys were packed with.
+    :return: numpy array which maps each point to the first point
+     in its component.
+    """
+    starts = list()
+    ends = list()
+    for shift in FORWARD_SHIFTS:
+        neighbors = keys + shift[0] * width + shift[1]
+        found = numpy.searchsorted(keys, neighbors)
+        found[found == len(keys)] = 0
+        linked = numpy.flatnonzero(keys[found] == neighbors)
+        starts.append(linked)
+        ends.append(found[linked])
+    return connectedComponents(len(keys), numpy.concatenate(starts),
+                               numpy.concatenate(ends))
@@ -0,0 +1,186 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a grid bucket spatial index over latitude/longitude
+arrays, used to answer radius, rectangle and nearest neighbor queries
+without scanning every point.
+"""
+
+from __future__ import division
+
+import numpy
+
+# Average number of points per occupied bucket the index aims for.
+POINTS_PER_BUCKET = 4
+
+
+class GridIndex(object):
+    """
+    Buckets points into a regular latitude/longitude grid. Points are
+    sorted by bucket (row major), so every grid row of a query window is
+    one contiguous run of the sorted points.
+
+    Distances are measured like :meth:`SpotElevationContainer.radius`:
+    sqrt((dLong * 3600 * longScale)^2 + (dLat * 3600 * latScale)^2)
+    where the scales are meters per arcsecond.
+    :param latitudes: numpy array of latitudes in dotted decimal.
+    :param longitudes: numpy array of longitudes in dotted decimal.
+    :param bucketSize: bucket size in degrees. Chosen from the extent and
+     the number of points if not given.
+    """
+    def __init__(self, latitudes, longitudes, bucketSize=None):
+        super(GridIndex, self).__init__()
+        self.latitudes = numpy.asarray(latitudes, dtype=numpy.float64)
+        self.longitudes = numpy.asarray(longitudes, dtype=numpy.float64)
+        self.size = len(self.latitudes)
+        if self.size:
+            self.minLatitude = self.latitudes.min()
+            self.minLongitude = self.longitudes.min()
+            latSpan = self.latitudes.max() - self.minLatitude
+            longSpan = self.longitudes.max() - self.minLongitude
+        else:
+            self.minLatitude = self.minLongitude = 0.0
+            latSpan = longSpan = 0.0
+        if bucketSize is None:
+            area = max(latSpan, 1e-6) * max(longSpan, 1e-6)
+            bucketSize = (area * POINTS_PER_BUCKET / max(self.size, 1)) ** .5
+        self.bucketSize = max(bucketSize, 1e-9)
+        self.rows = int(latSpan // self.bucketSize) + 1
+        self.columns = int(longSpan // self.bucketSize) + 1
+
+        row, column = self._bucket(self.latitudes, self.longitudes)
+        keys = row * self.columns + column
+        self.order = numpy.argsort(keys, kind='mergesort')
+        self.keys = keys[self.order]
+
+    def _bucket(self, latitudes, longitudes):
+        """
+        :return: (row, column) numpy arrays of the buckets holding
+         these coordinates, clipped to the grid.
+        """
+        row = numpy.floor((numpy.asarray(latitudes) - self.minLatitude) /
+                          self.bucketSize)
+        column = numpy.floor((numpy.asarray(longitudes) -
+                              self.minLongitude) / self.bucketSize)
+        return (numpy.clip(row, 0, self.rows - 1).astype(numpy.int64),
+                numpy.clip(column, 0, self.columns - 1).astype(numpy.int64))
+
+    def window(self, lowerlat, lowerlong, upperlat, upperlong):
+        """
+        :return: numpy array of (unsorted) indices of all points in the
+         buckets touching the window. This is a superset of the points
+         inside the window.
+        """
+        if not self.size or upperlat < self.minLatitude or \
+                upperlong < self.minLongitude:
+            return numpy.zeros(0, dtype=numpy.int64)
+        (row0, row1), (column0, column1) = self._bucket(
+            [lowerlat, upperlat], [lowerlong, upperlong])
+        rows = numpy.arange(row0, row1 + 1) * self.columns
+        starts = numpy.searchsorted(self.keys, rows + column0, 'left')
+        ends = numpy.searchsorted(self.keys, rows + column1, 'right')
+        lengths = ends - starts
+        total = lengths.sum()
+        if not total:
+            return numpy.zeros(0, dtype=numpy.int64)
+        # Concatenated ranges starts[i]:ends[i] without a Python loop.
+        offsets = numpy.cumsum(lengths) - lengths
+        positions = numpy.arange(total) + numpy.repeat(starts - offsets,
+                                                       lengths)
+        return self.order[positions]
+
+    def distance(self, lat, long, indices, latScale, longScale):
+        """
+        :param lat: latitude of center in dotted decimal
+        :param long: longitude of center in dotted decimal
+        :param indices: numpy array of point indices.
+        :param latScale: meters per arcsecond of latitude.
+        :param longScale: meters per arcsecond of longitude.
+        :return: numpy array of distances in meters.
+        """
+        latDist = (numpy.abs(lat - self.latitudes[indices]) * 3600) *\
+            latScale
+        longDist = (numpy.abs(long - self.longitudes[indices]) * 3600) *\
+            longScale
+        return numpy.sqrt(longDist**2 + latDist**2)
+
+    def _circle(self, lat, long, distance, latScale, longScale):
+        """
+        :return: candidate indices for all points within `distance`.
+        """
+        # A hair of slack so rounding never drops a point on the rim.
+        slack = 1 + 1e-9
+        latReach = distance * slack / (3600 * latScale) + 1e-12
+        if longScale:
+            longReach = distance * slack / (3600 * abs(longScale)) + 1e-12
+        else:
+            longReach = numpy.inf
+        return self.window(lat - latReach, long - longReach,
+                           lat + latReach, long + longReach)
+
+    def rectangle(self, lowerlat, lowerlong, upperlat, upperlong):
+        """
+        :return: sorted numpy array of indices of all points strictly
+         inside (lowerlat, lowerlong) - (upperlat, upperlong)
+        """
+        indices = self.window(lowerlat, lowerlong, upperlat, upperlong)
+        latitudes = self.latitudes[indices]
+        longitudes = self.longitudes[indices]
+        inside = (lowerlat < latitudes) & (latitudes < upperlat) & \
+            (lowerlong < longitudes) & (longitudes < upperlong)
+        return numpy.sort(indices[inside])
+
+    def radius(self, lat, long, distance, latScale, longScale):
+        """
+        :param lat: latitude of center in dotted decimal
+        :param long: longitude of center in dotted decimal
+        :param distance: distance in meters.
+        :param latScale: meters per arcsecond of latitude.
+        :param longScale: meters per arcsecond of longitude.
+        :return: sorted numpy array of indices of all points within
+         `distance`.
+        """
+        indices = self._circle(lat, long, distance, latScale, longScale)
+        inside = self.distance(lat, long, indices,
+                               latScale, longScale) <= distance
+        return numpy.sort(indices[inside])
+
+    def nearest(self, lat, long, k, latScale, longScale):
+        """
+        :param lat: latitude of center in dotted decimal
+        :param long: longitude of center in dotted decimal
+        :param k: number of points to find.
+        :param latScale: meters per arcsecond of latitude.
+        :param longScale: meters per arcsecond of longitude.
+        :return: (indices, distances) numpy arrays of the `k` nearest
+         points, closest first. Ties go to the lower index.
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return (numpy.zeros(0, dtype=numpy.int64),
+                    numpy.zeros(0, dtype=numpy.float64))
+        reach = self.bucketSize * 3600 * min(latScale, abs(longScale) or
+                                             latScale)
+        while True:
+            indices = self._circle(lat, long, reach, latScale, longScale)
+            everything = len(indices) == self.size
+            if len(indices) >= k:
+                distances = self.distance(lat, long, indices,
+                                          latScale, longScale)
+                kth = numpy.partition(distances, k - 1)[k - 1]
+                # Every point within kth is inside the searched window.
+                if kth <= reach or everything:
+                    order = numpy.lexsort((indices, distances))[:k]
+                    return indices[order], distances[order]
+                reach = kth
+            else:
+                reach *= 2
+
+    def __repr__(self):
+        return "<GridIndex> {} Points, {} x {} Buckets of {} Degrees".format(
+            self.size, self.rows, self.columns, self.bucketSize)
+
+    __unicode__ = __str__ = __repr__
@@ -10,29 +10,50 @@ from __future__ import division
 import numpy
 import logging
 
-from collections import defaultdict
+from collections import namedtuple
 from timeit import default_timer
 from datetime import timedelta
 from lib.locations.gridpoint import GridPoint
 from lib.locations.saddle import Saddle
 from lib.locations.summit import Summit
-from lib.locations.inverse_edgepoint import InverseEdgePoint
 from lib.containers.spot_elevation import SpotElevationContainer
-from lib.containers.multipoint import MultiPoint
-from lib.containers.inverse_edgepoint import InverseEdgePointContainer
-from lib.containers.high_edge import HighEdgeContainer
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
 from lib.containers.gridpoint import GridPointContainer
-from lib.util import (coordinateHashToGridPointList,
-                      compressRepetetiveChars)
+from lib.util import compressRepetetiveChars
+from lib.neighbor_profile import (classifyNeighborProfiles,
+                                  neighborElevations, DIAGONAL_SHIFTS,
+                                  SLOPE, SUMMIT, FLAT)
+from lib.equal_height import EqualHeightLabels, cellsToMultiPoint
+from lib.metrics import Metrics
+from lib.cellset import CellSet
+from lib.shore import highRuns
+
+# Everything needed to build a :class:`Summit` or :class:`Saddle`, in
+# plain picklable types so records can be produced in other processes.
+# kind: 'Summit' or 'Saddle'
+# key: row major index of the point which found this feature. Features are
+#  returned in key order.
+# cells: (x, y) numpy arrays of the MultiPoint, or None.
+# shore: (x, y, elevation) numpy arrays of the MultiPoint shore, or None.
+# highShores: list of lists of (x, y, elevation) tuples, or None.
+# Candidates whose neighbor elevations are read at a time.
+NEIGHBOR_CHUNK = 8192
+
+FeatureRecord = namedtuple('FeatureRecord',
+                           ['kind', 'key', 'x', 'y', 'elevation', 'edge',
+                            'cells', 'shore', 'highShores'])
 
 
 class AnalyzeData(object):
-    def __init__(self, datamap):
+    def __init__(self, datamap, metrics=None):
         """
         :param datamap: `DataMap` object.
+        :param metrics: optional :class:`Metrics` to record into.
         """
         self.logger = logging.getLogger('pyProm.{}'.format(__name__))
         self.datamap = datamap
+        self.metrics = metrics or Metrics()
         self.data = self.datamap.numpy_map
         self.edge = False
         self.max_y = self.datamap.max_y
@@ -40,59 +61,191 @@ class AnalyzeData(object):
         self.max_x = self.datamap.max_x
         self.span_latitude = self.datamap.span_latitude
         self.cardinalGrid = dict()
-        self.skipAnalysis = defaultdict(list)
+        self.skipAnalysis = CellSet(self.data.shape)
+        self.blobLabels = None
 
-    def analyze(self):
+    def analyze(self, compact=False):
         """
         Analyze Routine.
         Looks for :class:`Summit`s, and :class:`Saddle`s
+        :param compact: return :class:`CompactSpotElevationContainer`s
         return: (:class:`SpotElevationContainer`,SpotElevationContainer)
         """
-        self.start = default_timer()
-        self.lasttime = self.start
         self.logger.info("Initiating Analysis")
-        self.summitObjects = SpotElevationContainer([])
-        self.saddleObjects = SpotElevationContainer([])
-        iterator = numpy.nditer(self.data, flags=['multi_index'])
-        index = 0
-        # Iterate through numpy grid, and keep track of gridpoint coordinates.
-        while not iterator.finished:
-            x, y = iterator.multi_index
-            self.elevation = float(iterator[0])
-
-            # Quick Progress Meter. Needs refinement,
-            index += 1
-            if not index % 100000:
-
-                thisTime = default_timer()
-                split = round(thisTime - self.lasttime, 2)
-                self.lasttime = default_timer()
-                rt = self.lasttime - self.start
-                pointsPerSec = round(index/rt, 2)
-                self.logger.info(
-                    "Points per second: {} - {}%"
-                    " runtime: {}, split: {}".format(
-                        pointsPerSec,
-                        round(index/self.data.size * 100, 2),
-                        (str(timedelta(seconds=round(rt, 2)))),
-                        split
-                    ))
-
-            # Check for summit or saddle
-            result = self.summit_and_saddle(x, y)
-            if result:
+        if compact:
+            self.summitObjects = CompactSpotElevationContainer(
+                datamap=self.datamap)
+            self.saddleObjects = CompactSpotElevationContainer(
+                datamap=self.datamap)
+        else:
+            self.summitObjects = SpotElevationContainer([])
+            self.saddleObjects = SpotElevationContainer([])
+        with self.metrics.timer('analyze'):
+            for record in self.featureRecords():
+                result = self.buildFeature(record)
                 if isinstance(result, Saddle):
-                    self.saddleObjects.points.append(result)
+                    self.saddleObjects.append(result)
                 if isinstance(result, Summit):
-                    self.summitObjects.points.append(result)
-            # Reset variables, and go to next gridpoint.
-            self.edge = False
-            self.blob = None
-            iterator.iternext()
+                    self.summitObjects.append(result)
+        self.metrics.snapshot('analyze')
         # Free some memory.
         del(self.skipAnalysis)
+        self.blobLabels = None
         return self.summitObjects, self.saddleObjects
 
+    def featureRecords(self, padded=None, region=None, skipLabels=None):
+        """
+        Generator which finds :class:`Summit`s and :class:`Saddle`s, and
+        yields them as :class:`FeatureRecord`s in row major order.
+        :param padded: optional pre padded version of the map,
+         see :func:`padMap`
+        :param region: optional (x0, y0, x1, y1) half open window, only
+         features found from a point in this window are returned.
+        :param skipLabels: optional numpy bool array indexed by
+         `self.blobLabels` label. Equal height areas flagged here
+         are skipped.
+        """
+        self.start = default_timer()
+        self.lasttime = self.start
+        if padded is None:
+            padded = self.datamap.padded()
+
+        # Vectorized pre-pass: only summit, saddle and flat candidates
+        # need to be looked at point by point.
+        # Equal height areas are labeled up front, and only need to be
+        # looked at from their first point.
+        with self.metrics.timer('classify'):
+            classes = classifyNeighborProfiles(self.data, padded=padded)
+        if self.blobLabels is None:
+            with self.metrics.timer('equalHeightLabels'):
+                self.blobLabels = EqualHeightLabels(self.data,
+                                                    padded=padded)
+            self.metrics.count('equalHeightAreas', self.blobLabels.count)
+            self.metrics.observeMany(
+                'equalHeightAreaSize',
+                numpy.diff(self.blobLabels._cellOffsets[1:]))
+        firstCells = numpy.zeros(self.data.shape, dtype=bool)
+        firstCells.flat[self.blobLabels.firstCell[1:]] = True
+        if skipLabels is not None:
+            firstCells.flat[self.blobLabels.firstCell[skipLabels]] = False
+        candidates = (classes != SLOPE) & ((classes != FLAT) | firstCells)
+        if region is not None:
+            inRegion = numpy.zeros(self.data.shape, dtype=bool)
+            inRegion[region[0]:region[2], region[1]:region[3]] = True
+            candidates &= inRegion
+        # Equal height areas with a single high shore away from the map
+        # edge are neither summits nor saddles, and are resolved in bulk.
+        flats = candidates & (classes == FLAT)
+        flatLabels = self.blobLabels.labels[flats]
+        with self.metrics.timer('findHighEdges'):
+            highShoreCounts = self.blobLabels.highShoreCounts()
+        emitted = (highShoreCounts[flatLabels] != 1) | \
+            self.blobLabels.mapEdge[flatLabels]
+        candidates[flats] = emitted
+        resolved = numpy.zeros(self.blobLabels.count + 1, dtype=bool)
+        resolved[flatLabels[~emitted]] = True
+        cells = self.blobLabels._cells[
+            resolved[self.blobLabels.labels.flat[self.blobLabels._cells]]]
+        self.skipAnalysis.addMany(*numpy.divmod(cells, self.data.shape[1]))
+        candidates = numpy.flatnonzero(candidates)
+        self.logger.info("{} Candidates out of {} points".format(
+            len(candidates), self.data.size))
+        self.metrics.count('points', self.data.size)
+        self.metrics.count('candidates', len(candidates))
+
+        index = 0
+        for start in range(0, len(candidates), NEIGHBOR_CHUNK):
+            xs, ys = numpy.divmod(candidates[start:start + NEIGHBOR_CHUNK],
+                                  self.data.shape[1])
+            # Neighbor elevations of the whole chunk, read in one go.
+            neighbors = neighborElevations(padded, xs, ys).astype(
+                numpy.float64).tolist()
+            for x, y, neighbor in zip(xs.tolist(), ys.tolist(), neighbors):
+                index += 1
+                record = self._candidateRecord(x, y, neighbor, classes,
+                                               index, len(candidates))
+                if record:
+                    self.metrics.count(record.kind.lower() + 's')
+                    if record.cells is not None:
+                        self.metrics.count('multipoints')
+                    yield record
+
+    def _candidateRecord(self, x, y, neighbors, classes, index, count):
+        """
+        :param x:
+        :param y:
+        :param neighbors: list of neighbor elevations in
+         :meth:`DataMap.iterateDiagonal` order.
+        :param classes: numpy array of profile classes.
+        :param index: number of this candidate, from 1.
+        :param count: number of candidates.
+        :return: :class:`FeatureRecord` or None
+        """
+        self.elevation = float(self.data[x, y])
+
+        # Quick Progress Meter. Needs refinement,
+        if not index % 100000:
+
+            thisTime = default_timer()
+            split = round(thisTime - self.lasttime, 2)
+            self.lasttime = default_timer()
+            rt = self.lasttime - self.start
+            pointsPerSec = round(index/rt, 2)
+            self.logger.info(
+                "Candidates per second: {} - {}%"
+                " runtime: {}, split: {}".format(
+                    pointsPerSec,
+                    round(index/count * 100, 2),
+                    (str(timedelta(seconds=round(rt, 2)))),
+                    split
+                ))
+
+        # Summits are fully resolved by the profile table, saddles
+        # and flats need a closer look.
+        if classes[x, y] == SUMMIT:
+            record = FeatureRecord('Summit', x * self.data.shape[1] + y,
+                                   x, y, self.elevation,
+                                   x in (self.max_x, 0) or
+                                   y in (self.max_y, 0),
+                                   None, None, None)
+        else:
+            record = self._pointRecord(x, y, neighbors)
+        # Reset variables, and go to next candidate.
+        self.edge = False
+        return record
+
+    def buildFeature(self, record, latitude=None, longitude=None):
+        """
+        :param record: :class:`FeatureRecord`
+        :param latitude: latitude of the record, if already converted.
+        :param longitude: longitude of the record, if already converted.
+        :return: :class:`Summit` or :class:`Saddle`
+        """
+        if latitude is None:
+            latitude = self.datamap.x_to_latitude(record.x)
+        if longitude is None:
+            longitude = self.datamap.y_to_longitude(record.y)
+        multiPoint = None
+        if record.cells is not None:
+            multiPoint = cellsToMultiPoint(
+                record.cells, record.elevation, self.datamap,
+                shore=record.shore, mapEdge=record.edge)
+        if record.kind == 'Summit':
+            return Summit(latitude,
+                          longitude,
+                          record.elevation,
+                          edge=record.edge,
+                          multiPoint=multiPoint)
+        return Saddle(latitude,
+                      longitude,
+                      record.elevation,
+                      edge=record.edge,
+                      multiPoint=multiPoint,
+                      highShores=[GridPointContainer(
+                                  [GridPoint(x, y, elevation)
+                                   for x, y, elevation in shore])
+                                  for shore in record.highShores])
+
     def analyze_multipoint(self, x, y, ptElevation):
         """
         :param x:
@@ -100,86 +253,119 @@ class AnalyzeData(object):
         :param ptElevation: Elevation of Multipoint Blob
         :return: Summit, Saddle, or None
         """
-        self.blob = self.equalHeightBlob(x, y, ptElevation)
-        highInverseEdge = self.blob.inverseEdgePoints.findHighEdges(
-            self.elevation)
-
-        for exemptPoint in self.blob.points:
-            self.skipAnalysis[exemptPoint.x] \
-                .append(exemptPoint.y)
-        if not len(highInverseEdge):
-            summit = Summit(self.datamap.x_to_latitude(x),
-                            self.datamap.y_to_longitude(y),
-                            self.elevation,
-                            edge=self.edge,
-                            multiPoint=self.blob
-                            )
-            return summit
-        if (len(highInverseEdge) > 1) or\
-                (len(highInverseEdge) == 1 and self.edge):
-            saddle = Saddle(self.datamap.x_to_latitude(x),
-                            self.datamap.y_to_longitude(y),
-                            self.elevation,
-                            edge=self.edge,
-                            multiPoint=self.blob,
-                            highShores=highInverseEdge)
-            return saddle
+        record = self._multipointRecord(x, y, ptElevation)
+        if record:
+            return self.buildFeature(record)
         return None
 
+    def _multipointRecord(self, x, y, ptElevation, key=None):
+        """
+        :param x:
+        :param y:
+        :param ptElevation: Elevation of Multipoint Blob
+        :param key: row major index of the point which found this blob.
+        :return: :class:`FeatureRecord` or None
+        """
+        if self.blobLabels is None:
+            self.blobLabels = EqualHeightLabels(
+                self.data, padded=self.datamap.padded())
+        label = self.blobLabels.labels[x, y]
+        if self.blobLabels.mapEdge[label]:
+            self.edge = True
+        cells = self.blobLabels.cells(label)
+        self.skipAnalysis.addMany(*cells)
+        if key is None:
+            key = int(cells[0][0]) * self.data.shape[1] + int(cells[1][0])
+        # High shores of every label are grouped in one pass on first use.
+        with self.metrics.timer('findHighEdges'):
+            highShoreCount = self.blobLabels.highShoreCounts()[label]
+        # A single high shore away from the map edge is neither.
+        if highShoreCount == 1 and not self.edge:
+            return None
+        shore = self.blobLabels.shore(label)
+        if not highShoreCount:
+            return FeatureRecord('Summit', key, x, y, self.elevation,
+                                 self.edge, cells, shore, None)
+        highShores = [list(zip(shoreX.tolist(), shoreY.tolist(),
+                               shoreElevation.astype(float).tolist()))
+                      for shoreX, shoreY, shoreElevation
+                      in self.blobLabels.highShores(label)]
+        return FeatureRecord('Saddle', key, x, y, self.elevation,
+                             self.edge, cells, shore, highShores)
+
     def summit_and_saddle(self, x, y):
         """
         :param x:
         :param y:
         :return: Summit, Saddle, or None
         """
+        record = self._pointRecord(x, y)
+        if record:
+            return self.buildFeature(record)
+        return None
+
+    def _pointRecord(self, x, y, neighbors=None):
+        """
+        :param x:
+        :param y:
+        :param neighbors: optional list of neighbor elevations in
+         :meth:`DataMap.iterateDiagonal` order, read from the map if not
+         given.
+        :return: :class:`FeatureRecord` or None
+        """
 
         # Exempt! bail out!
-        if y in self.skipAnalysis[x]:
+        if (x, y) in self.skipAnalysis:
             return None
 
         saddleProfile = ["HLHL", "LHLH"]
         summitProfile = "L"
+        key = x * self.data.shape[1] + y
 
         # Label this as an mapEdge under the following condition
         if x in (self.max_x, 0) or y in (self.max_y, 0):
             self.edge = True
 
         # Begin the ardous task of analyzing points and multipoints
-        neighbor = self.datamap.iterateDiagonal(x, y)
-        shoreSet = GridPointContainer([])
+        if neighbors is None:
+            neighbors = [elevation for _x, _y, elevation in
+                         self.datamap.iterateDiagonal(x, y)]
+        shoreX = list()
+        shoreY = list()
+        shoreElevation = list()
         neighborProfile = ""
-        for _x, _y, elevation in neighbor:
+        for shift, elevation in zip(DIAGONAL_SHIFTS, neighbors):
+            _x = x + shift[0]
+            _y = y + shift[1]
 
             # If we have equal neighbors, we need to kick off analysis to
             # a special MultiPoint analysis function.
             if not elevation:
                 continue
-            if elevation == self.elevation and _y not in \
-                    self.skipAnalysis[_x]:
-                return self.analyze_multipoint(_x, _y, elevation)
+            if elevation == self.elevation and \
+                    (_x, _y) not in self.skipAnalysis:
+                return self._multipointRecord(_x, _y, elevation, key)
             if elevation > self.elevation:
                 neighborProfile += "H"
             if elevation < self.elevation:
                 neighborProfile += "L"
-            shoreSet.points.append(GridPoint(_x, _y, elevation))
+            shoreX.append(_x)
+            shoreY.append(_y)
+            shoreElevation.append(elevation)
 
         reducedNeighborProfile = compressRepetetiveChars(neighborProfile)
         if reducedNeighborProfile == summitProfile:
-            summit = Summit(self.datamap.x_to_latitude(x),
-                            self.datamap.y_to_longitude(y),
-                            self.elevation,
-                            edge=self.edge)
-            return summit
+            return FeatureRecord('Summit', key, x, y, self.elevation,
+                                 self.edge, None, None, None)
 
         elif any(x in reducedNeighborProfile for x in saddleProfile):
-            shores = HighEdgeContainer(shoreSet, self.elevation)
-            saddle = Saddle(self.datamap.x_to_latitude(x),
-                            self.datamap.y_to_longitude(y),
-                            self.elevation,
-                            edge=self.edge,
-                            highShores=[GridPointContainer(x)
-                                        for x in shores.highPoints])
-            return saddle
+            return FeatureRecord('Saddle', key, x, y, self.elevation,
+                                 self.edge, None, None,
+                                 [[(shoreX[index], shoreY[index],
+                                    shoreElevation[index])
+                                   for index in run]
+                                  for run in highRuns(shoreElevation,
+                                                      self.elevation)])
         return None
 
     def equalHeightBlob(self, x, y, elevation):
@@ -190,36 +376,14 @@ class AnalyzeData(object):
         :param elevation: elevation
         :return: Multipoint Object containing all x,y coordinates and elevation
         """
-
-        masterGridPoint = GridPoint(x, y, elevation)
-        equalHeightHash = defaultdict(list)
-        equalHeightHash[x].append(y)
-        nesteddict = lambda: defaultdict(nesteddict)
-        inverseEdgeHash = nesteddict()  # InverseEdgepoint (shore).
-        toBeAnalyzed = [masterGridPoint]
-
-        # Loop until pool of equalHeight neighbors has been exhausted.
-        while toBeAnalyzed:
-            gridPoint = toBeAnalyzed.pop()
-            neighbors = self.datamap.iterateDiagonal(gridPoint.x, gridPoint.y)
-            # Determine if edge or not.
-            if gridPoint.x in (self.max_x, 0) or gridPoint.y in \
-                    (self.max_y, 0):
-                self.edge = True
-            for _x, _y, elevation in neighbors:
-                if elevation == masterGridPoint.elevation and\
-                                _y not in equalHeightHash[_x]:
-                    branch = GridPoint(_x, _y, elevation)
-                    equalHeightHash[_x].append(_y)
-                    toBeAnalyzed.append(branch)
-                elif elevation != masterGridPoint.elevation:
-                    if not inverseEdgeHash[_x][_y]:
-                        inverseEdgeHash[_x][_y] = \
-                            InverseEdgePoint(_x, _y, elevation)
-
-        return MultiPoint(coordinateHashToGridPointList(equalHeightHash),
-                          masterGridPoint.elevation, self.datamap,
-                          inverseEdgePoints=InverseEdgePointContainer(
-                              inverseEdgePointIndex=inverseEdgeHash,
-                              datamap=self.datamap, mapEdge=self.edge)
-                          )
+        if self.blobLabels is None:
+            self.blobLabels = EqualHeightLabels(
+                self.data, padded=self.datamap.padded())
+        label = self.blobLabels.labels[x, y]
+        if self.blobLabels.mapEdge[label]:
+            self.edge = True
+        multiPoint = self.blobLabels.multiPoint(label, elevation,
+                                                self.datamap)
+        self.metrics.count('equalHeightBlobs')
+        self.metrics.observe('equalHeightBlobSize', len(multiPoint))
+        return multiPoint
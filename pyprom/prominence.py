@@ -0,0 +1,153 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This file contains a class for computing the prominence of Summits
+from the Linkers built by :class:`Walk`.
+
+"""
+import logging
+
+
+class Prominence(object):
+    """
+    Computes the key saddle, prominence and line parent of every
+    :class:`Summit` from the :class:`Linker`s of every :class:`Saddle`.
+
+    Saddles are visited from high to low. Each one merges the groups
+    (a union-find forest) of the summits it links. When two groups are
+    merged, the highest summit of the lower group has found its key
+    saddle: its prominence is its elevation above that saddle, and its
+    line parent is the first summit higher than it met climbing from
+    the saddle into the higher group. Of the linkers of a saddle which
+    reach the same group, whether through one summit or through summits
+    already joined by higher saddles, only the one to the highest summit
+    is kept. Ties go to the summit listed first, then to the linker
+    listed first. The others are marked disqualified.
+
+    The highest summit of each group left at the end has no key saddle
+    within the map, so keeps a prominence of None.
+    :param summits: :class:`SpotElevationContainer` or list of
+     :class:`Summit`
+    :param saddles: iterable of :class:`Saddle` which have been walked.
+    """
+    def __init__(self, summits, saddles):
+        self.logger = logging.getLogger('pyProm.{}'.format(__name__))
+        self.summits = list(getattr(summits, 'points', summits))
+        self.saddles = saddles
+
+    def _higher(self, a, b):
+        """
+        :param a: summit index
+        :param b: summit index
+        :return: True if summit `a` outranks summit `b`. Ties go to the
+         summit listed first.
+        """
+        elevationA = self.summits[a].elevation
+        elevationB = self.summits[b].elevation
+        return elevationA > elevationB or (elevationA == elevationB and
+                                           a < b)
+
+    def _find(self, index):
+        """
+        :param index: summit index
+        :return: root of the group of summit `index`
+        """
+        group = self.group
+        while group[index] != index:
+            # Path halving.
+            group[index] = group[group[index]]
+            index = group[index]
+        return index
+
+    def _lineParent(self, start, index):
+        """
+        :param start: summit index of the summit linked to the key saddle
+         in the higher group.
+        :param index: summit index of the summit whose line parent this
+         is.
+        :return: summit index of the first summit above summit `index`
+         climbing from `start` through the already merged groups.
+        """
+        while not self._higher(start, index):
+            start = self.parent[start]
+        return start
+
+    def run(self):
+        """
+        Computes prominence, results are attached to the
+        :class:`Summit` and :class:`Linker` objects.
+        :return: list of :class:`Summit` which have a key saddle,
+         most prominent first.
+        """
+        self.logger.info("Computing Prominence.")
+        count = len(self.summits)
+        lookup = dict()
+        for index, summit in enumerate(self.summits):
+            lookup[id(summit)] = index
+            summit.keySaddle = None
+            summit.prominence = None
+            summit.lineParent = None
+        # Union-find forest, with the highest summit of every root.
+        self.group = list(range(count))
+        self.size = [1] * count
+        self.top = list(range(count))
+        # Highest summit of the higher group at each summit's key saddle.
+        self.parent = [None] * count
+        resolved = list()
+
+        saddles = sorted(self.saddles, key=lambda x: x.elevation,
+                         reverse=True)
+        for saddle in saddles:
+            # Keep the linker to the highest summit of every group the
+            # saddle reaches, keyed by the root of the group.
+            survivors = dict()
+            for linker in saddle.summits:
+                index = lookup.get(id(linker.summit))
+                if index is None:
+                    continue
+                root = self._find(index)
+                best = survivors.get(root)
+                if best is not None and not self._higher(index, best[0]):
+                    linker.disqualified = True
+                    continue
+                if best is not None:
+                    best[1].disqualified = True
+                survivors[root] = (index, linker)
+            linked = sorted(
+                (survivor[0] for survivor in survivors.values()),
+                key=lambda x: (-self.summits[x].elevation, x))
+            if not linked:
+                continue
+            first = linked[0]
+            for index in linked[1:]:
+                a = self._find(first)
+                b = self._find(index)
+                # `a` becomes the higher group, `start` lies in it.
+                start = first
+                if self._higher(self.top[b], self.top[a]):
+                    a, b = b, a
+                    start = index
+                lower = self.top[b]
+                summit = self.summits[lower]
+                summit.keySaddle = saddle
+                summit.prominence = summit.elevation - saddle.elevation
+                self.parent[lower] = self.top[a]
+                summit.lineParent = self.summits[
+                    self._lineParent(start, lower)]
+                resolved.append(summit)
+
+                # Union by size.
+                top = self.top[a]
+                if self.size[a] < self.size[b]:
+                    a, b = b, a
+                self.group[b] = a
+                self.size[a] += self.size[b]
+                self.top[a] = top
+
+        resolved.sort(key=lambda x: x.prominence, reverse=True)
+        self.logger.info("Found Key Saddles for {} of {} Summits.".format(
+            len(resolved), count))
+        return resolved
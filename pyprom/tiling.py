@@ -0,0 +1,369 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+This library contains a class for analyzing large rasters as overlapping
+tiles across a pool of processes.
+"""
+
+import logging
+import multiprocessing
+import numpy
+
+from timeit import default_timer
+from logic import AnalyzeData, FeatureRecord
+from lib.datamap import DataMap
+from lib.equal_height import EqualHeightLabels
+from lib.metrics import Metrics
+from lib.neighbor_profile import paddedWindow
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+from lib.locations.saddle import Saddle
+
+
+def _shiftRecord(record, x0, y0, ySpan):
+    """
+    Moves a :class:`FeatureRecord` from window to map coordinates.
+    :param record: :class:`FeatureRecord` in window coordinates.
+    :param x0: x coordinate of the window on the map.
+    :param y0: y coordinate of the window on the map.
+    :param ySpan: y span of the map.
+    :return: :class:`FeatureRecord` in map coordinates.
+    """
+    x = record.x + x0
+    y = record.y + y0
+    cells = shore = highShores = None
+    if record.cells is not None:
+        cells = (record.cells[0] + x0, record.cells[1] + y0)
+        shore = (record.shore[0] + x0, record.shore[1] + y0,
+                 record.shore[2])
+        key = int(cells[0][0]) * ySpan + int(cells[1][0])
+    else:
+        key = x * ySpan + y
+    if record.highShores is not None:
+        highShores = [[(_x + x0, _y + y0, elevation)
+                       for _x, _y, elevation in highEdge]
+                      for highEdge in record.highShores]
+    return FeatureRecord(record.kind, key, x, y, record.elevation,
+                         record.edge, cells, shore, highShores)
+
+
+def _analyzeWindow(task):
+    """
+    Finds features in one window of a map. This is run in
+    worker processes, so takes and returns plain picklable types.
+    :param task: (padded, x0, y0, ySpan, openSides, region, seeds)
+     padded: window elevations with a one point border, see
+     :func:`paddedWindow`.
+     x0, y0: map coordinates of the window.
+     ySpan: y span of the map.
+     openSides: (top, left, bottom, right) booleans, True if the map
+     continues past that side of the window.
+     region: (x0, y0, x1, y1) half open window coordinates of the
+     points this window is responsible for, or None.
+     seeds: list of (x, y) window coordinates of equal height areas
+     to resolve, or None.
+    :return: (records, seeds, cells, grow)
+     records: list of :class:`FeatureRecord` in map coordinates.
+     seeds: map coordinates of one point of each equal height area in
+     `region` which runs past an open side.
+     cells: map row major indices of all resolved `seeds` areas.
+     grow: (top, left, bottom, right) sides the first of `seeds` runs
+     past, or None.
+    """
+    padded, x0, y0, ySpan, openSides, region, seeds = task
+    window = padded[1:-1, 1:-1]
+    xSpan = window.shape[0]
+    datamap = DataMap(window, 0, 0, window.shape[0], window.shape[1], 1)
+    datamap.cachePadded(padded)
+    analyzer = AnalyzeData(datamap)
+    labels = EqualHeightLabels(window, padded=padded)
+    analyzer.blobLabels = labels
+
+    # Areas touching an open side may continue outside of this window.
+    bounds = labels.bounds
+    sides = numpy.array([bounds[:, 0] == 0,
+                         bounds[:, 1] == 0,
+                         bounds[:, 2] == xSpan - 1,
+                         bounds[:, 3] == window.shape[1] - 1])
+    sides &= numpy.array(openSides, dtype=bool)[:, numpy.newaxis]
+    incomplete = sides.any(axis=0)
+    incomplete[0] = False
+    # Zero elevation areas are never analyzed as MultiPoints.
+    incomplete &= window.flat[labels.firstCell] != 0
+
+    if seeds is not None:
+        records = list()
+        cells = list()
+        resolved = set()
+        for index, seed in enumerate(seeds):
+            label = labels.labels[seed[0], seed[1]]
+            # Seeds on the window border can be cut off from their area.
+            if not label or label in resolved:
+                continue
+            if incomplete[label]:
+                if not index:
+                    return [], [], None, tuple(sides[:, label])
+                continue
+            resolved.add(label)
+            cellX, cellY = labels.cells(label)
+            analyzer.elevation = float(window[cellX[0], cellY[0]])
+            analyzer.edge = False
+            record = analyzer._pointRecord(int(cellX[0]), int(cellY[0]))
+            if record:
+                records.append(_shiftRecord(record, x0, y0, ySpan))
+            cells.append((cellX + x0) * ySpan + cellY + y0)
+        return records, [], numpy.concatenate(cells), None
+
+    records = [_shiftRecord(record, x0, y0, ySpan) for record in
+               analyzer.featureRecords(padded=padded, region=region,
+                                       skipLabels=incomplete)]
+    regionLabels = labels.labels[region[0]:region[2], region[1]:region[3]]
+    regionLabels = regionLabels.ravel()
+    deferred = incomplete[regionLabels]
+    seeds = list()
+    if deferred.any():
+        found, first = numpy.unique(regionLabels[deferred],
+                                    return_index=True)
+        for index in numpy.flatnonzero(deferred)[first]:
+            x, y = divmod(int(index), region[3] - region[1])
+            seeds.append((x + region[0] + x0, y + region[1] + y0))
+    return records, seeds, None, None
+
+
+def _timedWindow(task):
+    """
+    Runs :func:`_analyzeWindow` and times it.
+    :param task: see :func:`_analyzeWindow`
+    :return: (result, x0, y0, seconds) x0, y0 are the map coordinates of
+     the tile, inside the halo.
+    """
+    start = default_timer()
+    result = _analyzeWindow(task)
+    region = task[5] or (0, 0)
+    return (result, task[1] + region[0], task[2] + region[1],
+            default_timer() - start)
+
+
+class TiledAnalyzeData(object):
+    """
+    Runs :class:`AnalyzeData` over overlapping tiles of a
+    :class:`DataMap` in a pool of processes. Equal height areas which cross
+    tile seams are resolved in the parent afterwards. The result is
+    identical to :meth:`AnalyzeData.analyze`.
+    :param datamap: :class:`DataMap` object.
+    :param workers: number of worker processes. None uses one per cpu.
+    :param tileSize: size (in points) of the square tiles.
+    :param halo: size (in points) of the overlap around each tile.
+     Equal height areas which fit in a tile and its halo are resolved
+     in the workers.
+    :param metrics: optional :class:`Metrics` to record into. Every
+     tile's time is reported as a 'tile' event.
+    """
+    def __init__(self, datamap, workers=None, tileSize=1024, halo=32,
+                 metrics=None):
+        self.logger = logging.getLogger('pyProm.{}'.format(__name__))
+        self.datamap = datamap
+        self.metrics = metrics or Metrics()
+        self.data = self.datamap.numpy_map
+        self.workers = workers or multiprocessing.cpu_count()
+        self.tileSize = tileSize
+        self.halo = max(halo, 1)
+
+    def _task(self, x0, y0, x1, y1, region=None, seeds=None):
+        """
+        :return: task tuple for :func:`_analyzeWindow` for the
+         window (x0, y0) - (x1, y1).
+        """
+        xSpan, ySpan = self.data.shape
+        openSides = (x0 > 0, y0 > 0, x1 < xSpan, y1 < ySpan)
+        return (paddedWindow(self.data, x0, y0, x1, y1), x0, y0, ySpan,
+                openSides, region, seeds)
+
+    def _tiles(self):
+        """
+        Generator of tasks for every tile of the map.
+        """
+        xSpan, ySpan = self.data.shape
+        for tileX in range(0, xSpan, self.tileSize):
+            for tileY in range(0, ySpan, self.tileSize):
+                x0 = max(tileX - self.halo, 0)
+                y0 = max(tileY - self.halo, 0)
+                x1 = min(tileX + self.tileSize + self.halo, xSpan)
+                y1 = min(tileY + self.tileSize + self.halo, ySpan)
+                region = (tileX - x0, tileY - y0,
+                          min(tileX + self.tileSize, xSpan) - x0,
+                          min(tileY + self.tileSize, ySpan) - y0)
+                yield self._task(x0, y0, x1, y1, region=region)
+
+    def _resolve(self, seeds):
+        """
+        Grows a window around the first of `seeds` until its whole equal
+        height area fits inside. Any other `seeds` which fit in that
+        window are resolved along with it.
+        :param seeds: sorted list of (x, y) map coordinates of points in
+         equal height areas.
+        :return: (records, cells) see :func:`_analyzeWindow`
+        """
+        xSpan, ySpan = self.data.shape
+        seed = seeds[0]
+        x0 = max(seed[0] - self.tileSize // 2, 0)
+        y0 = max(seed[1] - self.tileSize // 2, 0)
+        x1 = min(seed[0] + self.tileSize // 2 + 1, xSpan)
+        y1 = min(seed[1] + self.tileSize // 2 + 1, ySpan)
+        while True:
+            inside = [(x - x0, y - y0) for x, y in seeds
+                      if x0 <= x < x1 and y0 <= y < y1]
+            records, _, cells, grow = _analyzeWindow(self._task(
+                x0, y0, x1, y1, seeds=inside))
+            if grow is None:
+                return records, cells
+            self.logger.debug("Growing window around {}".format(seed))
+            xGrow = x1 - x0
+            yGrow = y1 - y0
+            if grow[0]:
+                x0 = max(x0 - xGrow, 0)
+            if grow[1]:
+                y0 = max(y0 - yGrow, 0)
+            if grow[2]:
+                x1 = min(x1 + xGrow, xSpan)
+            if grow[3]:
+                y1 = min(y1 + yGrow, ySpan)
+
+    def _resolveSeeds(self, records, seeds):
+        """
+        Resolves the equal height areas of `seeds` and adds their records
+        to `records`, unless they are already there.
+        :param records: list of :class:`FeatureRecord`, sorted by key
+         on return.
+        :param seeds: list of (x, y) map coordinates of points in
+         equal height areas.
+        """
+        found = set(record.key for record in records)
+        ySpan = self.data.shape[1]
+        seeds = sorted(set(seeds))
+        while seeds:
+            seamRecords, cells = self._resolve(seeds)
+            for record in seamRecords:
+                if record.key not in found:
+                    found.add(record.key)
+                    records.append(record)
+            resolved = set(cells.tolist())
+            seeds = [seed for seed in seeds
+                     if seed[0] * ySpan + seed[1] not in resolved]
+        records.sort(key=lambda record: record.key)
+
+    def regionRecords(self, x0, y0, x1, y1):
+        """
+        Finds the features which depend on the points of a window of the
+        map, without analyzing the rest of it.
+        :param x0: first x coordinate.
+        :param y0: first y coordinate.
+        :param x1: x coordinate after the end of the window.
+        :param y1: y coordinate after the end of the window.
+        :return: list of :class:`FeatureRecord` found from points in the
+         window, and of every equal height area touching it, sorted
+         by key.
+        """
+        xSpan, ySpan = self.data.shape
+        windowX = max(x0 - self.halo, 0)
+        windowY = max(y0 - self.halo, 0)
+        task = self._task(windowX, windowY,
+                          min(x1 + self.halo, xSpan),
+                          min(y1 + self.halo, ySpan),
+                          region=(x0 - windowX, y0 - windowY,
+                                  x1 - windowX, y1 - windowY))
+        records, seeds, _, _ = _analyzeWindow(task)
+
+        # Equal height areas reaching into the window, which are found
+        # from a point outside of it.
+        padded = task[0]
+        labels = EqualHeightLabels(padded[1:-1, 1:-1], padded=padded)
+        touching = numpy.unique(labels.labels[x0 - windowX:x1 - windowX,
+                                              y0 - windowY:y1 - windowY])
+        touching = touching[touching != 0]
+        firstX, firstY = numpy.divmod(labels.firstCell[touching],
+                                      labels.shape[1])
+        firstX += windowX
+        firstY += windowY
+        outside = (firstX < x0) | (firstX >= x1) | \
+                  (firstY < y0) | (firstY >= y1)
+        outside &= padded[1:-1, 1:-1].flat[labels.firstCell[touching]] != 0
+        seeds.extend(zip(firstX[outside].tolist(), firstY[outside].tolist()))
+        self._resolveSeeds(records, seeds)
+        return records
+
+    def _collect(self, results, records, seeds):
+        """
+        Gathers the results of :func:`_timedWindow` for every tile.
+        :param results: iterable of :func:`_timedWindow` results.
+        :param records: list to add the tiles' records to.
+        :param seeds: list to add the tiles' seeds to.
+        """
+        with self.metrics.timer('tiles'):
+            for result, x0, y0, seconds in results:
+                tileRecords, tileSeeds, _, _ = result
+                records.extend(tileRecords)
+                seeds.extend(tileSeeds)
+                self.metrics.count('tiles')
+                self.metrics.observe('tileSeconds', seconds)
+                self.metrics.addTime('tile', seconds, x=x0, y=y0)
+
+    def analyze(self, compact=False):
+        """
+        Analyze Routine.
+        Looks for :class:`Summit`s, and :class:`Saddle`s
+        :param compact: return :class:`CompactSpotElevationContainer`s
+        return: (:class:`SpotElevationContainer`,SpotElevationContainer)
+        """
+        self.logger.info("Initiating Tiled Analysis, {} Workers,"
+                         " Tile Size {}".format(self.workers,
+                                                self.tileSize))
+        records = list()
+        seeds = list()
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers)
+            try:
+                results = pool.imap(_timedWindow, self._tiles())
+                self._collect(results, records, seeds)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            self._collect((_timedWindow(task) for task in self._tiles()),
+                          records, seeds)
+
+        # Equal height areas which cross tile seams.
+        self.logger.info("Resolving {} Seam Crossing MultiPoints".format(
+            len(seeds)))
+        self.metrics.count('seamSeeds', len(seeds))
+        with self.metrics.timer('seams'):
+            self._resolveSeeds(records, seeds)
+        for record in records:
+            self.metrics.count(record.kind.lower() + 's')
+            if record.cells is not None:
+                self.metrics.count('multipoints')
+        builder = AnalyzeData(self.datamap)
+        if compact:
+            summits = CompactSpotElevationContainer(datamap=self.datamap)
+            saddles = CompactSpotElevationContainer(datamap=self.datamap)
+        else:
+            summits = SpotElevationContainer([])
+            saddles = SpotElevationContainer([])
+        latitudes = self.datamap.x_to_latitude_array(
+            [record.x for record in records]).tolist()
+        longitudes = self.datamap.y_to_longitude_array(
+            [record.y for record in records]).tolist()
+        for record, latitude, longitude in zip(records, latitudes,
+                                               longitudes):
+            feature = builder.buildFeature(record, latitude, longitude)
+            if isinstance(feature, Saddle):
+                saddles.append(feature)
+            else:
+                summits.append(feature)
+        self.metrics.count('points', self.data.size)
+        self.metrics.snapshot('analyze')
+        return summits, saddles
@@ -7,110 +7,452 @@ the LICENSE file that accompanies it.
 This file contains a class for walking from Saddles to Summits.
 
 """
+import os
+import numpy
+import shutil
 import logging
-from collections import defaultdict
+import tempfile
+import multiprocessing
+from collections import deque
 from lib.locations.gridpoint import GridPoint
-from lib.locations.summit import Summit
 from lib.containers.linker import Linker
+from lib.neighbor_profile import DIAGONAL_SHIFTS
+from lib.equal_height import EqualHeightLabels
+from lib.metrics import Metrics
+from prominence import Prominence
+
+
+# Shared (numpy_map, owner) arrays of a worker process.
+_shared = None
+
+
+def _detour(numpy_map, owner, start):
+    """
+    Depth first search for a climb from points whose steepest climb
+    dead ends somewhere which is not a known summit (such as summits on
+    the map edge). Climbs to the highest not yet visited neighbor which
+    is not lower, and backs up when there is none.
+    :param numpy_map: 2d numpy array of elevations.
+    :param owner: flat numpy array of summit indices, see
+     :meth:`Walk._ascend`.
+    :param start: flat map index.
+    :return: (route, steps) route is a list of flat map indices from
+     `start` to the first point which leads to a summit, or None. steps
+     is the number of points visited.
+    """
+    xSpan, ySpan = numpy_map.shape
+    visited = set([start])
+    route = [start]
+    while route:
+        cell = route[-1]
+        if owner[cell] >= 0:
+            break
+        x, y = divmod(cell, ySpan)
+        high = numpy_map[x, y]
+        winner = None
+        for shift in DIAGONAL_SHIFTS:
+            _x = x + shift[0]
+            _y = y + shift[1]
+            if 0 <= _x < xSpan and 0 <= _y < ySpan:
+                neighbor = _x * ySpan + _y
+                if neighbor not in visited and numpy_map[_x, _y] >= high:
+                    if winner is None or numpy_map[_x, _y] > high:
+                        winner = neighbor
+                        high = numpy_map[_x, _y]
+        if winner is None:
+            route.pop()
+        else:
+            visited.add(winner)
+            route.append(winner)
+    return route or None, len(visited)
+
+
+def _openShared(mapFile, ownerFile):
+    """
+    Worker process initializer, memory maps the arrays saved by
+    :meth:`Walk._runPool`.
+    """
+    global _shared
+    _shared = (numpy.load(mapFile, mmap_mode='r'),
+               numpy.load(ownerFile, mmap_mode='r'))
+
+
+def _detourChunk(starts):
+    """
+    Runs :func:`_detour` for a chunk of start points in a worker process.
+    :param starts: list of flat map indices.
+    :return: list of (start, (route, steps))
+    """
+    numpy_map, owner = _shared
+    return [(start, _detour(numpy_map, owner, start)) for start in starts]
 
 
 class Walk(object):
-    def __init__(self, summits, saddles, datamap):
+    """
+    Walks uphill from every high shore of every :class:`Saddle` to the
+    :class:`Summit` it leads to.
+
+    Every point climbs to its highest neighbor (the first one in
+    :meth:`DataMap.iterateDiagonal` order on ties). Points on an equal
+    height area without a higher neighbor leave the area through its
+    highest shore point. Where every point ends up is worked out for the
+    whole map once and shared by all saddles, so no slope is climbed
+    twice. Paths are only traced when a :class:`Linker`'s path is used.
+    Working that out reads the whole map through :meth:`DataMap.padded`,
+    so walking a map which isn't a numpy array (such as a
+    :class:`MosaicLoader` map) reads every tile of it.
+    """
+    def __init__(self, summits, saddles, datamap, metrics=None):
 
         self.logger = logging.getLogger('pyProm.{}'.format(__name__))
         self.logger.info("Initiating Walk")
         self.summits = summits
         self.saddles = saddles
         self.datamap = datamap
+        self.metrics = metrics or Metrics()
         self.linkers = list()
 
-        self.logger.info("Create Fast Lookup Hash for Summit Objects.")
-        self.summitHash = self._to_hash(self.summits)
+        self.logger.info("Create Summit Raster.")
+        self.summitList = list(self.summits.points)
+        with self.metrics.timer('summitRaster'):
+            self.summitRaster = self._summitRaster()
+        # Built on first use by _ascend()
+        self.ascent = None
+        self.owner = None
+        self.labels = None
+        self.detours = dict()
 
-    def _to_hash(self, container):
+    def _summitRaster(self):
         """
-        :param container:
-        :return:
+        :return: int32 numpy array the shape of the map holding the index
+         into :attr:`summitList` of the :class:`Summit` at each point,
+         or -1. Takes 4 bytes per point of the map.
         """
-        nesteddict = lambda: defaultdict(nesteddict)
-        hash = nesteddict()
-        for point in container.points:
-            if point.multiPoint:
-                for mp in point.multiPoint.points:
-                    hash[mp.x][mp.y] = point
+        raster = numpy.full(self.datamap.numpy_map.shape, -1,
+                            dtype=numpy.int32)
+        single = list()
+        # MultiPoint cells first, single points are appended after.
+        xs = list()
+        ys = list()
+        multi = list()
+        for index, summit in enumerate(self.summitList):
+            if summit.multiPoint:
+                cellX, cellY = summit.multiPoint.cells()
+                xs.extend(cellX.tolist())
+                ys.extend(cellY.tolist())
+                multi.append(numpy.full(len(cellX), index,
+                                        dtype=numpy.int32))
             else:
-                hash[self.datamap.latitude_to_x(
-                        point.latitude)][self.datamap.longitude_to_y(
-                            point.longitude)]\
-                    = point
-        return hash
-
-    def run(self):
-        # iterate through saddles
+                single.append(index)
+        if single:
+            xs.extend(self.datamap.latitude_to_x_array(
+                [self.summitList[index].latitude for index in single]))
+            ys.extend(self.datamap.longitude_to_y_array(
+                [self.summitList[index].longitude for index in single]))
+            multi.append(numpy.array(single, dtype=numpy.int32))
+        if multi:
+            raster[numpy.array(xs, dtype=numpy.int64),
+                   numpy.array(ys, dtype=numpy.int64)] = \
+                numpy.concatenate(multi)
+        return raster
+
+    def summitAt(self, x, y):
+        """
+        :param x: x coordinate
+        :param y: y coordinate
+        :return: :class:`Summit` at x, y or None.
+        """
+        index = self.summitRaster[x, y]
+        if index < 0:
+            return None
+        return self.summitList[index]
+
+    def _ascend(self):
+        """
+        Works out the uphill step from every point of the map, and which
+        :class:`Summit` following those steps ends up at.
+        """
+        with self.metrics.timer('ascend'):
+            self._ascendTable()
+        self.metrics.snapshot('ascend')
+
+    def _ascendTable(self):
+        """
+        See :meth:`_ascend`.
+        """
+        self.logger.info("Computing Uphill Steps.")
+        numpy_map = self.datamap.numpy_map
+        xSpan, ySpan = numpy_map.shape
+        padded = self.datamap.padded()
+        cells = numpy.arange(xSpan * ySpan).reshape(xSpan, ySpan)
+
+        # Highest neighbor, the first one in iterateDiagonal order on ties.
+        best = padded[1:xSpan + 1, 1:ySpan + 1].copy()
+        ascent = numpy.full((xSpan, ySpan), -1, dtype=numpy.int64)
+        for shift in DIAGONAL_SHIFTS:
+            neighbor = padded[1 + shift[0]:xSpan + 1 + shift[0],
+                              1 + shift[1]:ySpan + 1 + shift[1]]
+            higher = neighbor > best
+            best[higher] = neighbor[higher]
+            ascent[higher] = cells[higher] + shift[0] * ySpan + shift[1]
+        del best
+        ascent = ascent.ravel()
+        cells = cells.ravel()
+
+        # Equal height areas without a higher neighbor are left through
+        # their highest shore point.
+        labels = EqualHeightLabels(numpy_map, padded=padded)
+        flatLabels = labels.labels.ravel()
+        stuck = (ascent == -1) & (flatLabels != 0)
+        ascent[stuck] = self._flatExits(labels)[flatLabels[stuck]]
+
+        # The climb stops at summits and at dead ends.
+        summitIndex = self.summitRaster.ravel()
+        stop = (summitIndex >= 0) | (ascent == -1)
+        ascent[stop] = cells[stop]
+
+        # Pointer jumping, doubles the distance covered every round.
+        end = ascent
+        while True:
+            self.metrics.count('ascentRounds')
+            jumped = end[end]
+            if numpy.array_equal(jumped, end):
+                break
+            end = jumped
+        self.ascent = ascent
+        self.owner = summitIndex[end]
+        self.labels = labels.labels
+
+    def _flatExits(self, labels):
+        """
+        :param labels: :class:`EqualHeightLabels` of the map.
+        :return: numpy array indexed by label holding the flat map index
+         of the label's highest shore point (the first one on ties), or
+         -1 if no shore point is higher than the label.
+        """
+        exits = numpy.full(labels.count + 1, -1, dtype=numpy.int64)
+        if not labels.count:
+            return exits
+        ySpan = labels.shape[1]
+        offsets = labels._shoreOffsets[1:]
+        lengths = numpy.diff(offsets)
+        elevations = labels.padded.flat[labels._shore]
+        highest = numpy.maximum.reduceat(elevations, offsets[:-1])
+        shoreLabels = numpy.repeat(numpy.arange(labels.count), lengths)
+        top = numpy.flatnonzero(elevations == highest[shoreLabels])
+        first = numpy.ones(len(top), dtype=bool)
+        first[1:] = shoreLabels[top[1:]] != shoreLabels[top[:-1]]
+        top = top[first]
+        x, y = numpy.divmod(labels._shore[top], ySpan + 2)
+        firstCell = labels.firstCell[1:]
+        higher = highest > labels.padded.flat[
+            (firstCell // ySpan + 1) * (ySpan + 2) + firstCell % ySpan + 1]
+        exits[1:][higher] = ((x - 1) * ySpan + y - 1)[higher]
+        return exits
+
+    def summitAbove(self, x, y):
+        """
+        :param x: x coordinate
+        :param y: y coordinate
+        :return: :class:`Summit` reached by climbing from x, y, or None.
+        """
+        if self.owner is None:
+            self._ascend()
+        cell = x * self.datamap.numpy_map.shape[1] + y
+        if self.owner[cell] < 0:
+            detour = self._detour(cell)
+            if not detour:
+                return None
+            cell = detour[-1]
+        return self.summitList[self.owner[cell]]
+
+    def path(self, x, y):
+        """
+        :param x: x coordinate
+        :param y: y coordinate
+        :return: list of :class:`GridPoint` climbed from x, y up to
+         and including the first point of the :class:`Summit`
+        """
+        if self.owner is None:
+            self._ascend()
+        numpy_map = self.datamap.numpy_map
+        ySpan = numpy_map.shape[1]
+        cell = x * ySpan + y
+        cells = list()
+        if self.owner[cell] < 0:
+            detour = self._detour(cell)
+            if detour:
+                cells = detour[:-1]
+                cell = detour[-1]
+        cells.append(cell)
+        while True:
+            step = int(self.ascent[cell])
+            if step == cell:
+                break
+            x, y = divmod(cell, ySpan)
+            stepX, stepY = divmod(step, ySpan)
+            if abs(stepX - x) > 1 or abs(stepY - y) > 1:
+                cells.extend(self._flatRoute(cell, step))
+            cells.append(step)
+            cell = step
+        self.metrics.count('pathSteps', len(cells) - 1)
+        path = list()
+        for cell in cells:
+            x, y = divmod(cell, ySpan)
+            path.append(GridPoint(x, y, numpy_map[x, y]))
+        return path
+
+    def _detour(self, start):
+        """
+        :param start: flat map index.
+        :return: see :func:`_detour`, memoized.
+        """
+        if start not in self.detours:
+            self._addDetour(start, _detour(self.datamap.numpy_map,
+                                           self.owner, start))
+        return self.detours[start]
+
+    def _addDetour(self, start, result):
+        """
+        :param start: flat map index.
+        :param result: (route, steps) from :func:`_detour`
+        """
+        route, steps = result
+        self.detours[start] = route
+        self.metrics.count('detours')
+        self.metrics.count('detourSteps', steps)
+        self.metrics.count('backtracks', steps - len(route or ()))
+
+    def _flatRoute(self, start, exit):
+        """
+        Shortest route across an equal height area.
+        :param start: flat map index of a point of the area.
+        :param exit: flat map index of a shore point of the area.
+        :return: list of flat map indices after `start` up to the first
+         point of the area next to `exit`.
+        """
+        xSpan, ySpan = self.datamap.numpy_map.shape
+        exitX, exitY = divmod(exit, ySpan)
+        label = self.labels.flat[start]
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            x, y = divmod(cell, ySpan)
+            if abs(exitX - x) <= 1 and abs(exitY - y) <= 1:
+                route = list()
+                while cell != start:
+                    route.append(cell)
+                    cell = previous[cell]
+                return route[::-1]
+            for shift in DIAGONAL_SHIFTS:
+                _x = x + shift[0]
+                _y = y + shift[1]
+                if 0 <= _x < xSpan and 0 <= _y < ySpan:
+                    neighbor = _x * ySpan + _y
+                    if neighbor not in previous and \
+                            self.labels.flat[neighbor] == label:
+                        previous[neighbor] = cell
+                        queue.append(neighbor)
+        return list()
+
+    def run(self, workers=1, chunkSize=256):
+        """
+        Walks every saddle.
+        :param workers: number of worker processes. None uses one per
+         cpu. With more than one, the searches for start points whose
+         steepest climb dead ends are spread across a pool of processes.
+        :param chunkSize: start points per worker task.
+        :return: list of all :class:`Linker`
+        """
+        workers = workers or multiprocessing.cpu_count()
+        with self.metrics.timer('walk'):
+            if workers > 1:
+                self._runPool(workers, chunkSize)
+            linkers = list()
+            # iterate through saddles
+            for saddle in self.saddles:
+                linkers.extend(self.walk(saddle))
+        self.linkers = linkers
+        self.metrics.count('linkers', len(linkers))
+        return linkers
+
+    def _runPool(self, workers, chunkSize):
+        """
+        Fills :attr:`detours` for every high shore start point which
+        needs one, in a pool of processes. The map and the summit index
+        of every point are handed to the workers as memory mapped files
+        instead of being pickled.
+        :param workers: number of worker processes.
+        :param chunkSize: start points per worker task.
+        """
+        if self.owner is None:
+            self._ascend()
+        ySpan = self.datamap.numpy_map.shape[1]
+        starts = list()
         for saddle in self.saddles:
-            self.walk(saddle)
+            for highEdge in saddle.highShores:
+                point = max(highEdge.points, key=lambda x: x.elevation)
+                cell = point.x * ySpan + point.y
+                if self.owner[cell] < 0 and cell not in self.detours:
+                    starts.append(cell)
+        starts = sorted(set(starts))
+        if not starts:
+            return
+        self.logger.info("Searching {} Detours, {} Workers".format(
+            len(starts), workers))
+        directory = tempfile.mkdtemp(prefix='pyprom')
+        try:
+            mapFile = os.path.join(directory, 'map.npy')
+            ownerFile = os.path.join(directory, 'owner.npy')
+            numpy.save(mapFile, numpy.asarray(self.datamap.numpy_map))
+            numpy.save(ownerFile, self.owner)
+            chunks = [starts[index:index + chunkSize]
+                      for index in range(0, len(starts), chunkSize)]
+            pool = multiprocessing.Pool(workers, _openShared,
+                                        (mapFile, ownerFile))
+            try:
+                for results in pool.imap(_detourChunk, chunks):
+                    for start, result in results:
+                        self._addDetour(start, result)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
 
     def walk(self, saddle):
+        """
+        Links a saddle to the summit above each of its high shores.
+        :param saddle: :class:`Saddle`
+        :return: list of :class:`Linker` of this saddle.
+        """
         # iterate through high Shores
-        self.linkers = list()
+        linkers = list()
         for highEdge in saddle.highShores:
             # Sort High Shores from high to low
             highEdge.points.sort(key=lambda x: x.elevation, reverse=True)
-            lookback = 1
             point = highEdge.points[0]
-            path = list([point])
-            exemptHash = defaultdict(list)
-
-            while True:
-                ####
-                if len(path) > 5000:
-                    self.logger.info("BORK! stuck at {}".format(point))
-                    return path
-                ####
-                point = self._climb_up(point, exemptHash)
-                if isinstance(point, Summit):
-                    link = Linker(point, saddle, path)
-                    self.linkers.append(link)
-                    saddle.summits.append(link)
-                    point.saddles.append(link)
-                    break
-                if point:
-                    exemptHash[point.x].append(point.y)
-                    lookback = 1
-                    path.append(point)
-                else:
-                    lookback += 1
-                    point = path[-lookback]
+            summit = self.summitAbove(point.x, point.y)
+            self.metrics.count('walkedShores')
+            if summit is None:
+                self.logger.info("No Summit above {}".format(point))
+                self.metrics.count('unlinkedShores')
+                continue
+            link = Linker(summit, saddle,
+                          lambda x=point.x, y=point.y: self.path(x, y))
+            linkers.append(link)
+            saddle.summits.append(link)
+            summit.saddles.append(link)
 
         if len(set(saddle.summits)) == 1:
             saddle.disqualified = True
-        return self.linkers
-
-    def _climb_up(self, point, exemptHash):
-
-        if self.summitHash[point.x][point.y]:
-            return self.summitHash[point.x][point.y]
-
-        lastElevation = point.elevation
-        currentHigh = lastElevation
-        candidates = list()
-
-        neighbors = self.datamap.iterateDiagonal(point.x, point.y)
-        for x, y, elevation in neighbors:
-            if y in exemptHash[x]:
-                continue
-            if elevation > currentHigh and elevation > lastElevation:
-                currentHigh = elevation
-                candidates = list()
-                candidates.append(GridPoint(x, y, elevation))
-            if elevation == currentHigh:
-                candidates.append(GridPoint(x, y, elevation))
-        if candidates:
-            winner = candidates[0]
-        else:
-            winner = None
-        return winner
+        return linkers
 
     def mark_redundant_linkers(self):
-        for saddle in self.saddles:
-            pass
+        """
+        Disqualifies linkers between summits which are already joined
+        by higher saddles. This runs :class:`Prominence`, so also
+        fills in the prominence of every summit.
+        """
+        Prominence(self.summitList, self.saddles).run()
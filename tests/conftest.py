@@ -0,0 +1,57 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+
+Shared fixtures. pyProm modules import each other from the pyprom
+directory, and the synthetic terrains come from the benchmarks.
+"""
+
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'pyprom'))
+sys.path.insert(0, os.path.join(HERE, '..', 'benchmarks'))
+
+from terrain import TERRAINS  # noqa: E402
+from lib.datamap import DataMap  # noqa: E402
+
+# Points along each side of the terrains used by the tests.
+TERRAIN_SIZE = 48
+
+
+def makeDataMap(elevations):
+    """
+    :param elevations: 2d numpy array of elevations.
+    :return: one arcsecond :class:`DataMap` of a copy of `elevations`.
+    """
+    return DataMap(elevations.copy(), 44, -72, elevations.shape[0],
+                   elevations.shape[1], 1)
+
+
+def featureDicts(container):
+    """
+    :param container: :class:`SpotElevationContainer`
+    :return: list of the recursive dicts of every feature, in order.
+    """
+    return [feature.to_dict(recurse=True) for feature in container]
+
+
+@pytest.fixture(params=sorted(TERRAINS))
+def terrain(request):
+    """
+    :return: 2d numpy array of one of the benchmark terrains.
+    """
+    return TERRAINS[request.param](TERRAIN_SIZE)
+
+
+@pytest.fixture
+def datamap(terrain):
+    """
+    :return: :class:`DataMap` of `terrain`
+    """
+    return makeDataMap(terrain)
@@ -0,0 +1,75 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import io
+
+import numpy
+import pytest
+
+from domain import Domain
+from logic import AnalyzeData
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+
+from .conftest import featureDicts
+
+
+def saveAndLoad(arrays):
+    """
+    :return: `arrays` after a trip through :func:`numpy.savez`
+    """
+    outgoing = io.BytesIO()
+    numpy.savez(outgoing, **arrays)
+    outgoing.seek(0)
+    with numpy.load(outgoing) as loaded:
+        return dict((name, loaded[name]) for name in loaded.files)
+
+
+def testArraysRoundTrip(datamap):
+    summits, saddles = AnalyzeData(datamap).analyze(compact=True)
+    arrays = saveAndLoad(dict(list(summits.toArrays('summits.').items()) +
+                              list(saddles.toArrays('saddles.').items())))
+    for prefix, container in (('summits.', summits),
+                              ('saddles.', saddles)):
+        loaded = CompactSpotElevationContainer.fromArrays(arrays, prefix,
+                                                          datamap)
+        assert featureDicts(loaded) == featureDicts(container)
+        assert loaded.fingerprint == container.fingerprint
+
+
+def testArraysWithoutOptionalColumns(datamap):
+    summits, saddles = AnalyzeData(datamap).analyze(compact=True)
+    for container in (summits, saddles):
+        arrays = saveAndLoad(container.toArrays())
+        loaded = CompactSpotElevationContainer.fromArrays(
+            arrays, datamap=datamap, multipoints=False, highShores=False)
+        assert len(loaded) == len(container)
+        for feature, original in zip(loaded, container):
+            assert type(feature) is type(original)
+            expected = original.to_dict()
+            expected.pop('highShores', None)
+            assert feature.to_dict() == expected
+            assert feature.multiPoint is None
+            assert not getattr(feature, 'highShores', None)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testDomainRoundTrip(datamap, tmpdir, compact):
+    domain = Domain(datamap)
+    domain.run(compact=not compact)
+    filename = str(tmpdir.join('domain.npz'))
+    domain.writeBinary(filename)
+    loaded = Domain(datamap)
+    loaded.readBinary(filename, compact=compact)
+    assert featureDicts(loaded.summits) == featureDicts(domain.summits)
+    assert featureDicts(loaded.saddles) == featureDicts(domain.saddles)
+    assert isinstance(loaded.summits, CompactSpotElevationContainer) == \
+        compact
+
+    loaded.readBinary(filename, saddles=False)
+    assert featureDicts(loaded.summits) == featureDicts(domain.summits)
+    assert not len(loaded.saddles)
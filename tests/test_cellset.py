@@ -0,0 +1,38 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+
+from lib.cellset import CellSet
+
+
+def testMatchesPythonSet():
+    shape = (13, 29)
+    cells = CellSet(shape)
+    expected = set()
+    assert len(cells) == 0
+    assert (0, 0) not in cells
+    random = numpy.random.RandomState(2)
+    for trial in range(30):
+        # Includes points one step off the raster.
+        xs = random.randint(-1, shape[0] + 1, random.randint(0, 20))
+        ys = random.randint(-1, shape[1] + 1, len(xs))
+        cells.addMany(xs, ys)
+        expected.update(zip(xs.tolist(), ys.tolist()))
+        assert len(cells) == len(expected)
+    for x in range(-1, shape[0] + 1):
+        for y in range(-1, shape[1] + 1):
+            assert ((x, y) in cells) == ((x, y) in expected)
+
+
+def testOneBitPerPoint():
+    cells = CellSet((100, 198))
+    assert cells.bits is None
+    cells.addMany([99], [198])
+    assert cells.bits.nbytes == (102 * 200 + 7) // 8
+    assert (99, 198) in cells
+    assert len(cells) == 1
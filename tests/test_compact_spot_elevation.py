@@ -0,0 +1,62 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import pytest
+
+import lib.containers.compact_spot_elevation
+from logic import AnalyzeData
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+from lib.containers.spot_elevation import SpotElevationContainer
+
+from .conftest import featureDicts
+
+
+def testMatchesObjectContainer(datamap):
+    for container in AnalyzeData(datamap).analyze():
+        compact = CompactSpotElevationContainer(container, datamap=datamap)
+        assert len(compact) == len(container)
+        assert featureDicts(compact) == featureDicts(container)
+        assert compact.fingerprint == container.fingerprint
+
+
+def testAnalyzeCompact(datamap):
+    expected = AnalyzeData(datamap).analyze()
+    found = AnalyzeData(datamap).analyze(compact=True)
+    for container, compact in zip(expected, found):
+        assert isinstance(compact, CompactSpotElevationContainer)
+        assert featureDicts(compact) == featureDicts(container)
+
+
+def testAppendAndRemove(monkeypatch, datamap):
+    # Small chunks, so appends are spread over packed and pending
+    # features.
+    monkeypatch.setattr(lib.containers.compact_spot_elevation,
+                        'PACK_CHUNK', 3)
+    summits, saddles = AnalyzeData(datamap).analyze()
+    features = list(summits) + list(saddles)
+    compact = CompactSpotElevationContainer(datamap=datamap)
+    plain = SpotElevationContainer([])
+    for feature in features:
+        compact.append(feature)
+        plain.append(feature)
+    assert featureDicts(compact) == featureDicts(plain)
+    removed = list(range(0, len(features), 3))
+    compact.remove(removed)
+    plain.remove(removed)
+    assert featureDicts(compact) == featureDicts(plain)
+    assert compact.fingerprint == plain.fingerprint
+
+
+def testPointsAreReadOnly(datamap):
+    summits, _ = AnalyzeData(datamap).analyze(compact=True)
+    assert isinstance(summits.points, tuple)
+    with pytest.raises(AttributeError):
+        summits.points.append(summits[0])
+    count = len(summits)
+    summits.points = list(summits)[1:]
+    assert len(summits) == count - 1
@@ -0,0 +1,219 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from lib.datamap import DataMap
+from lib.neighbor_profile import neighborElevations, paddedWindow
+from lib.raster import WindowedArray
+
+from .conftest import TERRAIN_SIZE
+
+ARCSEC_DEG = 3600.
+
+
+class CountingArray(WindowedArray):
+    """
+    Windowed array over a numpy array which counts its reads.
+    """
+    def __init__(self, elevations):
+        super(CountingArray, self).__init__(elevations.shape,
+                                            elevations.dtype)
+        self.elevations = elevations
+        self.reads = 0
+
+    def window(self, x0, y0, x1, y1):
+        self.reads += 1
+        return self.elevations[x0:x1, y0:y1].copy()
+
+
+def samplePoints(datamap, count=500, margin=0.):
+    """
+    :return: (latitudes, longitudes) of random points spread over the
+     map, reaching `margin` degrees past its edges.
+    """
+    random = numpy.random.RandomState(25)
+    latitudes = random.uniform(datamap.latitude - margin,
+                               datamap.latitude_max + margin, count)
+    longitudes = random.uniform(datamap.longitude - margin,
+                                datamap.longitude_max + margin, count)
+    return latitudes, longitudes
+
+
+def bilinearReference(datamap, latitude, longitude):
+    """
+    :return: elevation interpolated one point at a time.
+    """
+    x = (datamap.latitude_max - latitude) * ARCSEC_DEG / \
+        datamap.arcsec_resolution
+    y = (longitude - datamap.longitude) * ARCSEC_DEG / \
+        datamap.arcsec_resolution
+    x = min(max(x, 0), datamap.max_x)
+    y = min(max(y, 0), datamap.max_y)
+    x0 = int(numpy.floor(x))
+    y0 = int(numpy.floor(y))
+    x1 = min(x0 + 1, datamap.max_x)
+    y1 = min(y0 + 1, datamap.max_y)
+    dx = x - x0
+    dy = y - y0
+    elevations = datamap.numpy_map
+    return (float(elevations[x0, y0]) * (1 - dx) * (1 - dy) +
+            float(elevations[x0, y1]) * (1 - dx) * dy +
+            float(elevations[x1, y0]) * dx * (1 - dy) +
+            float(elevations[x1, y1]) * dx * dy)
+
+
+def testNearestMatchesElevation(datamap):
+    latitudes, longitudes = samplePoints(datamap)
+    elevations, outOfRange = datamap.elevations(latitudes, longitudes)
+    assert not outOfRange.any()
+    expected = [datamap.elevation(latitude, longitude)
+                for latitude, longitude in zip(latitudes, longitudes)]
+    numpy.testing.assert_array_equal(elevations, expected)
+
+
+def testBilinear(datamap):
+    latitudes, longitudes = samplePoints(datamap)
+    elevations, outOfRange = datamap.elevations(latitudes, longitudes,
+                                                mode='bilinear')
+    assert not outOfRange.any()
+    expected = [bilinearReference(datamap, latitude, longitude)
+                for latitude, longitude in zip(latitudes, longitudes)]
+    numpy.testing.assert_allclose(elevations, expected, rtol=1e-9,
+                                  atol=1e-9)
+
+
+def testBilinearAtPoints(datamap):
+    """
+    Interpolating exactly at map points gives their elevations.
+    """
+    xs, ys = numpy.meshgrid(numpy.arange(datamap.span_latitude),
+                            numpy.arange(datamap.span_longitude),
+                            indexing='ij')
+    latitudes = datamap.latitude_max - xs * datamap.arcsec_resolution / \
+        ARCSEC_DEG
+    longitudes = datamap.longitude + ys * datamap.arcsec_resolution / \
+        ARCSEC_DEG
+    elevations, outOfRange = datamap.elevations(latitudes, longitudes,
+                                                mode='bilinear')
+    assert elevations.shape == xs.shape
+    assert not outOfRange.any()
+    numpy.testing.assert_allclose(elevations, datamap.numpy_map, atol=1e-6)
+
+
+@pytest.mark.parametrize('mode', ['nearest', 'bilinear'])
+def testOutOfRange(datamap, mode):
+    latitudes, longitudes = samplePoints(datamap, margin=.005)
+    latitudes[:3] = numpy.nan
+    elevations, outOfRange = datamap.elevations(latitudes, longitudes,
+                                                mode=mode)
+    expected = ~((datamap.latitude <= latitudes) &
+                 (latitudes <= datamap.latitude_max) &
+                 (datamap.longitude <= longitudes) &
+                 (longitudes <= datamap.longitude_max))
+    assert expected.any() and not expected.all()
+    numpy.testing.assert_array_equal(outOfRange, expected)
+    assert numpy.isnan(elevations[outOfRange]).all()
+    assert not numpy.isnan(elevations[~outOfRange]).any()
+    inside, _ = datamap.elevations(latitudes[~outOfRange],
+                                   longitudes[~outOfRange], mode=mode)
+    numpy.testing.assert_array_equal(elevations[~outOfRange], inside)
+
+
+def testBroadcasting(datamap):
+    latitudes, longitudes = samplePoints(datamap, count=6)
+    elevations, outOfRange = datamap.elevations(latitudes[:, None],
+                                                longitudes[0])
+    assert elevations.shape == outOfRange.shape == (6, 1)
+    expected, _ = datamap.elevations(latitudes,
+                                     numpy.repeat(longitudes[0], 6))
+    numpy.testing.assert_array_equal(elevations[:, 0], expected)
+
+
+def testUnknownMode(datamap):
+    with pytest.raises(ValueError):
+        datamap.elevations([44], [-72], mode='cubic')
+
+
+@pytest.mark.parametrize('mode', ['nearest', 'bilinear'])
+def testWindowedMap(terrain, mode):
+    """
+    Maps which are not numpy arrays are read a block at a time and give
+    the same elevations.
+    """
+    windowed = CountingArray(terrain)
+    datamap = DataMap(windowed, 44, -72, TERRAIN_SIZE, TERRAIN_SIZE, 1)
+    dense = DataMap(terrain, 44, -72, TERRAIN_SIZE, TERRAIN_SIZE, 1)
+    latitudes, longitudes = samplePoints(dense, count=2000, margin=.001)
+    elevations, outOfRange = datamap.elevations(latitudes, longitudes,
+                                                mode=mode)
+    expectedElevations, expectedOutOfRange = dense.elevations(
+        latitudes, longitudes, mode=mode)
+    numpy.testing.assert_array_equal(outOfRange, expectedOutOfRange)
+    numpy.testing.assert_array_equal(elevations, expectedElevations)
+    assert 0 < windowed.reads < 2000
+
+
+def testWindowedArrayIsAbstract():
+    with pytest.raises(TypeError):
+        WindowedArray((2, 2), numpy.int16)
+
+    class NoWindow(WindowedArray):
+        pass
+    with pytest.raises(TypeError):
+        NoWindow((2, 2), numpy.int16)
+
+
+def cornersAndEdges(datamap):
+    """
+    :return: list of (x, y) of the corners, points along every edge and
+     a few interior points.
+    """
+    maxX = datamap.max_x
+    maxY = datamap.max_y
+    return [(0, 0), (0, maxY), (maxX, 0), (maxX, maxY), (0, 5), (maxX, 7),
+            (3, 0), (9, maxY), (1, 1), (maxX - 1, maxY - 1), (20, 17)]
+
+
+def testNeighborsMatchIterators(datamap):
+    points = cornersAndEdges(datamap)
+    for orthogonal, iterate in ((False, datamap.iterateDiagonal),
+                                (True, datamap.iterateOrthogonal)):
+        expected = [[elevation for _x, _y, elevation in iterate(x, y)]
+                    for x, y in points]
+        for (x, y), row in zip(points, expected):
+            numpy.testing.assert_array_equal(
+                datamap.neighbors(x, y, orthogonal=orthogonal), row)
+        xs, ys = numpy.array(points).T
+        numpy.testing.assert_array_equal(
+            datamap.neighbors(xs, ys, orthogonal=orthogonal), expected)
+
+
+def testNeighborsAfterUpdate(datamap):
+    before = datamap.neighbors(4, 4)
+    datamap.numpy_map[3, 4] += 1
+    datamap.invalidateNeighbors()
+    after = datamap.neighbors(4, 4)
+    assert after[0] == before[0] + 1
+    numpy.testing.assert_array_equal(after[1:], before[1:])
+
+
+def testWindowNeighborsAreOffMap(terrain):
+    """
+    Neighbors outside of a window read as off the map, although its
+    padded border holds real elevations.
+    """
+    x0, y0, x1, y1 = 10, 12, 20, 30
+    window = terrain[x0:x1, y0:y1]
+    datamap = DataMap(window, 44, -72, x1 - x0, y1 - y0, 1)
+    padded = paddedWindow(terrain, x0, y0, x1, y1)
+    xs, ys = numpy.array(cornersAndEdges(datamap)[:-1]).T
+    expected = [[elevation for _x, _y, elevation in
+                 datamap.iterateDiagonal(x, y)] for x, y in zip(xs, ys)]
+    numpy.testing.assert_array_equal(neighborElevations(padded, xs, ys),
+                                     expected)
@@ -0,0 +1,93 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+
+from lib.equal_height import EqualHeightLabels
+from lib.neighbor_profile import DIAGONAL_SHIFTS
+
+
+def floodFill(elevations):
+    """
+    :return: list of areas of 8 connected equal elevation points with
+     more than one point, each a sorted list of (x, y), in order of their
+     first (row major) point.
+    """
+    xSpan, ySpan = elevations.shape
+    seen = numpy.zeros(elevations.shape, dtype=bool)
+    areas = list()
+    for x in range(xSpan):
+        for y in range(ySpan):
+            if seen[x, y]:
+                continue
+            seen[x, y] = True
+            area = [(x, y)]
+            toDo = [(x, y)]
+            while toDo:
+                pointX, pointY = toDo.pop()
+                for shiftX, shiftY in DIAGONAL_SHIFTS:
+                    _x = pointX + shiftX
+                    _y = pointY + shiftY
+                    if 0 <= _x < xSpan and 0 <= _y < ySpan and \
+                            not seen[_x, _y] and \
+                            elevations[_x, _y] == elevations[x, y]:
+                        seen[_x, _y] = True
+                        area.append((_x, _y))
+                        toDo.append((_x, _y))
+            if len(area) > 1:
+                areas.append(sorted(area))
+    return areas
+
+
+def referenceShore(elevations, area):
+    """
+    :return: sorted list of (x, y) of the neighbors of `area` which are
+     not part of it, including off map points.
+    """
+    inside = set(area)
+    shore = set()
+    for x, y in area:
+        for shiftX, shiftY in DIAGONAL_SHIFTS:
+            point = (x + shiftX, y + shiftY)
+            if point not in inside:
+                shore.add(point)
+    return sorted(shore)
+
+
+def testLabelsMatchFloodFill(terrain):
+    labels = EqualHeightLabels(terrain)
+    areas = floodFill(terrain)
+    assert labels.count == len(areas)
+    expected = numpy.zeros(terrain.shape, dtype=labels.labels.dtype)
+    xSpan, ySpan = terrain.shape
+    for label, area in enumerate(areas, 1):
+        xs, ys = zip(*area)
+        expected[xs, ys] = label
+        cellXs, cellYs = labels.cells(label)
+        assert list(zip(cellXs.tolist(), cellYs.tolist())) == area
+        assert labels.mapEdge[label] == any(
+            x in (0, xSpan - 1) or y in (0, ySpan - 1) for x, y in area)
+        shoreXs, shoreYs, shoreElevations = labels.shore(label)
+        shore = list(zip(shoreXs.tolist(), shoreYs.tolist()))
+        assert shore == referenceShore(terrain, area)
+        for (x, y), elevation in zip(shore, shoreElevations):
+            if 0 <= x < xSpan and 0 <= y < ySpan:
+                assert elevation == terrain[x, y]
+    numpy.testing.assert_array_equal(labels.labels, expected)
+
+
+def testHighShoreCounts(terrain):
+    labels = EqualHeightLabels(terrain)
+    counts = labels.highShoreCounts()
+    assert len(counts) == labels.count + 1
+    for label in range(1, labels.count + 1):
+        highShores = labels.highShores(label)
+        assert counts[label] == len(highShores)
+        elevation = terrain[tuple(point[0] for point in labels.cells(label))]
+        for xs, ys, elevations in highShores:
+            assert (elevations > elevation).all()
+            numpy.testing.assert_array_equal(elevations, terrain[xs, ys])
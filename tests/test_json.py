@@ -0,0 +1,105 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import io
+import json
+
+import pytest
+
+import lib.jsonstream
+from lib.jsonstream import JSONStreamWriter, JSONStreamReader
+from domain import Domain
+from logic import AnalyzeData
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+
+from .conftest import featureDicts
+
+DOCUMENT = {'date': '01-02-2017 03:04:05',
+            'domain': '44, -72 - 45, -71',
+            'empty': [],
+            'saddles': [{'elevation': 1.5, 'nested': {'a': [1, 2, [3]]}},
+                        {'elevation': -12345678901234567890, 'text': '}]"'}],
+            'summits': [[], {}, 'a,b', 1e-300, None, True]}
+
+
+@pytest.mark.parametrize('prettyprint', [False, True])
+def testStreamWriterMatchesJsonDumps(prettyprint):
+    outgoing = io.StringIO()
+    writer = JSONStreamWriter(outgoing, prettyprint)
+    writer.member('date', DOCUMENT['date'])
+    writer.member('domain', DOCUMENT['domain'])
+    writer.array('empty', iter(DOCUMENT['empty']))
+    writer.array('saddles', iter(DOCUMENT['saddles']))
+    writer.array('summits', iter(DOCUMENT['summits']))
+    writer.close()
+    if prettyprint:
+        assert outgoing.getvalue() == json.dumps(
+            DOCUMENT, sort_keys=True, indent=4, separators=(',', ': '))
+    assert json.loads(outgoing.getvalue()) == DOCUMENT
+
+
+@pytest.mark.parametrize('prettyprint', [False, True])
+@pytest.mark.parametrize('chunk', [1, 7, 1 << 16])
+def testStreamReader(monkeypatch, prettyprint, chunk):
+    monkeypatch.setattr(lib.jsonstream, 'READ_CHUNK', chunk)
+    if prettyprint:
+        text = json.dumps(DOCUMENT, sort_keys=True, indent=4)
+    else:
+        text = json.dumps(DOCUMENT)
+    streamed = ('empty', 'saddles', 'summits')
+    found = dict((key, list()) for key in streamed)
+    for key, value in JSONStreamReader(io.StringIO(text), streamed):
+        if key in streamed:
+            found[key].append(value)
+        else:
+            found[key] = value
+    assert found == DOCUMENT
+
+
+@pytest.mark.parametrize('text', ['', '{', '{"a": [1, 2', '[1]'])
+def testStreamReaderErrors(text):
+    with pytest.raises(ValueError):
+        list(JSONStreamReader(io.StringIO(text), ('a',)))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testContainerRoundTrip(datamap, compact):
+    for container in AnalyzeData(datamap).analyze():
+        if compact:
+            loaded = CompactSpotElevationContainer(datamap=datamap)
+        else:
+            loaded = SpotElevationContainer([])
+        loaded.from_json(container.to_json(), datamap)
+        # Feature types are not written, so features come back as
+        # plain spot elevations.
+        assert len(loaded) == len(container)
+        for feature, original in zip(loaded, container):
+            assert (feature.latitude, feature.longitude,
+                    feature.elevation, feature.edgeEffect) == \
+                (original.latitude, original.longitude,
+                 original.elevation, original.edgeEffect)
+            if original.multiPoint:
+                assert feature.multiPoint.to_dict() == \
+                    original.multiPoint.to_dict()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testDomainRoundTrip(datamap, tmpdir, compact):
+    domain = Domain(datamap)
+    domain.run()
+    for prettyprint in (False, True):
+        filename = str(tmpdir.join('domain.json'))
+        domain.write(filename, prettyprint=prettyprint)
+        loaded = Domain(datamap)
+        loaded.read(filename, compact=compact)
+        assert featureDicts(loaded.summits) == featureDicts(domain.summits)
+        assert featureDicts(loaded.saddles) == featureDicts(domain.saddles)
+        with open(filename) as incoming:
+            document = json.load(incoming)
+        assert document['domain'] == domain.extent
@@ -0,0 +1,115 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import pickle
+
+import pytest
+
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+from lib.containers.gridpoint import GridPointContainer
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.locations.base_coordinate import BaseCoordinate
+from lib.locations.base_gridpoint import BaseGridPoint
+from lib.locations.edgepoint import EdgePoint
+from lib.locations.gridpoint import GridPoint
+from lib.locations.inverse_edgepoint import InverseEdgePoint
+from lib.locations.saddle import Saddle
+from lib.locations.summit import Summit
+
+POINTS = [BaseGridPoint(1, 2),
+          GridPoint(1, 2, 30.5),
+          EdgePoint(1, 2, 30.5, [GridPoint(0, 0, 1)], []),
+          InverseEdgePoint(1, 2, 30.5),
+          BaseCoordinate(44.5, -72.25)]
+
+
+@pytest.mark.parametrize('point', POINTS)
+def testNoInstanceDict(point):
+    assert not hasattr(point, '__dict__')
+    with pytest.raises(AttributeError):
+        point.somethingElse = 1
+
+
+@pytest.mark.parametrize('point', POINTS)
+def testPickle(point):
+    loaded = pickle.loads(pickle.dumps(point, pickle.HIGHEST_PROTOCOL))
+    assert type(loaded) is type(point)
+    assert loaded.to_dict() == point.to_dict()
+
+
+def testInverseEdgePointListsAreNotShared():
+    first = InverseEdgePoint(0, 0, 1)
+    second = InverseEdgePoint(0, 1, 1)
+    first.addEdge(GridPoint(0, 0, 1))
+    first.inverseEdgePointNeighbors.append(second)
+    assert second.edgePoints == []
+    assert second.inverseEdgePointNeighbors == []
+
+
+def testCoordinateKeys():
+    coordinate = BaseCoordinate(44.1234561, -72.0000004)
+    same = BaseCoordinate(44.12345614, -72.0)
+    assert coordinate == same
+    assert not coordinate != same
+    assert hash(coordinate) == hash(same)
+    assert coordinate != BaseCoordinate(44.123457, -72.0)
+    assert coordinate != 5
+    assert not coordinate == 5
+    # Keys follow coordinate changes.
+    coordinate.latitude = 45
+    assert coordinate != same
+    assert hash(coordinate) == hash(BaseCoordinate(45, -72))
+    coordinate.longitude = -71
+    assert coordinate == BaseCoordinate(45, -71)
+
+
+def testSpotElevationKeys():
+    summit = Summit(44.5, -72.5, 100)
+    saddle = Saddle(44.5, -72.5, 100)
+    assert summit == saddle
+    assert len(set([summit, saddle, Summit(44.5, -72.5, 101)])) == 2
+    summit.elevation = 101
+    assert summit != saddle
+    assert summit == Summit(44.5, -72.5, 101)
+    assert hash(summit) == hash(Summit(44.5, -72.5, 101))
+
+
+def testGridPointContainerEquality():
+    points = [GridPoint(x, x % 3, x) for x in range(10)]
+    container = GridPointContainer(list(points))
+    shuffled = GridPointContainer(points[::-1])
+    assert container == shuffled
+    assert hash(container) == hash(shuffled)
+    shuffled.append(GridPoint(10, 0, 0))
+    assert container != shuffled
+    container.append(GridPoint(10, 1, 1))
+    assert container == shuffled
+    # Point counts changed behind the container's back are noticed.
+    container.points.pop()
+    assert container != shuffled
+    assert container != points
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testSpotElevationContainerFingerprints(compact):
+    summits = [Summit(44 + x * .001, -72, x) for x in range(20)]
+    first = SpotElevationContainer(summits)
+    second = SpotElevationContainer(summits[::-1])
+    if compact:
+        second = CompactSpotElevationContainer(second)
+    assert first.fingerprint == second.fingerprint
+    # summits[3] sits at index 16 of the reversed container.
+    first.remove([3])
+    assert first.fingerprint != second.fingerprint
+    second.remove([16])
+    assert first.fingerprint == second.fingerprint
+    first.append(summits[3])
+    second.append(summits[3])
+    assert first.fingerprint == second.fingerprint
+    assert first.fingerprint == \
+        SpotElevationContainer(list(summits)).fingerprint
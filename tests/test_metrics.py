@@ -0,0 +1,86 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from domain import Domain
+from logic import AnalyzeData
+from tiling import TiledAnalyzeData
+from lib.equal_height import EqualHeightLabels
+from lib.metrics import Metrics
+
+
+def testObserveManyMatchesObserve():
+    values = numpy.concatenate([[0, .5, 1, 1.5, 2, 3, 4, 5, 1023, 1024,
+                                 1025], numpy.random.RandomState(1)
+                                .randint(0, 100000, 500)])
+    single = Metrics()
+    for value in values:
+        single.observe('sizes', value)
+    many = Metrics()
+    many.observeMany('sizes', values)
+    many.observeMany('sizes', [])
+    assert many.to_dict()['histograms'] == single.to_dict()['histograms']
+
+
+def testTimersAndCallback():
+    events = list()
+    metrics = Metrics(callback=events.append)
+    with metrics.timer('phase'):
+        pass
+    with pytest.raises(KeyError):
+        with metrics.timer('phase'):
+            raise KeyError
+    metrics.addTime('tile', 2.5, x=1, y=2)
+    metrics.count('things', 3)
+    report = metrics.report()
+    assert [event['name'] for event in events] == \
+        ['phase', 'phase', 'tile', 'report']
+    assert events[2] == {'name': 'tile', 'seconds': 2.5, 'x': 1, 'y': 2}
+    assert events[3]['metrics'] == report
+    assert report['timers']['tile'] == 2.5
+    assert report['timers']['phase'] >= 0
+    assert report['counters'] == {'things': 3}
+
+
+def testAnalyzeCounters(datamap):
+    metrics = Metrics()
+    summits, saddles = AnalyzeData(datamap, metrics).analyze()
+    counters = metrics.to_dict()['counters']
+    assert counters['summits'] == len(summits)
+    assert counters['saddles'] == len(saddles)
+    assert counters.get('multipoints', 0) == sum(
+        1 for feature in list(summits) + list(saddles)
+        if feature.multiPoint)
+    assert counters['points'] == datamap.numpy_map.size
+    assert counters['candidates'] <= counters['points']
+    assert counters['equalHeightAreas'] == \
+        EqualHeightLabels(datamap.numpy_map).count
+    assert 'analyze' in metrics.memory
+
+
+def testTiledEvents(datamap):
+    events = list()
+    metrics = Metrics(callback=events.append)
+    summits, saddles = TiledAnalyzeData(datamap, workers=1, tileSize=16,
+                                        metrics=metrics).analyze()
+    tiles = [event for event in events if event['name'] == 'tile']
+    assert len(tiles) == 9
+    assert sorted((event['x'], event['y']) for event in tiles) == \
+        [(x, y) for x in (0, 16, 32) for y in (0, 16, 32)]
+    counters = metrics.to_dict()['counters']
+    assert counters['summits'] == len(summits)
+    assert counters['saddles'] == len(saddles)
+
+
+def testDomainRunReport(datamap):
+    domain = Domain(datamap)
+    report = domain.run()
+    assert report == domain.metrics.to_dict()
+    assert report['counters']['summits'] == len(domain.summits)
+    assert report['timers']['run'] >= report['timers']['analyze']
@@ -0,0 +1,142 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import logging
+
+import numpy
+import pytest
+
+from dataload import MosaicLoader
+from domain import Domain
+from logic import AnalyzeData
+from tiling import TiledAnalyzeData
+from lib.datamap import DataMap
+from lib.mosaic import MosaicArray
+from terrain import TERRAINS
+
+from .conftest import featureDicts, makeDataMap
+
+TILE_SPAN = 17
+STEP = TILE_SPAN - 1
+
+
+def splitTiles(elevations, rows, columns):
+    """
+    :return: dict of (row, column): tile of `elevations`, neighboring
+     tiles sharing their border points.
+    """
+    return dict(((row, column),
+                 elevations[row * STEP:row * STEP + TILE_SPAN,
+                            column * STEP:column * STEP + TILE_SPAN].copy())
+                for row in range(rows) for column in range(columns))
+
+
+def makeMosaic(elevations, rows, columns, missing=()):
+    """
+    :return: (mosaic, expected elevations, list of opened tile keys)
+    """
+    tiles = splitTiles(elevations, rows, columns)
+    expected = elevations.copy()
+    for row, column in missing:
+        # Seams are read from the tile below/right, so a missing tile
+        # only blanks the points it owns.
+        x1 = row * STEP + (TILE_SPAN if row == rows - 1 else STEP)
+        y1 = column * STEP + (TILE_SPAN if column == columns - 1 else STEP)
+        expected[row * STEP:x1, column * STEP:y1] = 0
+    opened = list()
+
+    def opener(key):
+        opened.append(key)
+        return tiles[key]
+    keys = [[None if (row, column) in missing else (row, column)
+             for column in range(columns)] for row in range(rows)]
+    return MosaicArray(keys, TILE_SPAN, opener), expected, opened
+
+
+@pytest.mark.parametrize('missing', [(), ((0, 1),), ((1, 0), (2, 3))])
+def testReads(missing):
+    elevations = TERRAINS['fractal'](3 * STEP + 1)
+    elevations = numpy.hstack([elevations, elevations[:, 1:STEP + 1]])
+    mosaic, expected, _ = makeMosaic(elevations, 3, 4, missing)
+    assert mosaic.shape == expected.shape
+    assert numpy.array_equal(numpy.asarray(mosaic), expected)
+    random = numpy.random.RandomState(5)
+    for trial in range(50):
+        x0, x1 = sorted(random.randint(0, expected.shape[0] + 1, 2))
+        y0, y1 = sorted(random.randint(0, expected.shape[1] + 1, 2))
+        assert numpy.array_equal(mosaic[x0:x1, y0:y1],
+                                 expected[x0:x1, y0:y1])
+        x = random.randint(-expected.shape[0], expected.shape[0])
+        y = random.randint(-expected.shape[1], expected.shape[1])
+        assert mosaic[x, y] == expected[x, y]
+        assert numpy.array_equal(mosaic[x, y0:y1], expected[x, y0:y1])
+        assert numpy.array_equal(mosaic[x0:x1, y], expected[x0:x1, y])
+    assert numpy.array_equal(mosaic[::3, 1::2], expected[::3, 1::2])
+    with pytest.raises(IndexError):
+        mosaic[expected.shape[0], 0]
+
+
+def testTilesOpenOnDemand():
+    elevations = TERRAINS['fractal'](2 * STEP + 1)
+    mosaic, _, opened = makeMosaic(elevations, 2, 2)
+    assert not opened
+    mosaic[3:5, STEP + 2:STEP + 6]
+    assert opened == [(0, 1)]
+    mosaic[STEP, STEP]
+    assert opened == [(0, 1), (1, 1)]
+
+
+def testAnalysisMatchesDenseMap():
+    elevations = TERRAINS['plateaus'](2 * STEP + 1)
+    mosaic, expected, _ = makeMosaic(elevations, 2, 2)
+    datamap = DataMap(mosaic, 44, -72, mosaic.shape[0], mosaic.shape[1], 1)
+    summits, saddles = AnalyzeData(makeDataMap(expected)).analyze()
+    tiledSummits, tiledSaddles = TiledAnalyzeData(
+        datamap, workers=1, tileSize=12, halo=4).analyze()
+    assert featureDicts(tiledSummits) == featureDicts(summits)
+    assert featureDicts(tiledSaddles) == featureDicts(saddles)
+
+
+def testDomainRunReadsTiles():
+    """
+    Domain.run analyzes mosaics in tiles even with one worker, so no
+    dense copy of the whole mosaic is made.
+    """
+    elevations = TERRAINS['plateaus'](3 * STEP + 1)
+    mosaic, expected, _ = makeMosaic(elevations, 3, 3)
+    datamap = DataMap(mosaic, 44, -72, mosaic.shape[0], mosaic.shape[1], 1)
+    domain = Domain(datamap)
+    domain.run()
+    dense = Domain(makeDataMap(expected))
+    dense.run()
+    assert featureDicts(domain.summits) == featureDicts(dense.summits)
+    assert featureDicts(domain.saddles) == featureDicts(dense.saddles)
+    assert datamap._padded is None
+
+
+def testPaddedWarnsOnMosaic(caplog):
+    elevations = TERRAINS['fractal'](2 * STEP + 1)
+    mosaic, expected, opened = makeMosaic(elevations, 2, 2)
+    datamap = DataMap(mosaic, 44, -72, mosaic.shape[0], mosaic.shape[1], 1)
+    with caplog.at_level(logging.WARNING):
+        padded = datamap.padded()
+    assert 'into memory' in caplog.text
+    assert sorted(opened) == sorted(splitTiles(elevations, 2, 2))
+    assert numpy.array_equal(padded[1:-1, 1:-1], expected)
+
+
+def testMosaicLoader(tmpdir):
+    elevations = TERRAINS['fractal'](2 * STEP + 1)
+    tiles = splitTiles(elevations, 2, 2)
+    # Rows run north to south, so row 0 is the northern tile.
+    for (row, column), tile in tiles.items():
+        name = 'N{:02d}W{:03d}.hgt'.format(45 - row, 72 - column)
+        tile.astype('>i2').tofile(str(tmpdir.join(name)))
+    loader = MosaicLoader(str(tmpdir), span=TILE_SPAN)
+    assert (loader.latitude, loader.longitude) == (44, -72)
+    assert numpy.array_equal(numpy.asarray(loader.datamap.numpy_map),
+                             elevations)
@@ -0,0 +1,88 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from lib.containers.multipoint import MultiPoint, PackedCells
+from lib.equal_height import EqualHeightLabels
+from lib.locations.base_gridpoint import BaseGridPoint
+
+from .conftest import makeDataMap
+
+
+@pytest.mark.parametrize('xs, ys', [
+    ([], []),
+    ([7], [9]),
+    ([0, 0, 0, 1, 1, 1], [0, 1, 2, 0, 1, 2]),
+    ([5, 3, 4], [1, 100, 50]),
+    (list(range(300)), [0] * 300),
+    ([0] * 70000, list(range(70000))),
+])
+def testPackedCellsRoundTrip(xs, ys):
+    packed = PackedCells(xs, ys)
+    order = sorted(zip(xs, ys))
+    x, y = packed.xy()
+    assert list(zip(x.tolist(), y.tolist())) == order
+    assert len(packed) == len(xs)
+
+
+def testPackedCellsEncoding():
+    # A filled rectangle is one run.
+    xs, ys = numpy.divmod(numpy.arange(40 * 6), 6)
+    packed = PackedCells(xs + 1000, ys + 2000)
+    assert packed.indices.dtype == numpy.uint8
+    assert packed.nbytes == 2
+    # A triangle is one run per row.
+    xs, ys = numpy.nonzero(numpy.tri(30, dtype=bool))
+    packed = PackedCells(xs, ys)
+    assert packed.indices.dtype == numpy.uint16
+    assert len(packed.lengths) == 30
+    assert packed.lengths.tolist() == list(range(1, 31))
+    # Scattered points keep their indices.
+    packed = PackedCells([0, 2, 4], [0, 2, 4])
+    assert packed.lengths is None
+    assert packed.indices.tolist() == [0, 12, 24]
+
+
+def testLabelsRoundTrip(terrain):
+    datamap = makeDataMap(terrain)
+    labels = EqualHeightLabels(terrain)
+    for label in range(1, labels.count + 1):
+        cells = labels.cells(label)
+        elevation = terrain[cells[0][0], cells[1][0]]
+        multiPoint = labels.multiPoint(label, elevation, datamap)
+        x, y = multiPoint.cells()
+        assert x.tolist() == cells[0].tolist()
+        assert y.tolist() == cells[1].tolist()
+        assert len(multiPoint) == len(cells[0])
+        assert [(point.x, point.y) for point in multiPoint.points] == \
+            list(zip(cells[0].tolist(), cells[1].tolist()))
+        expected = labels.inverseEdgePoints(label, datamap)
+        assert sorted((point.x, point.y, point.elevation) for point in
+                      multiPoint.inverseEdgePoints.points) == \
+            sorted((point.x, point.y, point.elevation) for point in
+                   expected.points)
+
+
+def testPackedPointsAreReadOnly():
+    datamap = makeDataMap(numpy.zeros((10, 10)))
+    multiPoint = MultiPoint(None, 5, datamap, cells=([1, 2], [3, 3]))
+    assert isinstance(multiPoint.points, tuple)
+    with pytest.raises(AttributeError):
+        multiPoint.points.append(BaseGridPoint(2, 4))
+    multiPoint.append(BaseGridPoint(2, 4))
+    assert [(point.x, point.y) for point in multiPoint.points] == \
+        [(1, 3), (2, 3), (2, 4)]
+    assert isinstance(multiPoint.points, tuple)
+
+    multiPoint.points = [BaseGridPoint(0, 0)]
+    multiPoint.append(BaseGridPoint(0, 1))
+    assert isinstance(multiPoint.points, list)
+    assert len(multiPoint) == 2
+    assert multiPoint.to_dict() == MultiPoint(
+        None, 5, datamap, cells=([0, 0], [0, 1])).to_dict()
@@ -0,0 +1,67 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+
+from lib.neighbor_profile import (classifyNeighborProfiles, padMap,
+                                  paddedWindow, FLAT, SADDLE, SLOPE, SUMMIT)
+from lib.util import compressRepetetiveChars
+
+
+def referenceClass(datamap, x, y):
+    """
+    :return: profile class of one point, worked out like
+     :meth:`AnalyzeData.summit_and_saddle` does.
+    """
+    elevation = datamap.numpy_map[x, y]
+    profile = ''
+    for _x, _y, neighbor in datamap.iterateDiagonal(x, y):
+        if not neighbor:
+            continue
+        if neighbor == elevation:
+            return FLAT
+        profile += 'H' if neighbor > elevation else 'L'
+    profile = compressRepetetiveChars(profile)
+    if profile == 'L':
+        return SUMMIT
+    if 'HLHL' in profile or 'LHLH' in profile:
+        return SADDLE
+    return SLOPE
+
+
+def testClassesMatchPointByPoint(datamap):
+    classes = classifyNeighborProfiles(datamap.numpy_map)
+    expected = numpy.zeros_like(classes)
+    for x in range(datamap.span_latitude):
+        for y in range(datamap.span_longitude):
+            expected[x, y] = referenceClass(datamap, x, y)
+    numpy.testing.assert_array_equal(classes, expected)
+
+
+def testSeaLevelNeighborsAreSkipped():
+    elevations = numpy.array([[0, 0, 0],
+                              [0, 5, 0],
+                              [0, 0, 0]])
+    assert classifyNeighborProfiles(elevations)[1, 1] == SLOPE
+    elevations[0, 0] = 1
+    assert classifyNeighborProfiles(elevations)[1, 1] == SUMMIT
+    elevations[0, 1] = 5
+    assert classifyNeighborProfiles(elevations)[1, 1] == FLAT
+
+
+def testPaddedWindow(terrain):
+    padded = padMap(terrain)
+    xSpan, ySpan = terrain.shape
+    for x0, y0, x1, y1 in [(0, 0, xSpan, ySpan), (0, 5, 9, ySpan),
+                           (10, 12, 20, 30), (xSpan - 4, 0, xSpan, 7)]:
+        window = paddedWindow(terrain, x0, y0, x1, y1)
+        numpy.testing.assert_array_equal(window,
+                                         padded[x0:x1 + 2, y0:y1 + 2])
+        # Windows classify like the same area of the whole map.
+        classes = classifyNeighborProfiles(None, padded=window)
+        numpy.testing.assert_array_equal(
+            classes, classifyNeighborProfiles(terrain)[x0:x1, y0:y1])
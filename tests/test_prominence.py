@@ -0,0 +1,153 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import itertools
+
+import numpy
+
+from logic import AnalyzeData
+from prominence import Prominence
+from walk import Walk
+from lib.containers.linker import Linker
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.locations.saddle import Saddle
+from lib.locations.summit import Summit
+
+
+def bruteForceProminence(summits, saddles):
+    """
+    For every summit, adds saddles from high to low until the summit is
+    joined to a higher one.
+    :return: list of the key saddle elevation of every summit, or None.
+    """
+    lookup = dict((id(summit), index) for index, summit in
+                  enumerate(summits))
+    saddles = sorted(saddles, key=lambda x: x.elevation, reverse=True)
+
+    def higher(a, b):
+        return summits[a].elevation > summits[b].elevation or (
+            summits[a].elevation == summits[b].elevation and a < b)
+
+    keySaddles = list()
+    for start in range(len(summits)):
+        neighbors = dict()
+        keySaddle = None
+        for saddle in saddles:
+            linked = [lookup[id(linker.summit)] for linker in saddle.summits
+                      if id(linker.summit) in lookup]
+            for a in linked:
+                neighbors.setdefault(a, set()).update(linked)
+            seen = set([start])
+            stack = [start]
+            while stack:
+                for index in neighbors.get(stack.pop(), ()):
+                    if index not in seen:
+                        seen.add(index)
+                        stack.append(index)
+            if any(higher(index, start) for index in seen):
+                keySaddle = saddle.elevation
+                break
+        keySaddles.append(keySaddle)
+    return keySaddles
+
+
+def link(summit, saddle):
+    linker = Linker(summit, saddle, [])
+    saddle.summits.append(linker)
+    summit.saddles.append(linker)
+    return linker
+
+
+def assertMatchesBruteForce(summits, saddles):
+    expected = bruteForceProminence(summits, saddles)
+    resolved = Prominence(summits, saddles).run()
+    for summit, keySaddle in zip(summits, expected):
+        if keySaddle is None:
+            assert summit.prominence is None
+            assert summit.keySaddle is None
+        else:
+            assert summit.keySaddle.elevation == keySaddle
+            assert summit.prominence == summit.elevation - keySaddle
+            assert summit.lineParent.elevation >= summit.elevation
+    assert len(resolved) == sum(x is not None for x in expected)
+    assert [x.prominence for x in resolved] == sorted(
+        [x.prominence for x in resolved], reverse=True)
+
+
+def testSurvivingLinkerIgnoresOrder():
+    """
+    Two linkers of the lower saddle reach the group joined by the higher
+    saddle through different summits. The one to the higher summit
+    survives, whatever order the linkers are listed in.
+    """
+    for order in itertools.permutations(range(3)):
+        high = Summit(44, -72, 200)
+        middle = Summit(44.001, -72, 150)
+        low = Summit(44.002, -72, 120)
+        joined = Saddle(44.003, -72, 110)
+        link(middle, joined)
+        link(low, joined)
+        saddle = Saddle(44.004, -72, 100)
+        linkers = [Linker(summit, saddle, []) for summit in
+                   (low, middle, high)]
+        for index in order:
+            saddle.summits.append(linkers[index])
+        Prominence([high, middle, low], [saddle, joined]).run()
+        assert [linker.disqualified for linker in linkers] == \
+            [True, False, False]
+        assert middle.keySaddle is saddle
+        assert middle.lineParent is high
+        assert low.keySaddle is joined
+        assert low.lineParent is middle
+        assert high.prominence is None
+
+
+def testSurvivingLinkerTies():
+    """
+    Between summits of equal elevation the one listed first wins, and
+    between linkers to the same summit the linker listed first.
+    """
+    first = Summit(44, -72, 150)
+    second = Summit(44.001, -72, 150)
+    joined = Saddle(44.003, -72, 110)
+    link(first, joined)
+    link(second, joined)
+    saddle = Saddle(44.004, -72, 100)
+    linkers = [link(second, saddle), link(first, saddle),
+               link(first, saddle)]
+    Prominence([first, second], [saddle, joined]).run()
+    assert [linker.disqualified for linker in linkers] == \
+        [True, False, True]
+    assert second.keySaddle is joined
+    assert second.lineParent is first
+
+
+def testRandomSaddleGraph():
+    random = numpy.random.RandomState(7)
+    for trial in range(20):
+        summits = [Summit(44 + index * .001, -72, float(elevation))
+                   for index, elevation in
+                   enumerate(random.randint(100, 140, 30))]
+        saddles = list()
+        for index in range(60):
+            linked = random.choice(len(summits), random.randint(1, 4),
+                                   replace=False)
+            lowest = min(summits[x].elevation for x in linked)
+            saddle = Saddle(43, -72 + index * .001,
+                            float(random.randint(50, lowest + 1)))
+            for x in linked:
+                link(summits[x], saddle)
+            saddles.append(saddle)
+        assertMatchesBruteForce(summits, saddles)
+
+
+def testWalkedTerrain(datamap):
+    summits, saddles = AnalyzeData(datamap).analyze()
+    summits = SpotElevationContainer(
+        [x for x in summits if not x.edgeEffect])
+    Walk(summits, saddles.points, datamap).run()
+    assertMatchesBruteForce(summits.points, saddles.points)
@@ -0,0 +1,114 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from lib.containers.gridpoint import GridPointContainer
+from lib.containers.high_edge import HighEdgeContainer
+from lib.equal_height import EqualHeightLabels
+from lib.locations.gridpoint import GridPoint
+from lib.neighbor_profile import DIAGONAL_SHIFTS, paddedWindow
+from lib.shore import highRuns, highGroups
+
+
+def referenceRuns(elevations, blobElevation):
+    """
+    Walks the ring point by point: low points end a run, zero elevation
+    points join a run which is going, and a run still going at the end
+    wraps onto the first run if the ring starts high.
+    """
+    runs = list()
+    current = None
+    for index, elevation in enumerate(elevations):
+        if elevation > blobElevation:
+            if current is None:
+                current = list()
+                runs.append(current)
+            current.append(index)
+        elif elevation < blobElevation:
+            current = None
+        elif elevation == 0 and current is not None:
+            current.append(index)
+    if len(runs) > 1 and current is not None and \
+            elevations[0] > blobElevation:
+        runs[0] = runs.pop() + runs[0]
+    return runs
+
+
+def referenceGroups(xs, ys, elevations, blobElevation, shape):
+    """
+    Flood fills 8 connected high points.
+    """
+    high = dict()
+    for index, (x, y, elevation) in enumerate(zip(xs, ys, elevations)):
+        if elevation > blobElevation and 0 <= x < shape[0] and \
+                0 <= y < shape[1]:
+            high[(x, y)] = index
+    groups = list()
+    for point in sorted(high):
+        if point not in high:
+            continue
+        group = list()
+        stack = [point]
+        index = high.pop(point)
+        group.append(index)
+        while stack:
+            x, y = stack.pop()
+            for shift in DIAGONAL_SHIFTS:
+                neighbor = (x + shift[0], y + shift[1])
+                if neighbor in high:
+                    group.append(high.pop(neighbor))
+                    stack.append(neighbor)
+        groups.append(sorted(group, key=lambda i: (xs[i], ys[i])))
+    return groups
+
+
+def testHighRunsMatchReference():
+    random = numpy.random.RandomState(4)
+    for trial in range(2000):
+        elevations = random.choice([0, 4, 5, 6], random.randint(0, 9))
+        runs = highRuns(elevations, 5)
+        assert [run.tolist() for run in runs] == \
+            referenceRuns(elevations.tolist(), 5)
+        shore = GridPointContainer(
+            [GridPoint(index, 0, elevation) for index, elevation in
+             enumerate(elevations.tolist())])
+        container = HighEdgeContainer(shore, 5)
+        assert [[point.x for point in points] for points in
+                container.highPoints] == [run.tolist() for run in runs]
+
+
+@pytest.mark.parametrize('window', [False, True])
+def testHighGroupsMatchFloodFill(terrain, window):
+    if window:
+        # Windows of a larger map have real elevations around them.
+        padded = paddedWindow(terrain, 5, 3, terrain.shape[0] - 7,
+                              terrain.shape[1] - 4)
+        elevations = padded[1:-1, 1:-1]
+    else:
+        padded = None
+        elevations = terrain
+    labels = EqualHeightLabels(elevations, padded=padded)
+    counts = labels.highShoreCounts()
+    for label in range(1, labels.count + 1):
+        xs, ys, shoreElevations = labels.shore(label)
+        x, y = labels.cells(label)
+        blobElevation = elevations[x[0], y[0]]
+        expected = referenceGroups(xs.tolist(), ys.tolist(),
+                                   shoreElevations.tolist(), blobElevation,
+                                   elevations.shape)
+        groups = highGroups(xs, ys, shoreElevations, blobElevation,
+                            elevations.shape)
+        assert [group.tolist() for group in groups] == expected
+        assert counts[label] == len(expected)
+        highShores = labels.highShores(label)
+        assert len(highShores) == len(expected)
+        for (hx, hy, he), group in zip(highShores, expected):
+            assert hx.tolist() == xs[group].tolist()
+            assert hy.tolist() == ys[group].tolist()
+            assert he.tolist() == shoreElevations[group].tolist()
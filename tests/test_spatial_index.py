@@ -0,0 +1,104 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from lib.spatial_index import GridIndex
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.containers.compact_spot_elevation import \
+    CompactSpotElevationContainer
+from lib.locations.summit import Summit
+
+from .conftest import makeDataMap
+
+LAT_SCALE = 30.87
+LONG_SCALE = 22.2
+
+
+def randomPoints(random, count):
+    """
+    :return: (latitudes, longitudes) with a dense cluster and some
+     duplicated points.
+    """
+    latitudes = 44 + random.rand(count) * .1
+    longitudes = -72 + random.rand(count) * .2
+    cluster = count // 4
+    latitudes[:cluster] = 44.05 + random.rand(cluster) * .001
+    longitudes[:cluster] = -71.9 + random.rand(cluster) * .001
+    latitudes[-5:] = latitudes[:5]
+    longitudes[-5:] = longitudes[:5]
+    return latitudes, longitudes
+
+
+def distances(latitudes, longitudes, lat, long):
+    return numpy.sqrt(
+        ((numpy.abs(long - longitudes) * 3600) * LONG_SCALE) ** 2 +
+        ((numpy.abs(lat - latitudes) * 3600) * LAT_SCALE) ** 2)
+
+
+@pytest.mark.parametrize('count, bucketSize', [
+    (0, None), (1, None), (500, None), (500, .0001), (500, 1)])
+def testQueriesMatchLinearScans(count, bucketSize):
+    random = numpy.random.RandomState(count)
+    latitudes, longitudes = randomPoints(random, count)
+    index = GridIndex(latitudes, longitudes, bucketSize=bucketSize)
+    for trial in range(25):
+        lat = 43.99 + random.rand() * .12
+        long = -72.01 + random.rand() * .22
+        distance = random.choice([0, 10, 250, 2000, 50000])
+        scanned = distances(latitudes, longitudes, lat, long)
+        assert index.radius(lat, long, distance, LAT_SCALE,
+                            LONG_SCALE).tolist() == \
+            numpy.flatnonzero(scanned <= distance).tolist()
+
+        k = random.randint(0, 12)
+        found, foundDistances = index.nearest(lat, long, k, LAT_SCALE,
+                                              LONG_SCALE)
+        order = numpy.lexsort((numpy.arange(count), scanned))[:k]
+        assert found.tolist() == order.tolist()
+        assert numpy.allclose(foundDistances, scanned[order])
+
+        lat2 = lat + random.rand() * .05
+        long2 = long + random.rand() * .1
+        inside = (lat < latitudes) & (latitudes < lat2) & \
+            (long < longitudes) & (longitudes < long2)
+        assert index.rectangle(lat, long, lat2, long2).tolist() == \
+            numpy.flatnonzero(inside).tolist()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testContainerQueries(compact):
+    datamap = makeDataMap(numpy.zeros((400, 800)))
+    random = numpy.random.RandomState(3)
+    latitudes, longitudes = randomPoints(random, 200)
+    summits = [Summit(lat, long, 100) for lat, long in
+               zip(latitudes.tolist(), longitudes.tolist())]
+    if compact:
+        container = CompactSpotElevationContainer(summits, datamap=datamap)
+    else:
+        container = SpotElevationContainer(summits)
+    lat, long = 44.05, -71.9
+    latScale, longScale = container._scales(lat, datamap)
+    scanned = numpy.sqrt(
+        ((numpy.abs(long - longitudes) * 3600) * longScale) ** 2 +
+        ((numpy.abs(lat - latitudes) * 3600) * latScale) ** 2)
+    found = container.radius(lat, long, datamap, 1, unit='km')
+    assert [(x.latitude, x.longitude) for x in found] == \
+        [(x.latitude, x.longitude) for x, inside in
+         zip(summits, scanned <= 1000) if inside]
+    found = container.rectangle(44.06, -71.95, 44.02, -71.85)
+    assert [(x.latitude, x.longitude) for x in found] == \
+        [(x.latitude, x.longitude) for x in summits
+         if 44.02 < x.latitude < 44.06 and -71.95 < x.longitude < -71.85]
+    nearest = container.nearest(lat, long, datamap, k=3)
+    assert [(x.latitude, x.longitude) for x in nearest] == \
+        [(summits[index].latitude, summits[index].longitude)
+         for index in numpy.lexsort((numpy.arange(len(summits)),
+                                     scanned))[:3]]
+    assert container.indicesAt([latitudes[7]], [longitudes[7]]).tolist() \
+        == [7]
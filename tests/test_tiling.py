@@ -0,0 +1,35 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import pytest
+
+from logic import AnalyzeData
+from tiling import TiledAnalyzeData
+
+from .conftest import featureDicts
+
+
+@pytest.mark.parametrize('workers, tileSize, halo', [
+    (1, 7, 1),
+    (1, 16, 4),
+    (2, 13, 2),
+    (1, 1000, 32),
+])
+def testTiledMatchesSerial(datamap, workers, tileSize, halo):
+    summits, saddles = AnalyzeData(datamap).analyze()
+    tiledSummits, tiledSaddles = TiledAnalyzeData(
+        datamap, workers=workers, tileSize=tileSize, halo=halo).analyze()
+    assert featureDicts(tiledSummits) == featureDicts(summits)
+    assert featureDicts(tiledSaddles) == featureDicts(saddles)
+
+
+def testTiledCompactMatchesSerial(datamap):
+    summits, saddles = AnalyzeData(datamap).analyze()
+    tiledSummits, tiledSaddles = TiledAnalyzeData(
+        datamap, workers=1, tileSize=11, halo=3).analyze(compact=True)
+    assert featureDicts(tiledSummits) == featureDicts(summits)
+    assert featureDicts(tiledSaddles) == featureDicts(saddles)
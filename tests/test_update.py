@@ -0,0 +1,105 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+import numpy
+import pytest
+
+from domain import Domain
+from walk import Walk
+from lib.containers.spot_elevation import SpotElevationContainer
+from lib.raster import WindowedArray
+
+from .conftest import featureDicts, makeDataMap
+
+
+class ReadOnlyArray(WindowedArray):
+    def __init__(self, elevations):
+        super(ReadOnlyArray, self).__init__(elevations.shape,
+                                            elevations.dtype)
+        self.elevations = elevations
+
+    def window(self, x0, y0, x1, y1):
+        return self.elevations[x0:x1, y0:y1].copy()
+
+
+def sortedFeatures(domain):
+    return sorted(featureDicts(domain.summits) + featureDicts(domain.saddles),
+                  key=repr)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def testUpdateMatchesRerun(datamap, compact):
+    random = numpy.random.RandomState(15)
+    domain = Domain(datamap)
+    domain.run(compact=compact)
+    numpy_map = datamap.numpy_map
+    for trial in range(6):
+        xSpan, ySpan = random.randint(1, 12, 2)
+        x = random.randint(0, numpy_map.shape[0] - xSpan + 1)
+        y = random.randint(0, numpy_map.shape[1] - ySpan + 1)
+        if trial % 3 == 0:
+            # Make an equal height area.
+            patch = numpy.full((xSpan, ySpan), numpy_map[x, y])
+        elif trial % 3 == 1:
+            patch = numpy_map[x:x + xSpan, y:y + ySpan] + \
+                random.randint(-3, 4, (xSpan, ySpan))
+        else:
+            patch = numpy.zeros((xSpan, ySpan))
+        domain.update(x, y, patch.astype(numpy_map.dtype))
+        rerun = Domain(makeDataMap(numpy_map))
+        rerun.run()
+        assert sortedFeatures(domain) == sortedFeatures(rerun)
+
+
+def testUpdateBeforeRun(datamap):
+    domain = Domain(datamap)
+    domain.update(2, 3, numpy.full((2, 2), 7, dtype=datamap.numpy_map.dtype))
+    assert (datamap.numpy_map[2:4, 3:5] == 7).all()
+    assert domain.summits is None
+
+
+def testUpdateOutsideMap(datamap):
+    domain = Domain(datamap)
+    with pytest.raises(ValueError):
+        domain.update(datamap.max_x, 0, numpy.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        domain.update(-1, 0, numpy.zeros((1, 1)))
+
+
+def testUpdateReadOnlyMap(terrain):
+    readOnly = terrain.copy()
+    readOnly.flags.writeable = False
+    for numpy_map in (readOnly, ReadOnlyArray(terrain)):
+        datamap = makeDataMap(terrain)
+        datamap.numpy_map = numpy_map
+        with pytest.raises(ValueError):
+            Domain(datamap).update(0, 0, numpy.zeros((1, 1)))
+
+
+def testUpdateDropsCrossingLinkers(datamap):
+    domain = Domain(datamap)
+    domain.run()
+    summits = SpotElevationContainer(
+        [summit for summit in domain.summits if not summit.edgeEffect])
+    domain.linkers = Walk(summits, domain.saddles.points, datamap).run()
+    linker = max(domain.linkers, key=lambda linker: len(linker.path))
+    if len(linker.path) < 5:
+        pytest.skip('no long enough path to cut')
+    point = linker.path[len(linker.path) // 2]
+    region = (point.x - 1, point.y - 1, point.x + 2, point.y + 2)
+    domain.update(point.x, point.y,
+                  datamap.numpy_map[point.x:point.x + 1,
+                                    point.y:point.y + 1].copy())
+    assert all(linker is not kept for kept in domain.linkers)
+    assert linker not in linker.saddle.summits
+    assert linker not in linker.summit.saddles
+    for kept in domain.linkers:
+        assert not any(region[0] <= step.x < region[2] and
+                       region[1] <= step.y < region[3]
+                       for step in kept.path)
+        assert kept in kept.saddle.summits
+        assert kept in kept.summit.saddles
@@ -0,0 +1,48 @@
+"""
+pyProm: Copyright 2017
+
+This software is distributed under a license that is described in
+the LICENSE file that accompanies it.
+"""
+
+from logic import AnalyzeData
+from walk import Walk
+from lib.containers.spot_elevation import SpotElevationContainer
+
+
+def walkedLinkers(datamap, workers):
+    summits, saddles = AnalyzeData(datamap).analyze()
+    summits = SpotElevationContainer(
+        [x for x in summits if not x.edgeEffect])
+    walk = Walk(summits, saddles.points, datamap)
+    return walk.run(workers=workers, chunkSize=4)
+
+
+def describe(linkers):
+    return [(linker.saddle.latitude, linker.saddle.longitude,
+             linker.summit.latitude, linker.summit.longitude,
+             [(point.x, point.y) for point in linker.path])
+            for linker in linkers]
+
+
+def testParallelMatchesSerial(datamap):
+    assert describe(walkedLinkers(datamap, 3)) == \
+        describe(walkedLinkers(datamap, 1))
+
+
+def testPathsClimbToTheirSummit(datamap):
+    for linker in walkedLinkers(datamap, 1):
+        path = linker.path
+        elevations = [point.elevation for point in path]
+        assert elevations == sorted(elevations)
+        for point, step in zip(path, path[1:]):
+            assert max(abs(point.x - step.x), abs(point.y - step.y)) == 1
+        top = path[-1]
+        summit = linker.summit
+        if summit.multiPoint:
+            assert (top.x, top.y) in [(point.x, point.y) for point in
+                                      summit.multiPoint.points]
+        else:
+            gridPoint = summit.toGridPoint(datamap)
+            assert (top.x, top.y) == (gridPoint.x, gridPoint.y)
+        assert top.elevation == summit.elevation